@@ -3,6 +3,12 @@
 from google.adk.agents.llm_agent import Agent
 from google.adk.tools import google_search
 
+from .search_cache import GroundedSearchCache, SearchCache
+
+# Trending questions are answered from a short-lived cache of grounded responses
+# (google_search runs inside the model call, so caching happens at the model callbacks)
+search_cache = GroundedSearchCache(SearchCache(ttl_seconds=300))
+
 # 1. Define the agent instance using the specific name 'search_agent'
 search_agent = Agent(
     name="search_agent",
@@ -18,7 +24,11 @@ search_agent = Agent(
     
     Always cite your sources when providing information from search results.
     """,
-    tools=[google_search]
+    tools=[google_search],
+    before_model_callback=search_cache.before_model_callback,
+    after_model_callback=search_cache.after_model_callback,
+    on_model_error_callback=search_cache.on_model_error_callback,
+    after_agent_callback=search_cache.after_agent_callback
 )
 
 # 2. Assign the same object to 'root_agent' for the ADK framework to find.
@@ -0,0 +1,30 @@
+"""Local stand-in for a web search API, for exercising search_cache without network access."""
+import asyncio
+import random
+
+
+class FakeSearchService:
+    """Seeded results for any query after a configurable latency; counts upstream calls."""
+
+    def __init__(self, latency_seconds: float = 0.3, seed: int = 0, results_per_query: int = 3):
+        self.latency_seconds = latency_seconds
+        self.seed = seed
+        self.results_per_query = results_per_query
+        self.calls = 0
+
+    async def search(self, query: str) -> dict:
+        self.calls += 1
+        await asyncio.sleep(self.latency_seconds)
+        rng = random.Random(f"{self.seed}:{query}")
+        slug = "-".join(query.lower().split())[:40]
+        return {
+            "query": query,
+            "results": [
+                {
+                    "title": f"Result {rank + 1} for {query}",
+                    "url": f"https://example.com/{slug}/{rng.randrange(10_000)}",
+                    "snippet": f"Simulated snippet {rng.randrange(1_000_000)} about {query}.",
+                }
+                for rank in range(self.results_per_query)
+            ],
+        }
@@ -0,0 +1,237 @@
+"""
+Search-result cache for search_agent.
+
+Queries are normalized (Unicode form, case, punctuation, whitespace) and the
+result is kept for a short TTL. An identical search that is already in flight
+is not sent again: later callers wait for the first one and share its result.
+
+google_search is a Gemini built-in: the search runs inside the model call and
+no tool callback fires for it, so GroundedSearchCache caches at the model
+callback level, reusing the grounded answer to the same normalized question.
+Only requests whose conversation is that single question are cached, since a
+follow-up's answer depends on its history. For a function-tool backend (a
+search API, or FakeSearchService in tests) search_tool() caches the backend
+call itself:
+
+    cache = SearchCache(ttl_seconds=120)
+    agent = Agent(..., tools=[search_tool(FakeSearchService(), cache)])
+
+Every lookup is reported to the optional on_lookup callback as
+{"query", "status" (hit/miss/coalesced), "saved_seconds"}; report() has the totals.
+"""
+import asyncio
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools import FunctionTool
+from google.genai import types
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: NFKC, case-folded, punctuation dropped, whitespace collapsed."""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    return _SPACE_RE.sub(" ", _PUNCTUATION_RE.sub(" ", text)).strip()
+
+
+class SearchCache:
+    """Normalized-query TTL cache with in-flight coalescing."""
+
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 10_000, coalesce_timeout_seconds: float = 30.0,
+                 on_lookup: Optional[Callable[[Dict[str, Any]], None]] = None, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.coalesce_timeout_seconds = coalesce_timeout_seconds
+        self.on_lookup = on_lookup
+        self.clock = clock
+        # key -> (expires_at, value, seconds the upstream call took)
+        self._entries: "OrderedDict[str, Tuple[float, Any, float]]" = OrderedDict()
+        self._inflight: Dict[str, Tuple[float, asyncio.Future]] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "expired": 0, "errors": 0,
+                      "upstream_seconds": 0.0, "saved_seconds": 0.0}
+
+    def _record(self, status: str, query: str, saved_seconds: float = 0.0):
+        self.stats[{"hit": "hits", "miss": "misses", "coalesced": "coalesced"}[status]] += 1
+        self.stats["saved_seconds"] += saved_seconds
+        if self.on_lookup:
+            self.on_lookup({"query": query, "status": status, "saved_seconds": saved_seconds})
+
+    def _cached(self, key: str) -> Optional[Tuple[float, Any, float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self.clock():
+            del self._entries[key]
+            self.stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def begin(self, query: str) -> Tuple[str, Any]:
+        """
+        Start a lookup: ("hit", value) from the cache or from an identical search
+        that was in flight, or ("lead", None) when the caller must search and then
+        call complete() (or abandon() if the search failed).
+        """
+        key = normalize_query(query)
+        entry = self._cached(key)
+        if entry is not None:
+            self._record("hit", query, entry[2])
+            return "hit", entry[1]
+
+        inflight = self._inflight.get(key)
+        # Wait only for what is left of the leader's budget, not a fresh timeout per waiter
+        remaining = inflight[0] + self.coalesce_timeout_seconds - self.clock() if inflight is not None else 0.0
+        if remaining > 0:
+            waited_from = time.perf_counter()
+            try:
+                value, upstream_seconds = await asyncio.wait_for(asyncio.shield(inflight[1]), remaining)
+            except (asyncio.TimeoutError, LookupError):
+                pass  # The leading search failed or stalled; search independently
+            else:
+                self._record("coalesced", query, max(0.0, upstream_seconds - (time.perf_counter() - waited_from)))
+                return "hit", value
+
+        self._inflight[key] = (self.clock(), asyncio.get_running_loop().create_future())
+        self._record("miss", query)
+        return "lead", None
+
+    def complete(self, query: str, value: Any, upstream_seconds: float):
+        """Store the leading search's result and hand it to the callers waiting on it."""
+        key = normalize_query(query)
+        self.stats["upstream_seconds"] += upstream_seconds
+        self._entries[key] = (self.clock() + self.ttl_seconds, value, upstream_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        _, future = self._inflight.pop(key, (None, None))
+        if future is not None and not future.done():
+            future.set_result((value, upstream_seconds))
+
+    def abandon(self, query: str):
+        """The leading search failed: nothing is cached and waiters search themselves."""
+        self.stats["errors"] += 1
+        _, future = self._inflight.pop(normalize_query(query), (None, None))
+        if future is not None and not future.done():
+            future.set_exception(LookupError(f"search for '{query}' failed"))
+            future.exception()  # Retrieved here so an unawaited future doesn't warn
+
+    async def get_or_fetch(self, query: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached value for the query, calling fetch() only when no cached or in-flight result exists."""
+        status, value = await self.begin(query)
+        if status == "hit":
+            return value
+        started = time.perf_counter()
+        try:
+            value = await fetch()
+        except BaseException:
+            self.abandon(query)
+            raise
+        self.complete(query, value, time.perf_counter() - started)
+        return value
+
+    def report(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "lookups": lookups,
+            "hit_rate": (self.stats["hits"] + self.stats["coalesced"]) / lookups if lookups else None,
+            "entries": len(self._entries),
+        }
+
+
+def search_tool(backend, cache: SearchCache) -> FunctionTool:
+    """A cached `web_search` function tool over a backend with `async search(query) -> dict`."""
+
+    async def web_search(query: str) -> dict:
+        """
+        Search the web for current information.
+
+        Args:
+            query: The search query
+
+        Returns:
+            The top search results with titles, URLs and snippets
+        """
+        return await cache.get_or_fetch(query, lambda: backend.search(query))
+
+    return FunctionTool(web_search)
+
+
+class GroundedSearchCache:
+    """
+    Model callbacks caching google_search-grounded answers to standalone questions.
+
+    Register before_model_callback, after_model_callback, on_model_error_callback
+    and after_agent_callback. A leading model call that is cancelled (a turn
+    deadline) fires neither model callback; after_agent_callback, which ADK
+    still runs while the turn unwinds, then releases the callers waiting on it.
+    A leader whose stream was closed without cancellation is given up once the
+    cache's coalesce timeout has passed.
+    """
+
+    def __init__(self, cache: SearchCache):
+        self.cache = cache
+        # (invocation, agent) -> (query, started), oldest first
+        self._leading: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+
+    def _release(self, key: Tuple[str, str]):
+        """The leading call of key ended without a response: waiters search themselves."""
+        leading = self._leading.pop(key, None)
+        if leading:
+            self.cache.abandon(leading[0])
+
+    def _expire_leaders(self):
+        """Forget leaders older than the coalesce timeout (their waiters have already given up)."""
+        cutoff = time.perf_counter() - self.cache.coalesce_timeout_seconds
+        while self._leading and next(iter(self._leading.values()))[1] < cutoff:
+            self._release(next(iter(self._leading)))
+
+    @staticmethod
+    def _standalone_question(llm_request: LlmRequest) -> Optional[str]:
+        contents = llm_request.contents or []
+        if len(contents) != 1 or contents[0].role != "user" or not contents[0].parts:
+            return None
+        text = "".join(part.text or "" for part in contents[0].parts)
+        return text if normalize_query(text) else None
+
+    async def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        self._expire_leaders()
+        query = self._standalone_question(llm_request)
+        if query is None:
+            return None
+        status, cached = await self.cache.begin(query)
+        if status == "hit":
+            response = LlmResponse.model_validate(cached)
+            response.custom_metadata = {**(response.custom_metadata or {}), "search_cache": "hit"}
+            return response
+        self._leading[(callback_context.invocation_id, callback_context.agent_name)] = (query, time.perf_counter())
+        return None
+
+    async def after_model_callback(self, callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        if llm_response.partial or key not in self._leading:
+            return None
+        query, started = self._leading.pop(key)
+        if llm_response.error_code or not llm_response.content:
+            self.cache.abandon(query)
+            return None
+        self.cache.complete(query, llm_response.model_dump(mode="json", exclude_none=True), time.perf_counter() - started)
+        return None
+
+    async def on_model_error_callback(self, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception) -> Optional[LlmResponse]:
+        self._release((callback_context.invocation_id, callback_context.agent_name))
+        return None
+
+    async def after_agent_callback(self, callback_context: CallbackContext) -> Optional[types.Content]:
+        # A no-op after a normal turn: after_model_callback already resolved the lead
+        self._release((callback_context.invocation_id, callback_context.agent_name))
+        return None
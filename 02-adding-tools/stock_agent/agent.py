@@ -1,8 +1,13 @@
-import yfinance as yf
 from google.adk import Agent
 from google.adk.tools import FunctionTool
 
-def get_stock_price(ticker: str) -> dict:
+from .quotes import QuoteService, YahooFinanceSource
+
+# Shared by all calls so the breaker and last-known quotes span requests;
+# tests swap quote_service.source for a FakeQuoteSource
+quote_service = QuoteService(YahooFinanceSource())
+
+async def get_stock_price(ticker: str) -> dict:
     """
     Retrieves the current stock price for a given ticker symbol.
 
@@ -13,24 +18,7 @@ def get_stock_price(ticker: str) -> dict:
         Dictionary containing stock information including current price,
         daily high/low, and company name.
     """
-    try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        price_data = stock.history(period="1d")
-
-        return {
-            "company_name": info.get('shortName', 'Unknown'),
-            "current_price": float(price_data['Close'].iloc[-1]),
-            "daily_high": float(price_data['High'].iloc[-1]),
-            "daily_low": float(price_data['Low'].iloc[-1]),
-            "currency": info.get('currency', 'USD'),
-            "ticker": ticker
-        }
-    except Exception as e:
-        return {
-            "error": f"Failed to retrieve stock information: {str(e)}",
-            "ticker": ticker
-        }
+    return await quote_service.get_quote(ticker)
 
 stock_agent = Agent(
     name="stock_agent",
@@ -0,0 +1,102 @@
+"""
+Circuit breaker for a flaky upstream.
+
+The breaker keeps the outcomes of the last `window` calls. Once at least
+`min_calls` are recorded and the share of failures or of slow calls reaches
+its threshold, the circuit opens: allow() returns False and callers skip the
+upstream (and serve a fallback) instead of waiting on it. After `open_seconds`
+it goes half-open and lets `half_open_probes` calls through; if they all
+succeed (and are not slow) it closes with a fresh window, if one fails it
+opens again.
+
+    breaker = CircuitBreaker("yahoo", failure_rate_threshold=0.5, slow_call_seconds=2.0)
+    if breaker.allow():
+        started = time.monotonic()
+        try:
+            result = fetch()
+        except Exception:
+            breaker.record(False, time.monotonic() - started)
+            raise
+        breaker.record(True, time.monotonic() - started)
+"""
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker over a sliding window of call outcomes."""
+
+    def __init__(self, name: str, failure_rate_threshold: float = 0.5, slow_call_seconds: float = 2.0,
+                 slow_rate_threshold: float = 0.5, window: int = 20, min_calls: int = 5, open_seconds: float = 30.0,
+                 half_open_probes: int = 1, on_state_change: Optional[Callable[[str, str, str], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate_threshold = slow_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.on_state_change = on_state_change
+        self.clock = clock
+        self.state = CLOSED
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)  # (failed, slow)
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        self.stats = {"calls": 0, "failures": 0, "slow": 0, "rejected": 0, "opened": 0}
+
+    def _transition(self, state: str):
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self._opened_at = self.clock()
+            self.stats["opened"] += 1
+        if state in (CLOSED, HALF_OPEN):
+            self._outcomes.clear()
+            self._probes_started = self._probes_succeeded = 0
+        if self.on_state_change and previous != state:
+            self.on_state_change(self.name, previous, state)
+
+    def allow(self) -> bool:
+        """Whether a call may go to the upstream now; a True in half-open state reserves a probe."""
+        if self.state == OPEN and self.clock() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN and self._probes_started < self.half_open_probes:
+            self._probes_started += 1
+            return True
+        if self.state == CLOSED:
+            return True
+        self.stats["rejected"] += 1
+        return False
+
+    def record(self, success: bool, duration_seconds: float):
+        """Report the outcome of a call that allow() let through."""
+        slow = duration_seconds >= self.slow_call_seconds
+        self.stats["calls"] += 1
+        self.stats["failures"] += not success
+        self.stats["slow"] += slow
+        if self.state == HALF_OPEN:
+            if not success or slow:
+                self._transition(OPEN)
+            else:
+                self._probes_succeeded += 1
+                if self._probes_succeeded >= self.half_open_probes:
+                    self._transition(CLOSED)
+            return
+        if self.state == OPEN:
+            return  # A call that started before the circuit opened
+        self._outcomes.append((not success, slow))
+        if len(self._outcomes) < self.min_calls:
+            return
+        failure_rate = sum(failed for failed, _ in self._outcomes) / len(self._outcomes)
+        slow_rate = sum(slow for _, slow in self._outcomes) / len(self._outcomes)
+        if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_rate_threshold:
+            self._transition(OPEN)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"name": self.name, "state": self.state, "window": len(self._outcomes), **self.stats}
@@ -0,0 +1,36 @@
+"""Local stand-in for the Yahoo Finance source, for exercising the breaker and stale fallback without network access."""
+import random
+import time
+
+
+class FakeQuoteSource:
+    """
+    Seeded quotes after a configurable latency, with injected failures.
+
+    error_rate fails that share of calls at random; outage=True fails every
+    call (after the latency, like a hanging upstream would) until it is reset.
+    """
+
+    def __init__(self, latency_seconds: float = 0.05, error_rate: float = 0.0, seed: int = 0):
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self.outage = False
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self.seed = seed
+
+    def fetch(self, ticker: str) -> dict:
+        self.calls += 1
+        time.sleep(self.latency_seconds)
+        if self.outage or self._rng.random() < self.error_rate:
+            raise ConnectionError(f"simulated upstream failure for {ticker}")
+        rng = random.Random(f"{self.seed}:{ticker}:{self.calls}")
+        price = round(rng.uniform(20, 500), 2)
+        return {
+            "company_name": f"{ticker} Corp",
+            "current_price": price,
+            "daily_high": round(price * 1.02, 2),
+            "daily_low": round(price * 0.98, 2),
+            "currency": "USD",
+            "ticker": ticker
+        }
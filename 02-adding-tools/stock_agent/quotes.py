@@ -0,0 +1,131 @@
+"""
+Quote lookups for stock_agent behind a circuit breaker, with stale fallback.
+
+A source has a blocking `fetch(ticker) -> dict` that raises on failure
+(YahooFinanceSource, or FakeQuoteSource from fake_quotes.py in tests, see
+02-adding-tools/test_stock_quotes.py).
+QuoteService runs fetches in a worker thread and remembers the last good
+quote per ticker:
+
+- while the breaker is open, the last-known quote is returned right away,
+  marked stale, and the upstream is not called;
+- when the upstream is slower than `stale_after_seconds` and a last-known
+  quote exists, that quote is returned marked stale while the fetch carries
+  on in the background and refreshes it (stale-while-revalidate);
+- with no last-known quote (or one older than `max_stale_seconds`) the
+  caller waits up to `timeout_seconds`.
+
+Concurrent lookups of a ticker share one in-flight fetch. A fetch that fails,
+or takes longer than the timeout, counts as a failure for the breaker.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from .circuit_breaker import CircuitBreaker
+
+
+class YahooFinanceSource:
+    """Current quote from yfinance."""
+
+    def fetch(self, ticker: str) -> Dict[str, Any]:
+        # yfinance (and pandas) take longer to import than the rest of the agent,
+        # so they are loaded on the first call rather than at startup
+        import yfinance as yf
+
+        stock = yf.Ticker(ticker)
+        info = stock.info
+        price_data = stock.history(period="1d")
+        return {
+            "company_name": info.get('shortName', 'Unknown'),
+            "current_price": float(price_data['Close'].iloc[-1]),
+            "daily_high": float(price_data['High'].iloc[-1]),
+            "daily_low": float(price_data['Low'].iloc[-1]),
+            "currency": info.get('currency', 'USD'),
+            "ticker": ticker
+        }
+
+
+class QuoteService:
+    """Breaker-guarded, stale-serving quote lookups (see module docstring)."""
+
+    def __init__(self, source, breaker: Optional[CircuitBreaker] = None, timeout_seconds: float = 10.0,
+                 stale_after_seconds: float = 1.0, max_stale_seconds: float = 86_400.0, max_tickers: int = 5_000):
+        self.source = source
+        self.breaker = breaker or CircuitBreaker("quotes", slow_call_seconds=stale_after_seconds * 2)
+        self.timeout_seconds = timeout_seconds
+        self.stale_after_seconds = stale_after_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.max_tickers = max_tickers
+        # ticker -> (wall-clock fetch time, quote)
+        self._last: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {"fresh": 0, "stale": 0, "errors": 0}
+
+    async def _fetch(self, ticker: str) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            quote = await asyncio.to_thread(self.source.fetch, ticker)
+        except Exception:
+            self.breaker.record(False, time.monotonic() - started)
+            raise
+        finally:
+            self._inflight.pop(ticker, None)
+        duration = time.monotonic() - started
+        self.breaker.record(duration <= self.timeout_seconds, duration)
+        self._last[ticker] = (time.time(), quote)
+        self._last.move_to_end(ticker)
+        while len(self._last) > self.max_tickers:
+            self._last.popitem(last=False)
+        return quote
+
+    def _servable(self, ticker: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """The last-known quote if it is recent enough to serve as stale."""
+        entry = self._last.get(ticker)
+        if entry is None or time.time() - entry[0] > self.max_stale_seconds:
+            return None
+        return entry
+
+    def _stale(self, ticker: str, reason: str) -> Optional[Dict[str, Any]]:
+        entry = self._servable(ticker)
+        if entry is None:
+            return None
+        fetched_at, quote = entry
+        self.stats["stale"] += 1
+        return {
+            **quote,
+            "stale": True,
+            "stale_reason": reason,
+            "as_of": datetime.fromtimestamp(fetched_at, timezone.utc).isoformat(),
+            "age_seconds": round(time.time() - fetched_at, 1),
+        }
+
+    def _error(self, ticker: str, message: str) -> Dict[str, Any]:
+        self.stats["errors"] += 1
+        return {"error": f"Failed to retrieve stock information: {message}", "ticker": ticker}
+
+    async def get_quote(self, ticker: str) -> Dict[str, Any]:
+        ticker = ticker.strip().upper()
+        task = self._inflight.get(ticker)
+        if task is None:
+            if not self.breaker.allow():
+                return self._stale(ticker, "circuit_open") or self._error(ticker, "data source unavailable (circuit open)")
+            task = self._inflight[ticker] = asyncio.create_task(self._fetch(ticker))
+            # Retrieved here so a background refresh that fails doesn't warn
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+        # Only cut the wait short when there is a quote to fall back on
+        wait = self.stale_after_seconds if self._servable(ticker) else self.timeout_seconds
+        try:
+            quote = await asyncio.wait_for(asyncio.shield(task), wait)
+        except asyncio.TimeoutError:
+            return self._stale(ticker, "upstream_slow") or self._error(ticker, f"timed out after {wait:g}s")
+        except Exception as e:
+            return self._stale(ticker, "upstream_error") or self._error(ticker, str(e))
+        self.stats["fresh"] += 1
+        return quote
+
+    def report(self) -> Dict[str, Any]:
+        return {**self.stats, "breaker": self.breaker.snapshot(), "tickers": len(self._last)}
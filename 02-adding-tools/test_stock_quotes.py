@@ -0,0 +1,113 @@
+"""
+Checks stock_agent's circuit breaker and stale-quote fallback against FakeQuoteSource (no network needed).
+
+Run from the 02-adding-tools directory:
+
+    python -m pytest test_stock_quotes.py
+    python test_stock_quotes.py
+"""
+import asyncio
+
+from stock_agent.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from stock_agent.fake_quotes import FakeQuoteSource
+from stock_agent.quotes import QuoteService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_breaker_opens_probes_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", window=4, min_calls=4, open_seconds=30, clock=clock)
+    for success in (True, False, False, True):
+        assert breaker.allow()
+        breaker.record(success, 0.1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    clock.now += 30
+    assert breaker.allow()  # The half-open probe
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # Only one probe at a time
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["window"] == 0
+
+
+def test_failed_probe_reopens_and_slow_calls_count():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", slow_call_seconds=1.0, window=2, min_calls=2, open_seconds=5, clock=clock)
+    breaker.record(True, 1.5)
+    breaker.record(True, 2.0)
+    assert breaker.state == OPEN  # Successful, but every call was slow
+
+    clock.now += 5
+    assert breaker.allow()
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    assert breaker.stats["opened"] == 2
+
+
+def test_stale_quote_served_on_error_and_while_open():
+    async def check():
+        source = FakeQuoteSource(latency_seconds=0.01)
+        breaker = CircuitBreaker("quotes", window=2, min_calls=2, open_seconds=60)
+        service = QuoteService(source, breaker, timeout_seconds=1.0, stale_after_seconds=0.5)
+
+        fresh = await service.get_quote("aapl")
+        assert fresh["ticker"] == "AAPL" and "stale" not in fresh
+
+        source.outage = True
+        quote = await service.get_quote("AAPL")
+        assert quote["stale"] and quote["stale_reason"] == "upstream_error"
+        assert quote["current_price"] == fresh["current_price"]
+        assert breaker.state == OPEN  # One failure in a window of two
+
+        calls = source.calls
+        quote = await service.get_quote("AAPL")
+        assert quote["stale_reason"] == "circuit_open"
+        assert source.calls == calls  # The upstream isn't called while the circuit is open
+        assert "error" in await service.get_quote("MSFT")  # Nothing cached to fall back on
+
+    asyncio.run(check())
+
+
+def test_slow_upstream_serves_stale_then_refreshes():
+    async def check():
+        source = FakeQuoteSource(latency_seconds=0.01)
+        service = QuoteService(source, timeout_seconds=2.0, stale_after_seconds=0.05)
+        first = await service.get_quote("AAPL")
+
+        source.latency_seconds = 0.3
+        quote = await service.get_quote("AAPL")
+        assert quote["stale_reason"] == "upstream_slow"
+        await asyncio.sleep(0.4)  # The fetch carried on in the background
+        assert service._last["AAPL"][1] != first
+
+    asyncio.run(check())
+
+
+def test_expired_quote_waits_for_the_full_timeout():
+    async def check():
+        source = FakeQuoteSource(latency_seconds=0.01)
+        service = QuoteService(source, timeout_seconds=2.0, stale_after_seconds=0.05, max_stale_seconds=0.05)
+        await service.get_quote("AAPL")
+        await asyncio.sleep(0.1)  # The cached quote is now too old to serve
+
+        source.latency_seconds = 0.3
+        quote = await service.get_quote("AAPL")
+        assert "error" not in quote and "stale" not in quote
+
+    asyncio.run(check())
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: ok")
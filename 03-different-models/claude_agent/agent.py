@@ -2,6 +2,7 @@ import os
 from google.adk import Agent
 from google.adk.models.lite_llm import LiteLlm
 from dotenv import load_dotenv # New Import
+from .pooled_client import PooledLiteLLMClient
 
 # --- Load the environment variables before accessing them ---
 load_dotenv()
@@ -11,10 +12,19 @@ openrouter_api_key = os.environ.get("OPENROUTER_API_KEY")
 
 # print("OpenRouter API Key:", openrouter_api_key)
 
+# Shared HTTP client: keep-alive connection pool (HTTP/2 when available)
+# and coalescing of identical in-flight requests
+llm_client = PooledLiteLLMClient(
+    max_connections=int(os.environ.get("OPENROUTER_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.environ.get("OPENROUTER_MAX_KEEPALIVE", "10"))
+)
+
 # Set up the model using LiteLLM with OpenRouter and Anthropic's Claude
 model = LiteLlm(
     model="openrouter/anthropic/claude-3-opus-20240229",
-    api_key= openrouter_api_key
+    api_key= openrouter_api_key,
+    api_base=os.environ.get("OPENROUTER_API_BASE", "https://openrouter.ai/api/v1"),
+    llm_client=llm_client
 )
 
 claude_agent = Agent(
@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+import httpx
+from google.adk.models.lite_llm import LiteLLMClient
+from litellm.llms.custom_httpx.http_handler import AsyncHTTPHandler
+
+try:
+    import h2  # noqa: F401  (httpx only negotiates HTTP/2 when h2 is installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class PooledLiteLLMClient(LiteLLMClient):
+    """
+    LiteLLM client that reuses one pooled HTTP connection set across requests
+    and coalesces concurrent identical (non-streaming) completions into a
+    single upstream call.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 120.0,
+        http2: bool = True,
+        coalesce: bool = True,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.coalesce = coalesce
+
+        self._handler: Optional[AsyncHTTPHandler] = None
+        # In-flight completions keyed by request fingerprint (single-flight)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        # Counters for verifying reuse and coalescing
+        self.stats = {"upstream_calls": 0, "coalesced_calls": 0, "streaming_calls": 0}
+
+    def _get_handler(self) -> AsyncHTTPHandler:
+        """Lazily create the shared handler (the httpx client binds to the running loop)."""
+        if self._handler is None or self._handler.client.is_closed:
+            handler = AsyncHTTPHandler(timeout=self.timeout)
+            handler.client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+            )
+            self._handler = handler
+        return self._handler
+
+    @staticmethod
+    def _fingerprint(model: Any, messages: Any, tools: Any, kwargs: Dict[str, Any]) -> str:
+        """Build a stable key for a completion request."""
+        payload = {
+            "model": model,
+            "messages": messages,
+            "tools": tools,
+            "kwargs": {k: v for k, v in kwargs.items() if k != "client"},
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    async def acompletion(self, model: Any, messages: Any, tools: Any, **kwargs: Any):
+        """Calls acompletion over the pooled client, sharing identical in-flight requests."""
+        kwargs.setdefault("client", self._get_handler())
+
+        # Streaming responses are consumed incrementally and cannot be shared
+        if kwargs.get("stream") or not self.coalesce:
+            self.stats["streaming_calls" if kwargs.get("stream") else "upstream_calls"] += 1
+            return await super().acompletion(model=model, messages=messages, tools=tools, **kwargs)
+
+        key = self._fingerprint(model, messages, tools, kwargs)
+        while (pending := self._inflight.get(key)) is not None:
+            self.stats["coalesced_calls"] += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise  # This caller was cancelled
+                # The leader's caller went away; don't share its cancellation,
+                # make the call again (one of the followers becomes the new leader)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.stats["upstream_calls"] += 1
+        try:
+            response = await super().acompletion(model=model, messages=messages, tools=tools, **kwargs)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure with no followers is not reported as unhandled
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def aclose(self):
+        """Close the pooled connections."""
+        if self._handler is not None:
+            await self._handler.client.aclose()
+            self._handler = None
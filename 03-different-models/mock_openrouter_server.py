@@ -0,0 +1,142 @@
+"""
+Local OpenAI-compatible mock server for exercising the pooled LiteLLM client.
+
+Run from the 03-different-models directory:
+
+    python mock_openrouter_server.py
+
+It starts the mock on a background thread, points claude_agent's LiteLlm model
+at it and checks that identical concurrent prompts share one upstream call and
+that sequential requests reuse the same keep-alive connection.
+test_pooled_client.py runs the same checks as assertions.
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockStats:
+    """Thread-safe counters shared by all request handlers."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"requests": self.requests, "connections": self.connections}
+
+
+class MockCompletionHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.stats.lock:
+            self.server.stats.connections += 1
+
+    def log_message(self, format, *args):
+        pass  # Keep the demo output readable
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        with self.server.stats.lock:
+            self.server.stats.requests += 1
+
+        # Simulate model latency so concurrent requests overlap
+        time.sleep(self.server.latency)
+
+        last_message = request.get("messages", [{}])[-1].get("content", "")
+        if isinstance(last_message, list):
+            last_message = " ".join(part.get("text", "") for part in last_message)
+
+        body = json.dumps({
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"Mock reply to: {last_message}"},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.2):
+    """Start the mock server on a daemon thread and return it (``server.stats`` holds counters)."""
+    server = ThreadingHTTPServer((host, port), MockCompletionHandler)
+    server.daemon_threads = True
+    server.stats = MockStats()
+    server.latency = latency
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+async def run_demo(concurrency: int, latency: float):
+    from google.adk.models.lite_llm import LiteLlm
+    from google.adk.models.llm_request import LlmRequest
+    from google.genai import types
+
+    from claude_agent.pooled_client import PooledLiteLLMClient
+
+    server = start_mock_server(latency=latency)
+    api_base = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    print(f"Mock OpenAI-compatible server listening on {api_base}")
+
+    llm_client = PooledLiteLLMClient()
+    model = LiteLlm(
+        model="openrouter/anthropic/claude-3-opus-20240229",
+        api_key="mock-key",
+        api_base=api_base,
+        llm_client=llm_client
+    )
+
+    def make_request(text: str) -> LlmRequest:
+        return LlmRequest(
+            model=model.model,
+            contents=[types.Content(role="user", parts=[types.Part(text=text)])]
+        )
+
+    async def call(text: str) -> str:
+        async for response in model.generate_content_async(make_request(text)):
+            return response.content.parts[0].text
+
+    # 1. Identical prompts in flight at the same time share one upstream call
+    replies = await asyncio.gather(*[call("Tell me a story about a lighthouse") for _ in range(concurrency)])
+    print(f"\n{concurrency} identical concurrent prompts -> {server.stats.snapshot()['requests']} upstream request(s)")
+    print(f"All replies identical: {len(set(replies)) == 1}")
+
+    # 2. Sequential distinct prompts reuse the pooled keep-alive connection
+    for i in range(5):
+        await call(f"Sequential prompt {i}")
+    stats = server.stats.snapshot()
+    print(f"\nAfter 5 sequential prompts: {stats['requests']} requests over {stats['connections']} connection(s)")
+    print(f"Client stats: {llm_client.stats}")
+
+    await llm_client.aclose()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exercise the pooled LiteLLM client against a local mock server")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated model latency in seconds")
+    args = parser.parse_args()
+    asyncio.run(run_demo(args.concurrency, args.latency))
@@ -0,0 +1,85 @@
+"""
+Checks PooledLiteLLMClient against the local mock server (no network or API key needed).
+
+Run from the 03-different-models directory:
+
+    python -m pytest test_pooled_client.py
+    python test_pooled_client.py
+"""
+import asyncio
+import os
+
+# Use litellm's bundled model cost map instead of fetching it
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+from google.adk.models.lite_llm import LiteLlm
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from claude_agent.pooled_client import PooledLiteLLMClient
+from mock_openrouter_server import start_mock_server
+
+
+async def _with_mock(check, latency: float = 0.2):
+    server = start_mock_server(latency=latency)
+    client = PooledLiteLLMClient()
+    model = LiteLlm(
+        model="openrouter/anthropic/claude-3-opus-20240229",
+        api_key="mock-key",
+        api_base=f"http://127.0.0.1:{server.server_address[1]}/v1",
+        llm_client=client
+    )
+
+    async def call(text: str) -> str:
+        request = LlmRequest(model=model.model, contents=[types.Content(role="user", parts=[types.Part(text=text)])])
+        async for response in model.generate_content_async(request):
+            return response.content.parts[0].text
+
+    try:
+        await check(call, client, server)
+    finally:
+        await client.aclose()
+        server.shutdown()
+
+
+def test_identical_concurrent_prompts_share_one_request():
+    async def check(call, client, server):
+        replies = await asyncio.gather(*[call("Tell me a story") for _ in range(8)])
+        assert len(set(replies)) == 1
+        assert server.stats.snapshot()["requests"] == 1
+        assert client.stats["coalesced_calls"] == 7
+
+    asyncio.run(_with_mock(check))
+
+
+def test_sequential_prompts_reuse_one_connection():
+    async def check(call, client, server):
+        for i in range(5):
+            await call(f"Sequential prompt {i}")
+        assert server.stats.snapshot() == {"requests": 5, "connections": 1}
+
+    asyncio.run(_with_mock(check, latency=0.01))
+
+
+def test_leader_cancellation_is_not_shared_with_followers():
+    async def check(call, client, server):
+        leader = asyncio.create_task(call("Shared prompt"))
+        await asyncio.sleep(0.05)
+        followers = [asyncio.create_task(call("Shared prompt")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        leader.cancel()
+
+        replies = await asyncio.gather(*followers)
+        assert leader.cancelled()
+        assert replies == ["Mock reply to: Shared prompt"] * 3
+        # The cancelled call already reached the server; the followers then share one retry
+        assert server.stats.snapshot()["requests"] == 2
+
+    asyncio.run(_with_mock(check, latency=0.3))
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: ok")
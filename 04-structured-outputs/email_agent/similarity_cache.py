@@ -0,0 +1,268 @@
+"""
+Near-duplicate request cache for email_agent.
+
+Past requests are normalized, shingled and summarized as MinHash signatures;
+banded LSH buckets find candidate matches in O(bands) dict lookups, so a lookup
+costs the same at a few hundred entries as at millions. A close enough match
+returns the cached EmailContent, adapted when the requests differ only by
+substituted words (e.g. a different recipient name).
+"""
+import difflib
+import json
+import re
+import time
+import zlib
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import ValidationError
+
+_TOKEN_RE = re.compile(r"[\w'@.-]+")
+_PRIME = np.uint64(4294967291)  # Largest prime below 2**32
+
+
+def tokenize(text: str) -> List[str]:
+    """Word tokens with surrounding punctuation removed (case preserved for adaptation)."""
+    return [t.strip(".-'") for t in _TOKEN_RE.findall(text) if t.strip(".-'")]
+
+
+def normalize(text: str) -> str:
+    return " ".join(tokenize(text)).lower()
+
+
+class MinHasher:
+    """MinHash signatures over word unigrams/bigrams via universal hashing (vectorized)."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        # a*x + b stays below 2**64 for 32-bit a, b and x, so uint64 arithmetic is exact
+        self._a = rng.integers(1, 2 ** 32 - 1, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, 2 ** 32 - 1, size=(num_perm, 1), dtype=np.uint64)
+
+    @staticmethod
+    def shingles(normalized: str) -> List[str]:
+        words = normalized.split()
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def signature(self, normalized: str) -> np.ndarray:
+        shingles = self.shingles(normalized) or [""]
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((self._a * hashes + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+class SimilarityCache:
+    """
+    Bounded LRU of (request, output) pairs with a MinHash/LSH index.
+
+    num_perm = bands * rows; the LSH candidate threshold is roughly
+    (1 / bands) ** (1 / rows). Candidates are ranked by shared bands and only
+    the best few are checked against the full signature, so lookup cost is
+    bounded by bands * bucket_size regardless of cache size.
+    """
+
+    def __init__(self, max_entries: int = 100_000, threshold: float = 0.6, bands: int = 16, rows: int = 4,
+                 bucket_size: int = 32, verify_top: int = 8):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.bucket_size = bucket_size
+        self.verify_top = verify_top
+        self.hasher = MinHasher(num_perm=bands * rows)
+        # entry id -> (signature, original request, output); order is recency for LRU eviction
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, str, Dict]]" = OrderedDict()
+        self._exact: Dict[str, int] = {}
+        # (band, band bytes) -> entry ids (dict as an insertion-ordered set, capped at bucket_size)
+        self._buckets: Dict[Tuple[int, bytes], Dict[int, None]] = {}
+        self._next_id = 0
+        self.stats = {"lookups": 0, "exact_hits": 0, "similar_hits": 0, "adapted": 0, "misses": 0,
+                      "evictions": 0, "lookup_seconds": 0.0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _evict(self):
+        entry_id, (signature, request, _) = self._entries.popitem(last=False)
+        self._exact.pop(normalize(request), None)
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.pop(entry_id, None)
+                if not bucket:
+                    del self._buckets[key]
+        self.stats["evictions"] += 1
+
+    def put(self, request: str, output: Dict):
+        normalized = normalize(request)
+        existing = self._exact.get(normalized)
+        if existing is not None:
+            signature, _, _ = self._entries[existing]
+            self._entries[existing] = (signature, request, output)
+            self._entries.move_to_end(existing)
+            return
+
+        while len(self._entries) >= self.max_entries:
+            self._evict()
+
+        entry_id = self._next_id
+        self._next_id += 1
+        signature = self.hasher.signature(normalized)
+        self._entries[entry_id] = (signature, request, output)
+        self._exact[normalized] = entry_id
+        for key in self._band_keys(signature):
+            bucket = self._buckets.setdefault(key, {})
+            bucket[entry_id] = None
+            if len(bucket) > self.bucket_size:
+                # Popular templates pile up in one bucket; keep only the most recent
+                del bucket[next(iter(bucket))]
+
+    def _adapt(self, cached_request: str, request: str, output: Dict) -> Optional[Dict]:
+        """
+        Rewrite a cached output for a request that differs only by substituted
+        words. Returns None when the difference is not a plain substitution, or
+        when a replaced phrase does not appear in the output: "formal" -> "casual"
+        changes the whole email, not a word of it.
+        """
+        old_tokens, new_tokens = tokenize(cached_request), tokenize(request)
+        matcher = difflib.SequenceMatcher(a=[t.lower() for t in old_tokens], b=[t.lower() for t in new_tokens],
+                                          autojunk=False)
+        replacements = []
+        for op, i1, i2, j1, j2 in matcher.get_opcodes():
+            if op == "equal":
+                continue
+            if op != "replace":
+                return None
+            replacements.append((" ".join(old_tokens[i1:i2]), " ".join(new_tokens[j1:j2])))
+
+        adapted = dict(output)
+        rewritten = set()
+        for field, value in output.items():
+            if not isinstance(value, str):
+                continue
+            for old, new in replacements:
+                value, count = re.subn(rf"\b{re.escape(old)}\b", new, value)
+                if count:
+                    rewritten.add(old)
+            adapted[field] = value
+        if len(rewritten) < len({old for old, _ in replacements}):
+            return None
+        return adapted
+
+    def get(self, request: str) -> Optional[Dict]:
+        """Cached (possibly adapted) output for a request, or None on a miss."""
+        start = time.perf_counter()
+        self.stats["lookups"] += 1
+        try:
+            normalized = normalize(request)
+            entry_id = self._exact.get(normalized)
+            if entry_id is not None:
+                self._entries.move_to_end(entry_id)
+                self.stats["exact_hits"] += 1
+                return self._entries[entry_id][2]
+
+            signature = self.hasher.signature(normalized)
+            shared_bands = Counter()
+            for key in self._band_keys(signature):
+                bucket = self._buckets.get(key)
+                if bucket:
+                    shared_bands.update(bucket.keys())
+
+            for entry_id, _ in shared_bands.most_common(self.verify_top):
+                cached_signature, cached_request, output = self._entries[entry_id]
+                similarity = np.count_nonzero(cached_signature == signature) / signature.size
+                if similarity < self.threshold:
+                    break  # Ranked by shared bands, so later candidates are unlikely to do better
+                adapted = self._adapt(cached_request, request, output)
+                if adapted is None:
+                    continue
+                self._entries.move_to_end(entry_id)
+                self.stats["similar_hits"] += 1
+                if adapted != output:
+                    self.stats["adapted"] += 1
+                return adapted
+
+            self.stats["misses"] += 1
+            return None
+        finally:
+            self.stats["lookup_seconds"] += time.perf_counter() - start
+
+    def report(self) -> Dict:
+        lookups = self.stats["lookups"] or 1
+        hits = self.stats["exact_hits"] + self.stats["similar_hits"]
+        return {
+            **{k: v for k, v in self.stats.items() if k != "lookup_seconds"},
+            "entries": len(self._entries),
+            "hit_rate": round(hits / lookups, 4),
+            "mean_lookup_us": round(self.stats["lookup_seconds"] / lookups * 1e6, 2),
+        }
+
+
+class EmailSimilarityCache:
+    """
+    before/after_model callbacks that put a SimilarityCache in front of an
+    output_schema agent. Only the latest user message is used as the key, so
+    this suits one-shot generation agents like email_agent.
+    """
+
+    def __init__(self, schema: type, cache: Optional[SimilarityCache] = None, max_pending: int = 10_000):
+        self.schema = schema
+        self.cache = cache or SimilarityCache()
+        self.max_pending = max_pending
+        # Requests per (invocation_id, agent_name) until the model's answer arrives. Bounded:
+        # a turn aborted by the streaming guard ends without any of the callbacks below
+        self._pending: "OrderedDict[tuple, str]" = OrderedDict()
+
+    @staticmethod
+    def _user_text(llm_request: LlmRequest) -> str:
+        for content in reversed(llm_request.contents):
+            if content.role == "user" and content.parts:
+                text = "".join(p.text for p in content.parts if getattr(p, "text", None))
+                if text:
+                    return text
+        return ""
+
+    async def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        request = self._user_text(llm_request)
+        if not request:
+            return None
+        cached = self.cache.get(request)
+        if cached is not None:
+            return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=json.dumps(cached))]))
+        self._pending[(callback_context.invocation_id, callback_context.agent_name)] = request
+        while len(self._pending) > self.max_pending:
+            self._pending.popitem(last=False)
+        return None
+
+    async def after_model_callback(self, callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        if llm_response.partial:
+            return None
+        request = self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if request is None or not llm_response.content or not llm_response.content.parts:
+            return None
+        text = "".join(p.text for p in llm_response.content.parts if getattr(p, "text", None))
+        try:
+            output = self.schema.model_validate_json(text)
+        except ValidationError:
+            return None  # Never cache output that does not match the schema
+        self.cache.put(request, output.model_dump(mode="json"))
+        return None
+
+    async def on_model_error_callback(self, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception) -> Optional[LlmResponse]:
+        self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        return None
+
+    async def after_agent_callback(self, callback_context: CallbackContext) -> Optional[types.Content]:
+        # Also runs when the turn is cancelled mid-call
+        self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        return None
@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import uuid
+from dotenv import load_dotenv
+
+from google.adk import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from email_agent.agent import email_agent
+from email_agent.similarity_cache import EmailSimilarityCache, SimilarityCache
+from ticket_agent.agent import ticket_agent
+from ticket_agent.preclassifier import TicketPreClassifier
+from structured_stream import StreamingSchemaGuard, SchemaMismatchError, run_structured_turn
+
+# Load environment variables
+load_dotenv()
+
+AGENTS = {
+    "email": email_agent,
+    "ticket": ticket_agent,
+}
+
+def print_field(field, value):
+    """Show each structured field as soon as it has been generated and validated."""
+    value = getattr(value, "value", value)  # Enums print as their plain value
+    print(f"[{field}] {value}")
+
+async def main(agent_choice, max_retries, preclassifier_path=None, threshold=0.8, bypass=False,
+               cache_size=0, cache_threshold=0.6):
+    base_agent = AGENTS[agent_choice]
+
+    # Optional local priority/category classifier in front of ticket_agent
+    preclassifier = None
+    before_model_callbacks, after_model_callbacks = [], []
+    # Both drop per-call state when a call fails or the turn ends without a response
+    model_error_callbacks, after_agent_callbacks = [], []
+    if preclassifier_path and agent_choice == "ticket":
+        preclassifier = TicketPreClassifier(preclassifier_path, threshold=threshold, bypass_llm=bypass)
+        before_model_callbacks.append(preclassifier.before_model_callback)
+        model_error_callbacks.append(preclassifier.on_model_error_callback)
+        after_agent_callbacks.append(preclassifier.after_agent_callback)
+
+    # Optional near-duplicate cache in front of email_agent
+    similarity_cache = None
+    if cache_size and agent_choice == "email":
+        similarity_cache = EmailSimilarityCache(
+            base_agent.output_schema, SimilarityCache(max_entries=cache_size, threshold=cache_threshold)
+        )
+        before_model_callbacks.append(similarity_cache.before_model_callback)
+        model_error_callbacks.append(similarity_cache.on_model_error_callback)
+        after_agent_callbacks.append(similarity_cache.after_agent_callback)
+
+    guard = StreamingSchemaGuard(
+        base_agent.output_schema,
+        on_field=print_field,
+        schema_for=preclassifier.schema_for if preclassifier else None
+    )
+    after_model_callbacks.append(guard.after_model_callback)
+    if preclassifier:
+        # Runs after the guard so the guard sees the reduced output the model produced
+        after_model_callbacks.append(preclassifier.after_model_callback)
+    if similarity_cache:
+        after_model_callbacks.append(similarity_cache.after_model_callback)
+
+    # Same agent, with the incremental schema guard watching the streamed output
+    agent = Agent(
+        name=base_agent.name,
+        model=base_agent.model,
+        description=base_agent.description,
+        instruction=base_agent.instruction,
+        output_schema=base_agent.output_schema,
+        output_key=base_agent.output_key,
+        before_model_callback=before_model_callbacks or None,
+        after_model_callback=after_model_callbacks,
+        on_model_error_callback=model_error_callbacks or None,
+        after_agent_callback=after_agent_callbacks or None
+    )
+
+    # Create a session service and session
+    session_service = InMemorySessionService()
+    app_name = "StructuredOutputs"
+    user_id = "example_user"
+    session_id = str(uuid.uuid4())
+    await session_service.create_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    runner = Runner(agent=agent, app_name=app_name, session_service=session_service)
+
+    # Interactive chat loop
+    print(f"\nStructured Output Demo ({agent.name}, streaming)")
+    print("Type 'exit' or 'quit' to end the conversation")
+    print("--------------------------------------------------------")
+
+    while True:
+        query = input("\nYou: ")
+
+        if query.lower() in ["exit", "quit"]:
+            if preclassifier:
+                print(f"Pre-classifier: {preclassifier.report()}")
+            if similarity_cache:
+                print(f"Similarity cache: {similarity_cache.cache.report()}")
+            print("Goodbye!")
+            break
+
+        try:
+            await run_structured_turn(runner, user_id, session_id, query, max_retries=max_retries)
+        except SchemaMismatchError as e:
+            print(f"Could not produce a valid {agent.output_key}: {e}")
+            continue
+
+        session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        print(f"\nValidated {agent.output_key}: {session.state.get(agent.output_key)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Structured output agents with incremental validation")
+    parser.add_argument("--agent", choices=sorted(AGENTS), default="ticket")
+    parser.add_argument("--max-retries", type=int, default=1, help="Targeted retries after an early schema mismatch")
+    parser.add_argument("--preclassifier", metavar="MODEL", help="Trained ticket classifier (.npz) for priority/category")
+    parser.add_argument("--threshold", type=float, default=0.8, help="Minimum classifier confidence to skip the LLM's labelling")
+    parser.add_argument("--bypass", action="store_true", help="Skip the LLM entirely for confidently classified tickets")
+    parser.add_argument("--cache-size", type=int, default=0, help="Enable the email near-duplicate cache with this many entries")
+    parser.add_argument("--cache-threshold", type=float, default=0.6, help="Minimum estimated similarity for a cache hit")
+    args = parser.parse_args()
+    asyncio.run(main(args.agent, args.max_retries, args.preclassifier, args.threshold, args.bypass,
+                     args.cache_size, args.cache_threshold))
@@ -0,0 +1,303 @@
+import enum
+import functools
+import json
+import typing
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+
+class SchemaMismatchError(Exception):
+    """Raised as soon as a streamed structured output can no longer match its schema."""
+
+    def __init__(self, field: Optional[str], reason: str, partial_text: str = ""):
+        self.field = field
+        self.reason = reason
+        self.partial_text = partial_text
+        super().__init__(f"{field or 'output'}: {reason}")
+
+
+class CompiledSchema:
+    """Validators for one output schema, built once and shared by every parse."""
+
+    def __init__(self, schema: type):
+        self.schema = schema
+        self.model_adapter = TypeAdapter(schema)
+        self.field_adapters: Dict[str, TypeAdapter] = {}
+        self.allowed_values: Dict[str, List[str]] = {}
+        self.required = set()
+        for name, field in schema.model_fields.items():
+            self.field_adapters[name] = TypeAdapter(field.rebuild_annotation())
+            if field.is_required():
+                self.required.add(name)
+            options = self._string_options(field.annotation)
+            if options:
+                self.allowed_values[name] = options
+        self.forbid_extra = schema.model_config.get("extra") == "forbid"
+
+    @staticmethod
+    def _string_options(annotation) -> Optional[List[str]]:
+        """String values an enum/Literal field can take (None for free-form fields)."""
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        if typing.get_origin(annotation) is typing.Union and len(args) == 1:
+            annotation = args[0]
+        if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+            return [str(member.value) for member in annotation]
+        if typing.get_origin(annotation) is typing.Literal:
+            return [str(value) for value in typing.get_args(annotation)]
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def compile_schema(schema: type) -> CompiledSchema:
+    """Return the (cached) compiled validators for a Pydantic output schema."""
+    return CompiledSchema(schema)
+
+
+class IncrementalObjectParser:
+    """
+    Resumable scanner for a streamed top-level JSON object.
+
+    Each feed() scans only the new characters and returns the fields whose
+    values completed in that chunk, validated against the schema. A value that
+    fails validation, an enum string that can no longer become an allowed
+    value, or malformed structure raises SchemaMismatchError immediately.
+    """
+
+    _FENCE = "```json"
+
+    def __init__(self, schema: type):
+        self.compiled = compile_schema(schema)
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._pos = 0
+        self._prefix = ""
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._phase = "key"  # key -> colon -> value -> (comma) key ...
+        self._token_start = 0
+        self._key: Optional[str] = None
+
+    def _fail(self, reason: str, field: Optional[str] = None):
+        raise SchemaMismatchError(field, reason, self.text)
+
+    def _complete_value(self, end: int) -> Dict[str, Any]:
+        raw = self.text[self._token_start:end].strip()
+        key = self._key
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            self._fail(f"is not valid JSON ({raw[:40]!r})", key)
+        adapter = self.compiled.field_adapters.get(key)
+        if adapter is not None:
+            try:
+                value = adapter.validate_python(value)
+            except ValidationError as e:
+                self._fail(e.errors()[0]["msg"], key)
+        self.fields[key] = value
+        self._phase = "comma"
+        return {key: value}
+
+    def _check_partial_string(self):
+        """Abort early when an enum/Literal string value can no longer become an allowed value."""
+        options = self.compiled.allowed_values.get(self._key)
+        if not options or not self._in_string or self._depth != 1 or self._phase != "value":
+            return
+        partial = self.text[self._token_start:].lstrip()[1:]
+        if "\\" in partial:
+            return  # Escapes are rare in enum values; leave them to full validation
+        if not any(option.startswith(partial) for option in options):
+            self._fail(f"'{partial}' cannot become one of {options}", self._key)
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """Consume more streamed text and return newly completed, validated fields."""
+        self.text += chunk
+        completed: Dict[str, Any] = {}
+        text = self.text
+
+        while self._pos < len(text):
+            i, c = self._pos, text[self._pos]
+            self._pos += 1
+
+            if self.done:
+                if not c.isspace() and c != "`":
+                    self._fail("unexpected text after the JSON object")
+                continue
+
+            if not self._started:
+                if c == "{":
+                    self._started, self._depth, self._phase = True, 1, "key"
+                    continue
+                self._prefix += c
+                if not self._FENCE.startswith(self._prefix.strip()):
+                    self._fail("output does not start with a JSON object")
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._phase == "key":
+                        self._key = json.loads(text[self._token_start:i + 1])
+                        if self._key not in self.compiled.field_adapters and self.compiled.forbid_extra:
+                            self._fail("is not a field of the schema", self._key)
+                        self._phase = "colon"
+                continue
+
+            if c.isspace():
+                continue
+
+            if self._depth == 1:
+                if self._phase == "key":
+                    if c == '"':
+                        self._in_string, self._token_start = True, i
+                    elif c == "}" and not self.fields:
+                        self.done = True
+                    else:
+                        self._fail(f"expected a field name, got {c!r}")
+                    continue
+                if self._phase == "colon":
+                    if c != ":":
+                        self._fail(f"expected ':', got {c!r}", self._key)
+                    self._phase, self._token_start = "value", i + 1
+                    continue
+                if self._phase == "comma":
+                    if c == ",":
+                        self._phase = "key"
+                    elif c == "}":
+                        self.done = True
+                    else:
+                        self._fail(f"expected ',' or '}}', got {c!r}")
+                    continue
+                # phase == "value"
+                if c in ",}":
+                    completed.update(self._complete_value(i))
+                    if c == ",":
+                        self._phase = "key"
+                    else:
+                        self.done = True
+                    continue
+
+            if c == '"':
+                self._in_string = True
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+
+        self._check_partial_string()
+        return completed
+
+    def finish(self) -> BaseModel:
+        """Validate the complete object once the stream has ended."""
+        if not self.done:
+            self._fail("output ended before the JSON object was closed")
+        missing = self.compiled.required - set(self.fields)
+        if missing:
+            self._fail(f"missing required fields {sorted(missing)}")
+        try:
+            return self.compiled.model_adapter.validate_python(self.fields)
+        except ValidationError as e:
+            self._fail(str(e))
+
+
+class StreamingSchemaGuard:
+    """
+    after_model_callback that parses an output_schema agent's JSON while it streams.
+
+    Completed fields are reported through on_field(field, value) as soon as they
+    close (e.g. an email's subject before its body is generated). A mismatch raises
+    SchemaMismatchError, which ends the run and stops the model stream.
+
+    schema_for(callback_context) may return a different schema for a given
+    invocation (e.g. a reduced one when some fields are filled in locally);
+    returning None falls back to schema.
+    """
+
+    def __init__(self, schema: type, on_field: Optional[Callable[[str, Any], None]] = None,
+                 schema_for: Optional[Callable[[CallbackContext], Optional[type]]] = None):
+        self.schema = schema
+        self.on_field = on_field
+        self.schema_for = schema_for
+        self._parsers: Dict[tuple, IncrementalObjectParser] = {}
+
+    def _schema(self, callback_context: CallbackContext) -> type:
+        if self.schema_for is not None:
+            return self.schema_for(callback_context) or self.schema
+        return self.schema
+
+    async def after_model_callback(self, callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        parts = llm_response.content.parts if llm_response.content and llm_response.content.parts else []
+        text = "".join(part.text for part in parts if getattr(part, "text", None) and not getattr(part, "thought", False))
+        key = (callback_context.invocation_id, callback_context.agent_name)
+
+        if llm_response.partial:
+            parser = self._parsers.get(key)
+            if parser is None:
+                parser = self._parsers[key] = IncrementalObjectParser(self._schema(callback_context))
+            try:
+                completed = parser.feed(text)
+            except SchemaMismatchError:
+                self._parsers.pop(key, None)
+                raise
+            for field, value in completed.items():
+                if self.on_field:
+                    self.on_field(field, value)
+            return None
+
+        # Final aggregated response: parse it in one go unless the chunks already covered it
+        parser = self._parsers.pop(key, None)
+        if parser is None and text:
+            parser = IncrementalObjectParser(self._schema(callback_context))
+            for field, value in parser.feed(text).items():
+                if self.on_field:
+                    self.on_field(field, value)
+        if parser is not None:
+            parser.finish()
+        return None
+
+
+async def run_structured_turn(runner, user_id, session_id, query, max_retries=1):
+    """
+    Run one turn in streaming mode; on an early schema mismatch, retry with a
+    message that names the offending field. Returns the final response text.
+
+    The retry goes into the same session (so the output_key state lands where
+    the caller reads it): the aborted attempt's user message stays in the
+    history with no model reply after it, as partial events are never
+    appended, and the retry message repeats the query with the rejection
+    reason. Use a fresh session per query when that history must stay clean.
+    """
+    message = query
+    for attempt in range(max_retries + 1):
+        content = types.Content(role="user", parts=[types.Part(text=message)])
+        try:
+            final_text = None
+            async for event in runner.run_async(
+                user_id=user_id,
+                session_id=session_id,
+                new_message=content,
+                run_config=RunConfig(streaming_mode=StreamingMode.SSE)
+            ):
+                if event.is_final_response() and event.content and event.content.parts:
+                    final_text = "".join(p.text for p in event.content.parts if getattr(p, "text", None))
+            return final_text
+        except SchemaMismatchError as e:
+            if attempt == max_retries:
+                raise
+            print(f"\n[schema] Aborted generation early: {e}. Retrying...")
+            message = (
+                f"{query}\n\nYour previous answer was rejected because field '{e.field}' {e.reason}. "
+                "Respond again with only a JSON object that matches the required structure."
+            )
@@ -0,0 +1,70 @@
+"""
+Checks email_agent's near-duplicate cache and its adaptation of cached emails (no model or API key needed).
+
+Run from the 04-structured-outputs directory:
+
+    python -m pytest test_similarity_cache.py
+    python test_similarity_cache.py
+"""
+import asyncio
+from types import SimpleNamespace
+
+from email_agent.similarity_cache import EmailSimilarityCache, SimilarityCache
+from pydantic import BaseModel
+
+
+class Email(BaseModel):
+    subject: str
+    body: str
+
+
+MEETING_EMAIL = {
+    "subject": "Rescheduling our meeting",
+    "body": "Dear John,\n\nCould we move our meeting to Tuesday?\n\nBest regards",
+}
+
+
+def test_substituted_name_is_adapted():
+    cache = SimilarityCache()
+    cache.put("Write a formal email to John to reschedule our meeting to Tuesday", MEETING_EMAIL)
+
+    email = cache.get("Write a formal email to Maria to reschedule our meeting to Tuesday")
+    assert email["body"] == "Dear Maria,\n\nCould we move our meeting to Tuesday?\n\nBest regards"
+    assert cache.stats["similar_hits"] == 1 and cache.stats["adapted"] == 1
+
+
+def test_substitution_missing_from_the_output_is_a_miss():
+    cache = SimilarityCache()
+    cache.put("Write a formal email to John to reschedule our meeting to Tuesday", MEETING_EMAIL)
+
+    # "formal" never appears in the email, so the cached one can't be rewritten into a casual one
+    assert cache.get("Write a casual email to John to reschedule our meeting to Tuesday") is None
+    assert cache.stats["misses"] == 1 and cache.stats["similar_hits"] == 0
+
+
+def test_pending_requests_are_dropped_and_bounded():
+    async def check():
+        cache = EmailSimilarityCache(Email, max_pending=2)
+        request = SimpleNamespace(contents=[SimpleNamespace(role="user", parts=[SimpleNamespace(text="Hi")])])
+
+        def context(invocation_id):
+            return SimpleNamespace(invocation_id=invocation_id, agent_name="email_agent")
+
+        await cache.before_model_callback(context("failed"), request)
+        await cache.on_model_error_callback(context("failed"), request, RuntimeError())
+        await cache.before_model_callback(context("cancelled"), request)
+        await cache.after_agent_callback(context("cancelled"))
+        assert not cache._pending
+
+        for invocation_id in ("a", "b", "c"):
+            await cache.before_model_callback(context(invocation_id), request)
+        assert list(cache._pending) == [("b", "email_agent"), ("c", "email_agent")]
+
+    asyncio.run(check())
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: ok")
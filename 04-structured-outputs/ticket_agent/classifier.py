@@ -0,0 +1,217 @@
+"""
+Lightweight local classifier for ticket priority and category.
+
+Features are hashed word unigrams/bigrams and character 4-grams; each target
+is a softmax linear model trained with mini-batch SGD. Everything is NumPy,
+and a batch of texts is represented as flat (indices, values, row_ids)
+arrays so inference over thousands of tickets is a few vectorized ops.
+
+Train / evaluate from historical tickets (JSONL with a text field and the
+labelled ticket, e.g. batch_runner output):
+
+    python -m ticket_agent.classifier train --data tickets.jsonl --out ticket_classifier.npz
+    python -m ticket_agent.classifier evaluate --model ticket_classifier.npz --data holdout.jsonl
+"""
+import argparse
+import json
+import re
+import zlib
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from .agent import Category, Priority
+
+TARGETS = {
+    "priority": [p.value for p in Priority],
+    "category": [c.value for c in Category],
+}
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def _features(text: str) -> List[str]:
+    words = _WORD_RE.findall(text.lower())
+    features = [f"w:{w}" for w in words]
+    features += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features += [f"c:{padded[i:i + 4]}" for i in range(max(1, len(padded) - 3))]
+    return features
+
+
+def featurize(texts: Iterable[str], n_features: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """
+    Hash a batch of texts into flat sparse arrays.
+
+    Returns (indices, values, row_ids, n_rows): feature index, signed
+    log-scaled count (L2-normalized per row) and owning row for every
+    non-zero entry.
+    """
+    indices, values, row_ids = [], [], []
+    n_rows = 0
+    for row, text in enumerate(texts):
+        n_rows += 1
+        counts: Dict[int, float] = {}
+        for feature in _features(text):
+            # crc32 is stable across processes (unlike hash()), so saved models stay valid
+            h = zlib.crc32(feature.encode("utf-8"))
+            index = h % n_features
+            counts[index] = counts.get(index, 0.0) + (1.0 if h & 0x80000000 else -1.0)
+        if not counts:
+            continue
+        row_values = np.sign(list(counts.values())) * np.log1p(np.abs(list(counts.values())))
+        norm = np.linalg.norm(row_values) or 1.0
+        indices.extend(counts.keys())
+        values.extend(row_values / norm)
+        row_ids.extend([row] * len(counts))
+    return (np.asarray(indices, dtype=np.int64), np.asarray(values, dtype=np.float32),
+            np.asarray(row_ids, dtype=np.int64), n_rows)
+
+
+class TicketClassifier:
+    """Softmax linear models over hashed n-grams, one per target (priority, category)."""
+
+    def __init__(self, n_features: int = 2 ** 18):
+        self.n_features = n_features
+        self.weights = {t: np.zeros((n_features, len(labels)), dtype=np.float32) for t, labels in TARGETS.items()}
+        self.biases = {t: np.zeros(len(labels), dtype=np.float32) for t, labels in TARGETS.items()}
+
+    def _logits(self, target, indices, values, row_ids, n_rows):
+        logits = np.tile(self.biases[target], (n_rows, 1))
+        np.add.at(logits, row_ids, self.weights[target][indices] * values[:, None])
+        return logits
+
+    @staticmethod
+    def _softmax(logits):
+        logits = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_proba_features(self, indices, values, row_ids, n_rows) -> Dict[str, np.ndarray]:
+        """Class probabilities per target for a pre-featurized batch, shape (n_rows, n_classes)."""
+        return {t: self._softmax(self._logits(t, indices, values, row_ids, n_rows)) for t in TARGETS}
+
+    def predict_proba(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        return self.predict_proba_features(*featurize(texts, self.n_features))
+
+    def predict(self, texts: List[str]) -> List[Dict[str, Tuple[str, float]]]:
+        """Top label and its probability per target for each text."""
+        probabilities = self.predict_proba(texts)
+        results = [{} for _ in texts]
+        for target, probs in probabilities.items():
+            best = probs.argmax(axis=1)
+            for row, index in enumerate(best):
+                results[row][target] = (TARGETS[target][index], float(probs[row, index]))
+        return results
+
+    def fit(self, texts: List[str], labels: Dict[str, List[str]], epochs: int = 30, batch_size: int = 32,
+            learning_rate: float = 5.0, l2: float = 1e-5, seed: int = 0):
+        """Mini-batch SGD on the softmax cross-entropy of each target."""
+        rng = np.random.default_rng(seed)
+        indices, values, row_ids, n_rows = featurize(texts, self.n_features)
+        targets = {t: np.array([TARGETS[t].index(label) for label in labels[t]]) for t in TARGETS}
+
+        # Row start offsets so a batch of rows can be sliced out of the flat arrays
+        offsets = np.searchsorted(row_ids, np.arange(n_rows + 1))
+
+        for _ in range(epochs):
+            order = rng.permutation(n_rows)
+            for start in range(0, n_rows, batch_size):
+                batch_rows = order[start:start + batch_size]
+                spans = [np.arange(offsets[r], offsets[r + 1]) for r in batch_rows]
+                entries = np.concatenate(spans) if spans else np.array([], dtype=np.int64)
+                local_rows = np.repeat(np.arange(len(batch_rows)), [len(s) for s in spans])
+                b_indices, b_values = indices[entries], values[entries]
+
+                for target in TARGETS:
+                    probs = self._softmax(self._logits(target, b_indices, b_values, local_rows, len(batch_rows)))
+                    probs[np.arange(len(batch_rows)), targets[target][batch_rows]] -= 1.0
+                    probs /= len(batch_rows)
+                    gradient = b_values[:, None] * probs[local_rows]
+                    weights = self.weights[target]
+                    weights[b_indices] *= (1 - learning_rate * l2)
+                    np.add.at(weights, b_indices, -learning_rate * gradient)
+                    self.biases[target] -= learning_rate * probs.sum(axis=0)
+        return self
+
+    def save(self, path: str):
+        arrays = {"n_features": np.array(self.n_features)}
+        for target in TARGETS:
+            arrays[f"{target}_weights"] = self.weights[target]
+            arrays[f"{target}_bias"] = self.biases[target]
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "TicketClassifier":
+        data = np.load(path)
+        model = cls(n_features=int(data["n_features"]))
+        for target in TARGETS:
+            model.weights[target] = data[f"{target}_weights"]
+            model.biases[target] = data[f"{target}_bias"]
+        return model
+
+
+def load_examples(path: str) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Read labelled tickets from JSONL. Each line needs the ticket text ("text",
+    "prompt" or "description") and the labels, either top-level or under
+    "output"/"ticket" (the shape batch_runner writes).
+    """
+    texts, labels = [], {t: [] for t in TARGETS}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            ticket = row.get("output") or row.get("ticket") or row
+            text = row.get("text") or row.get("prompt") or ticket.get("description")
+            if not text or not all(ticket.get(t) in TARGETS[t] for t in TARGETS):
+                continue
+            texts.append(text)
+            for target in TARGETS:
+                labels[target].append(ticket[target])
+    return texts, labels
+
+
+def evaluate(model: TicketClassifier, texts: List[str], labels: Dict[str, List[str]], threshold: float) -> Dict:
+    """Agreement with the reference labels overall and on the confident subset, plus LLM calls saved."""
+    predictions = model.predict(texts)
+    report = {"examples": len(texts), "threshold": threshold}
+    for target in TARGETS:
+        agree = [p[target][0] == label for p, label in zip(predictions, labels[target])]
+        confident = [p[target][1] >= threshold for p in predictions]
+        confident_agree = [a for a, c in zip(agree, confident) if c]
+        report[target] = {
+            "agreement": round(float(np.mean(agree)), 4) if agree else None,
+            "coverage": round(float(np.mean(confident)), 4) if confident else None,
+            "agreement_when_confident": round(float(np.mean(confident_agree)), 4) if confident_agree else None,
+        }
+    both_confident = sum(all(p[t][1] >= threshold for t in TARGETS) for p in predictions)
+    report["labels_decided_locally"] = round(both_confident / len(texts), 4) if texts else 0.0
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train or evaluate the local ticket classifier")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    train_parser = subparsers.add_parser("train")
+    train_parser.add_argument("--data", required=True)
+    train_parser.add_argument("--out", default="ticket_classifier.npz")
+    train_parser.add_argument("--epochs", type=int, default=30)
+    train_parser.add_argument("--n-features", type=int, default=2 ** 18)
+    eval_parser = subparsers.add_parser("evaluate")
+    eval_parser.add_argument("--model", required=True)
+    eval_parser.add_argument("--data", required=True)
+    eval_parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        texts, labels = load_examples(args.data)
+        model = TicketClassifier(n_features=args.n_features).fit(texts, labels, epochs=args.epochs)
+        model.save(args.out)
+        print(f"Trained on {len(texts)} tickets; saved to {args.out}")
+    else:
+        model = TicketClassifier.load(args.model)
+        texts, labels = load_examples(args.data)
+        print(json.dumps(evaluate(model, texts, labels, args.threshold), indent=2))
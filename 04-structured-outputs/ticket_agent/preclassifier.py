@@ -0,0 +1,165 @@
+import json
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from .classifier import TARGETS, TicketClassifier
+
+
+class TicketText(BaseModel):
+    """The free-text part of a SupportTicket, requested when priority/category are decided locally."""
+    title: str = Field(description="A concise summary of the issue")
+    description: str = Field(description="Detailed description of the problem")
+    steps_to_reproduce: Optional[List[str]] = Field(
+        description="Steps to reproduce the issue (for technical problems)",
+        default=None
+    )
+    customer_contact: Optional[str] = Field(
+        description="Customer's preferred contact method",
+        default=None
+    )
+
+
+class TicketPreClassifier:
+    """
+    Local classification stage in front of ticket_agent.
+
+    When the classifier is confident about both priority and category, the
+    model is only asked for the free-text fields (TicketText) and the labels
+    are merged back into its JSON, or, with bypass_llm=True, the model is not
+    called at all. Otherwise the LLM decides as usual and its labels are
+    compared with the classifier's guess to track agreement.
+
+    Register before_model_callback, after_model_callback (after the schema
+    guard), on_model_error_callback and after_agent_callback; the last two
+    drop the prediction of a turn whose model call failed or was cancelled.
+    """
+
+    def __init__(self, model_path: str, threshold: float = 0.8, bypass_llm: bool = False, max_pending: int = 10_000):
+        self.classifier = TicketClassifier.load(model_path)
+        self.threshold = threshold
+        self.bypass_llm = bypass_llm
+        self.max_pending = max_pending
+        # Predictions per (invocation_id, agent_name) until the model's answer arrives. Bounded:
+        # a turn aborted by the streaming guard ends without any of the callbacks above
+        self._predictions: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self.stats = {
+            "tickets": 0,
+            "decided_locally": 0,
+            "llm_bypassed": 0,
+            "llm_decided": 0,
+            # LLM-decided tickets whose JSON parsed, i.e. the ones agreement is measured on
+            "shadow_compared": 0,
+            "shadow_agreement": {target: 0 for target in TARGETS},
+        }
+
+    @staticmethod
+    def _user_text(llm_request: LlmRequest) -> str:
+        for content in reversed(llm_request.contents):
+            if content.role == "user" and content.parts:
+                text = "".join(p.text for p in content.parts if getattr(p, "text", None))
+                if text:
+                    return text
+        return ""
+
+    def is_local(self, callback_context: CallbackContext) -> bool:
+        """Whether priority/category for this invocation were decided by the classifier."""
+        prediction = self._predictions.get((callback_context.invocation_id, callback_context.agent_name))
+        return bool(prediction and prediction["confident"])
+
+    def schema_for(self, callback_context: CallbackContext):
+        """Schema the model is asked for in this invocation (for StreamingSchemaGuard)."""
+        return TicketText if self.is_local(callback_context) else None
+
+    async def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        text = self._user_text(llm_request)
+        prediction = self.classifier.predict([text])[0]
+        confident = all(prediction[target][1] >= self.threshold for target in TARGETS)
+        labels = {target: prediction[target][0] for target in TARGETS}
+        self._predictions[(callback_context.invocation_id, callback_context.agent_name)] = {
+            "labels": labels, "confident": confident
+        }
+        while len(self._predictions) > self.max_pending:
+            self._predictions.popitem(last=False)
+        self.stats["tickets"] += 1
+
+        if not confident:
+            self.stats["llm_decided"] += 1
+            return None
+
+        self.stats["decided_locally"] += 1
+        if self.bypass_llm:
+            # Nothing left for the model: build the whole ticket locally
+            self.stats["llm_bypassed"] += 1
+            first_sentence = text.strip().split(". ")[0]
+            ticket = {
+                "title": first_sentence[:80],
+                "description": text.strip(),
+                **labels,
+            }
+            self._predictions.pop((callback_context.invocation_id, callback_context.agent_name), None)
+            return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=json.dumps(ticket))]))
+
+        # Ask only for the free-text fields; the labels are merged in after_model_callback
+        llm_request.set_output_schema(TicketText)
+        llm_request.append_instructions([
+            f"The ticket's priority ({labels['priority']}) and category ({labels['category']}) have already been "
+            "assigned. Return only title, description, steps_to_reproduce and customer_contact."
+        ])
+        return None
+
+    async def after_model_callback(self, callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        if llm_response.partial:
+            return None
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        prediction = self._predictions.pop(key, None)
+        if prediction is None or not llm_response.content or not llm_response.content.parts:
+            return None
+
+        text = "".join(p.text for p in llm_response.content.parts if getattr(p, "text", None))
+        try:
+            output = json.loads(text)
+        except json.JSONDecodeError:
+            return None  # Leave malformed output to the agent's own schema validation
+
+        if not prediction["confident"]:
+            # The LLM decided; record whether the classifier would have agreed
+            self.stats["shadow_compared"] += 1
+            for target in TARGETS:
+                if output.get(target) == prediction["labels"][target]:
+                    self.stats["shadow_agreement"][target] += 1
+            return None
+
+        merged = {**output, **prediction["labels"]}
+        return LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=json.dumps(merged))]),
+            usage_metadata=llm_response.usage_metadata
+        )
+
+    async def on_model_error_callback(self, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception) -> Optional[LlmResponse]:
+        self._predictions.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        return None
+
+    async def after_agent_callback(self, callback_context: CallbackContext) -> Optional[types.Content]:
+        # Also runs when the turn is cancelled mid-call
+        self._predictions.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        return None
+
+    def report(self) -> Dict:
+        """Coverage, LLM savings and agreement on the tickets the LLM labelled (with parseable JSON)."""
+        tickets = self.stats["tickets"] or 1
+        compared = self.stats["shadow_compared"] or 1
+        return {
+            **self.stats,
+            "local_coverage": round(self.stats["decided_locally"] / tickets, 4),
+            "llm_calls_saved": self.stats["llm_bypassed"],
+            "shadow_agreement_rate": {
+                target: round(count / compared, 4) for target, count in self.stats["shadow_agreement"].items()
+            },
+        }
@@ -1,22 +1,25 @@
 import os
+import argparse
 import asyncio
 import uuid
 from dotenv import load_dotenv
 
 from google.adk.runners import Runner
-from google.adk.sessions import DatabaseSessionService
 
 from memory_agent.agent import memory_agent
+from memory_agent.prompt_layout import PrefixStabilityMeter
+from session_maintenance import RestoringSessionService
 from utils import call_agent_async
 
 # Load environment variables
 load_dotenv()
 
-async def main():
+async def main(stream=False, prefix_log=None):
     # Create a database session service
-    # This will persist sessions to a SQLite database
+    # This will persist sessions to a SQLite database; sessions moved out by
+    # session_maintenance.py are restored from its archive when requested
     db_url = "sqlite:///./agent_sessions.db"
-    session_service = DatabaseSessionService(db_url=db_url)
+    session_service = RestoringSessionService(db_url=db_url)
     
     # Define initial state for new sessions
     initial_state = {
@@ -35,10 +38,16 @@ async def main():
     )
     
     session_list = existing_sessions.sessions # Extract the actual list
+    archived = session_service.archived_sessions(app_name, user_id)
     if session_list: # Pythonic way to check if a list is non-empty
         # Use the existing session
         session_id = session_list[0].id
         print(f"Continuing existing session: {session_id}")
+    elif archived:
+        # Reading the session restores it from the archive
+        session_id = archived[0]
+        await session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        print(f"Restored archived session: {session_id}")
     else:
         # Create a new session
         session_id = str(uuid.uuid4())
@@ -50,6 +59,12 @@ async def main():
         )
         print(f"Created new session: {session_id}")
     
+    # Optionally measure how much of each model request is a cacheable stable prefix
+    meter = None
+    if prefix_log:
+        meter = PrefixStabilityMeter(prefix_log)
+        memory_agent.before_model_callback = meter.before_model_callback
+
     # Create a runner with our agent and session service
     runner = Runner(
         agent=memory_agent,
@@ -66,10 +81,17 @@ async def main():
         
         if query.lower() in ["exit", "quit"]:
             print("Goodbye! Your reminders have been saved to the database.")
+            if meter:
+                print(f"Prompt prefix stability: {meter.report()}")
             break
         
         # Process the user input
-        await call_agent_async(runner, app_name, user_id, session_id, query)
+        await call_agent_async(runner, app_name, user_id, session_id, query, stream=stream)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Reminder agent with persistent sessions")
+    parser.add_argument("--stream", action="store_true", help="Stream the response text as it is generated")
+    parser.add_argument("--prefix-log", default=None, metavar="FILE",
+                        help="Record the stable-prefix fraction of every model request as JSONL")
+    args = parser.parse_args()
+    asyncio.run(main(stream=args.stream, prefix_log=args.prefix_log))
\ No newline at end of file
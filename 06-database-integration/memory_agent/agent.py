@@ -1,6 +1,8 @@
 from google.adk import Agent
 from google.adk.tools import FunctionTool
 
+from .prompt_layout import instruction_fields
+
 def add_reminder(reminder_text: str, tool_context) -> dict:
     """
     Adds a new reminder to the user's reminder list.
@@ -113,17 +115,10 @@ def update_username(new_name: str, tool_context) -> dict:
         "message": f"Updated username from '{old_name}' to '{new_name}'"
     }
 
-memory_agent = Agent(
-    name="memory_agent",
-    model="gemini-2.5-flash-lite",
-    description="A reminder assistant that remembers user reminders",
-    instruction="""
+# Kept free of placeholders so it stays byte-identical across requests (see prompt_layout.py)
+STATIC_INSTRUCTION = """
     You are a friendly reminder assistant. You help users manage their reminders and remember important tasks.
     
-    You are working with the following shared state information:
-    - The user's name is: {username}
-    - The user's current reminders: {reminders}
-    
     You have the following capabilities:
     1. Add new reminders
     2. View existing reminders
@@ -138,7 +133,20 @@ memory_agent = Agent(
     
     Always be conversational and friendly when interacting with the user. 
     Confirm actions you've taken, and list the user's reminders when relevant.
-    """,
+    """
+
+# The only part that changes between requests
+STATE_CONTEXT = """
+    You are working with the following shared state information:
+    - The user's name is: {username}
+    - The user's current reminders: {reminders}
+    """
+
+memory_agent = Agent(
+    name="memory_agent",
+    model="gemini-2.5-flash-lite",
+    description="A reminder assistant that remembers user reminders",
+    **instruction_fields(STATIC_INSTRUCTION, STATE_CONTEXT),
     tools=[
         FunctionTool(add_reminder),
         FunctionTool(view_reminders),
@@ -0,0 +1,151 @@
+"""
+Prompt layout for provider-side prompt caching.
+
+Providers cache a prompt's longest byte-identical prefix across requests
+(Gemini's implicit caching needs at least ~1024 tokens of it). With the state
+interpolated in the middle of the instruction, every new reminder or name
+changes the system instruction, the first thing in the request, so nothing
+after it is ever reused.
+
+In the "static_prefix" layout the agent gets a `static_instruction` with no
+placeholders and an `instruction` holding only the state block. ADK then sends
+the static text as the system instruction and the state block as a labelled
+user content placed just before the latest user turn, so the request reads:
+static instruction, tool declarations, older history (all byte-stable), then
+the current state and the new message. The "inline" layout interpolates the
+state into a single system instruction, as before, for comparison. The layout
+is picked with env MEMORY_AGENT_PROMPT_LAYOUT when the agent is imported.
+
+PrefixStabilityMeter measures the result: from before_model_callback it
+compares each request with the previous one of the same session and agent
+and records how much of it is an unchanged prefix.
+
+    meter = PrefixStabilityMeter("prefix.jsonl")
+    agent.before_model_callback = meter.before_model_callback
+    ...
+    print(meter.report())
+"""
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+
+LAYOUTS = ("static_prefix", "inline")
+
+
+def instruction_fields(static_text: str, state_text: str, layout: Optional[str] = None) -> Dict[str, str]:
+    """
+    Agent keyword arguments for the layout (default: env MEMORY_AGENT_PROMPT_LAYOUT,
+    else "static_prefix"). state_text is the only part with {placeholders}.
+    """
+    layout = layout or os.environ.get("MEMORY_AGENT_PROMPT_LAYOUT", "static_prefix")
+    if layout == "static_prefix":
+        return {"static_instruction": static_text, "instruction": state_text}
+    if layout == "inline":
+        return {"instruction": f"{state_text}\n\n{static_text}"}
+    raise ValueError(f"Unknown prompt layout '{layout}' (expected one of {', '.join(LAYOUTS)})")
+
+
+def request_segments(llm_request: LlmRequest) -> List[Tuple[str, bytes]]:
+    """The request in the order a provider sees it: system instruction, tools, then each content."""
+    config = llm_request.config
+    system = config.system_instruction if config else None
+    if system is not None and not isinstance(system, str):
+        system = system.model_dump_json(exclude_none=True)
+    segments = [("system", (system or "").encode("utf-8"))]
+    tools = [tool.model_dump(mode="json", exclude_none=True) for tool in (config.tools or [])] if config else []
+    segments.append(("tools", json.dumps(tools, sort_keys=True).encode("utf-8")))
+    for index, content in enumerate(llm_request.contents or []):
+        segments.append((f"contents[{index}]", content.model_dump_json(exclude_none=True).encode("utf-8")))
+    return segments
+
+
+def _common_prefix(a: bytes, b: bytes) -> int:
+    """Length of the common prefix of a and b (binary search over slice comparisons)."""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+class PrefixStabilityMeter:
+    """Per-request stable-prefix fraction, measured against the previous request of the same session and agent."""
+
+    def __init__(self, log_file: Optional[str] = None, min_cached_tokens: int = 1024, bytes_per_token: float = 4.0,
+                 max_sessions: int = 10_000):
+        self.log_file = log_file
+        self.min_cached_tokens = min_cached_tokens
+        self.bytes_per_token = bytes_per_token
+        self.max_sessions = max_sessions
+        # (session_id, agent_name) -> segments of the last request
+        self._previous: "OrderedDict[Tuple[str, str], List[Tuple[str, bytes]]]" = OrderedDict()
+        self.records: List[Dict[str, Any]] = []
+
+    def measure(self, key: Tuple[str, str], segments: List[Tuple[str, bytes]]) -> Dict[str, Any]:
+        previous = self._previous.pop(key, None)
+        self._previous[key] = segments
+        while len(self._previous) > self.max_sessions:
+            self._previous.popitem(last=False)
+
+        total = sum(len(data) for _, data in segments)
+        stable, diverged_at = 0, None
+        if previous is None:
+            diverged_at = "first_request"
+        else:
+            for index, (name, data) in enumerate(segments):
+                if index < len(previous) and previous[index] == (name, data):
+                    stable += len(data)
+                    continue
+                if index < len(previous):
+                    stable += _common_prefix(previous[index][1], data)
+                    diverged_at = name
+                break
+        stable_tokens = int(stable / self.bytes_per_token)
+        return {
+            "total_bytes": total,
+            "stable_prefix_bytes": stable,
+            "fraction": round(stable / total, 4) if total else 0.0,
+            "diverged_at": diverged_at,
+            "stable_prefix_tokens_est": stable_tokens,
+            "cache_eligible": stable_tokens >= self.min_cached_tokens,
+        }
+
+    def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest):
+        key = (callback_context.session.id, callback_context.agent_name)
+        record = {
+            "timestamp": time.time(),
+            "invocation_id": callback_context.invocation_id,
+            "session_id": key[0],
+            "agent_name": key[1],
+            **self.measure(key, request_segments(llm_request)),
+        }
+        self.records.append(record)
+        if self.log_file:
+            with open(self.log_file, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        return None
+
+    def report(self) -> Dict[str, Any]:
+        """Totals over every request after the first of its session."""
+        repeated = [r for r in self.records if r["diverged_at"] != "first_request"]
+        total = sum(r["total_bytes"] for r in repeated)
+        diverged: Dict[str, int] = {}
+        for r in repeated:
+            # Segment kind only: "contents[3]" and "contents[7]" count together
+            kind = (r["diverged_at"] or "none").split("[")[0]
+            diverged[kind] = diverged.get(kind, 0) + 1
+        return {
+            "requests": len(self.records),
+            "compared": len(repeated),
+            "stable_fraction": round(sum(r["stable_prefix_bytes"] for r in repeated) / total, 4) if total else None,
+            "cache_eligible": sum(r["cache_eligible"] for r in repeated),
+            "diverged_at": diverged,
+        }
@@ -0,0 +1,410 @@
+"""
+Compaction and archival for the agent_sessions.db session store.
+
+DatabaseSessionService keeps every event of every session, but the session
+state it serves lives in the sessions table (every event's state delta is
+applied there when the event is appended), so old events are only history.
+Maintenance works on the SQLite file directly, next to a running agent:
+
+- compact: for sessions idle longer than `compact_after_days`, all but the
+  last `keep_invocations` invocations are folded into a session_snapshots row
+  (the session state at that point plus the folded events, compressed) and
+  removed from the events table. Whole invocations are kept, so a function
+  call is never separated from its response.
+- archive: sessions idle longer than `archive_after_days` (with their events
+  and snapshots) are written to one compressed file each under `archive_dir`
+  and deleted from the database. restore() puts them back, and
+  RestoringSessionService does that on demand when an archived session is
+  requested.
+- vacuum: freed pages are returned to the filesystem with
+  `PRAGMA incremental_vacuum`, a few hundred pages per transaction. That needs
+  auto_vacuum=INCREMENTAL, which an existing database only gets with one full
+  VACUUM (enable_incremental_vacuum(), or --enable-incremental-vacuum once).
+
+To run online, the database is switched to WAL (readers never wait for the
+maintenance writer), each session is handled in its own short transaction,
+and a session whose update_time changed since it was selected is skipped
+rather than locked. Tables are read by column introspection, so both ADK's
+current schema (event_data JSON) and the older per-field one work.
+
+    python session_maintenance.py run --compact-after-days 7 --archive-after-days 30
+    python session_maintenance.py restore SESSION_ID
+    python session_maintenance.py status
+"""
+import argparse
+import asyncio
+import base64
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from google.adk.sessions import DatabaseSessionService
+from sqlalchemy.engine import make_url
+
+try:
+    import zstandard
+except ImportError:  # gzip is used instead
+    zstandard = None
+
+DEFAULT_DB = "agent_sessions.db"
+DEFAULT_ARCHIVE_DIR = "session_archive"
+ARCHIVE_FORMAT = 1
+
+SNAPSHOT_TABLE = """
+CREATE TABLE IF NOT EXISTS session_snapshots (
+    app_name VARCHAR(128) NOT NULL,
+    user_id VARCHAR(128) NOT NULL,
+    session_id VARCHAR(128) NOT NULL,
+    created TEXT NOT NULL,
+    through_timestamp TEXT NOT NULL,
+    event_count INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    events BLOB NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, created)
+)
+"""
+
+
+def _utc_text(moment: datetime) -> str:
+    """A UTC time in the naive text form ADK stores in SQLite."""
+    return moment.astimezone(timezone.utc).replace(tzinfo=None).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _compress(data: bytes) -> Tuple[bytes, str]:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=9).compress(data), "zst"
+    return gzip.compress(data), "gz"
+
+
+def _decompress(data: bytes) -> bytes:
+    if data[:2] == b"\x1f\x8b":
+        return gzip.decompress(data)
+    if zstandard is None:
+        raise RuntimeError("archive is zstd-compressed; install the 'zstandard' package")
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def _to_json(value: Any) -> Any:
+    # The older schema stores pickled EventActions as a BLOB
+    return {"__bytes__": base64.b64encode(value).decode("ascii")} if isinstance(value, bytes) else value
+
+
+def _from_json(value: Any) -> Any:
+    return base64.b64decode(value["__bytes__"]) if isinstance(value, dict) and "__bytes__" in value else value
+
+
+def _pack_rows(rows: List[Dict[str, Any]]) -> bytes:
+    return _compress(json.dumps([{k: _to_json(v) for k, v in row.items()} for row in rows]).encode("utf-8"))[0]
+
+
+def _archive_base(archive_dir: Path, app_name: str, user_id: str) -> Path:
+    return Path(archive_dir) / quote(app_name, safe="") / quote(user_id, safe="")
+
+
+def archive_path(archive_dir: Path, app_name: str, user_id: str, session_id: str) -> Optional[Path]:
+    """The archive file of a session, if it was archived."""
+    for suffix in ("zst", "gz"):
+        path = _archive_base(archive_dir, app_name, user_id) / f"{quote(session_id, safe='')}.json.{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def archived_sessions(archive_dir: Path, app_name: str, user_id: str) -> List[str]:
+    """Ids of a user's archived sessions, most recently archived first."""
+    base = _archive_base(archive_dir, app_name, user_id)
+    paths = sorted(base.glob("*.json.*"), key=lambda p: p.stat().st_mtime, reverse=True) if base.exists() else []
+    return [unquote(p.name.rsplit(".json.", 1)[0]) for p in paths]
+
+
+class SessionMaintenance:
+    """Compaction, archival, restore and incremental vacuum for one session database (see module docstring)."""
+
+    def __init__(self, db_path: str = DEFAULT_DB, archive_dir: str = DEFAULT_ARCHIVE_DIR, busy_timeout_ms: int = 5000):
+        self.db_path = db_path
+        self.archive_dir = Path(archive_dir)
+        # Autocommit: transactions are opened explicitly and kept short
+        self.conn = sqlite3.connect(db_path, timeout=busy_timeout_ms / 1000, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(SNAPSHOT_TABLE)
+        self._columns: Dict[str, List[str]] = {}
+
+    def close(self):
+        self.conn.close()
+
+    def columns(self, table: str) -> List[str]:
+        if table not in self._columns:
+            self._columns[table] = [row["name"] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+        return self._columns[table]
+
+    def _rows(self, sql: str, *params) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def _insert(self, table: str, rows: List[Dict[str, Any]]):
+        columns = [c for c in self.columns(table) if rows and c in rows[0]]
+        if not columns:
+            return
+        placeholders = ", ".join("?" for _ in columns)
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+            [[row.get(c) for c in columns] for row in rows],
+        )
+
+    def _idle_sessions(self, idle_days: float) -> Iterator[Dict[str, Any]]:
+        cutoff = _utc_text(datetime.now(timezone.utc) - timedelta(days=idle_days))
+        yield from self._rows(
+            "SELECT app_name, user_id, id, update_time FROM sessions WHERE update_time < ? ORDER BY update_time", cutoff)
+
+    def _begin_if_unchanged(self, session: Dict[str, Any]) -> bool:
+        """Open a write transaction if the session wasn't touched since it was selected."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        current = self.conn.execute(
+            "SELECT update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+            (session["app_name"], session["user_id"], session["id"]),
+        ).fetchone()
+        if current is None or current["update_time"] != session["update_time"]:
+            self.conn.execute("ROLLBACK")
+            return False
+        return True
+
+    def size(self) -> Dict[str, int]:
+        page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        return {
+            "db_bytes": self.conn.execute("PRAGMA page_count").fetchone()[0] * page_size,
+            "free_bytes": self.conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size,
+        }
+
+    def compact(self, idle_days: float, keep_invocations: int = 10, report: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Fold all but the last keep_invocations invocations of each idle session into a snapshot."""
+        report = report if report is not None else {}
+        for key in ("sessions_compacted", "events_folded", "skipped_active"):
+            report.setdefault(key, 0)
+        for session in self._idle_sessions(idle_days):
+            where = "app_name = ? AND user_id = ? AND session_id = ?"
+            ids = (session["app_name"], session["user_id"], session["id"])
+            invocations = self._rows(
+                f"SELECT invocation_id FROM events WHERE {where} GROUP BY invocation_id "
+                "ORDER BY MAX(timestamp) DESC", *ids)
+            if len(invocations) <= keep_invocations:
+                continue
+            if not self._begin_if_unchanged(session):
+                report["skipped_active"] += 1
+                continue
+            try:
+                kept = [row["invocation_id"] for row in invocations[:keep_invocations]]
+                kept_sql = ", ".join("?" for _ in kept)
+                folded = self._rows(
+                    f"SELECT * FROM events WHERE {where} AND invocation_id NOT IN ({kept_sql}) ORDER BY timestamp, id",
+                    *ids, *kept)
+                state = self.conn.execute(
+                    "SELECT state FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", ids).fetchone()["state"]
+                self.conn.execute(
+                    "INSERT INTO session_snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*ids, _utc_text(datetime.now(timezone.utc)), folded[-1]["timestamp"], len(folded), state,
+                     _pack_rows(folded)),
+                )
+                self.conn.execute(f"DELETE FROM events WHERE {where} AND invocation_id NOT IN ({kept_sql})", (*ids, *kept))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            report["sessions_compacted"] += 1
+            report["events_folded"] += len(folded)
+        return report
+
+    def archive(self, idle_days: float, report: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Move each idle session, with its events and snapshots, to a compressed archive file."""
+        report = report if report is not None else {}
+        for key in ("sessions_archived", "events_archived", "archive_bytes", "skipped_active"):
+            report.setdefault(key, 0)
+        for session in self._idle_sessions(idle_days):
+            ids = (session["app_name"], session["user_id"], session["id"])
+            where = "app_name = ? AND user_id = ? AND session_id = ?"
+            # Read and write the file outside the transaction; the delete re-checks update_time
+            tables = {
+                "sessions": self._rows("SELECT * FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", *ids),
+                "events": self._rows(f"SELECT * FROM events WHERE {where}", *ids),
+                "session_snapshots": self._rows(f"SELECT * FROM session_snapshots WHERE {where}", *ids),
+            }
+            payload = {
+                "format": ARCHIVE_FORMAT,
+                "archived_at": _utc_text(datetime.now(timezone.utc)),
+                "tables": {name: [{k: _to_json(v) for k, v in row.items()} for row in rows] for name, rows in tables.items()},
+            }
+            data, suffix = _compress(json.dumps(payload).encode("utf-8"))
+            base = _archive_base(self.archive_dir, ids[0], ids[1])
+            base.mkdir(parents=True, exist_ok=True)
+            path = base / f"{quote(ids[2], safe='')}.json.{suffix}"
+            fd, tmp_path = tempfile.mkstemp(dir=base, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+
+            if not self._begin_if_unchanged(session):
+                path.unlink()
+                report["skipped_active"] += 1
+                continue
+            try:
+                self.conn.execute(f"DELETE FROM events WHERE {where}", ids)
+                self.conn.execute(f"DELETE FROM session_snapshots WHERE {where}", ids)
+                self.conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", ids)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                path.unlink()
+                raise
+            report["sessions_archived"] += 1
+            report["events_archived"] += len(tables["events"])
+            report["archive_bytes"] += len(data)
+        return report
+
+    def restore(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """Put an archived session back into the database and remove its archive file."""
+        path = archive_path(self.archive_dir, app_name, user_id, session_id)
+        if path is None:
+            return False
+        payload = json.loads(_decompress(path.read_bytes()))
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Sessions first: events reference them
+            for table in ("sessions", "events", "session_snapshots"):
+                self._insert(table, [{k: _from_json(v) for k, v in row.items()} for row in payload["tables"].get(table, [])])
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        path.unlink()
+        return True
+
+    def find_session(self, session_id: str) -> Optional[Tuple[str, str]]:
+        """(app_name, user_id) of an archived session, searching the whole archive."""
+        for path in self.archive_dir.glob(f"*/*/{quote(session_id, safe='')}.json.*"):
+            return unquote(path.parent.parent.name), unquote(path.parent.name)
+        return None
+
+    def incremental_vacuum(self, step_pages: int = 256, max_pages: Optional[int] = None) -> int:
+        """Release free pages a few at a time so writers can interleave; returns pages released."""
+        if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        initial = free = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free and (max_pages is None or initial - free < max_pages):
+            step = min(step_pages, free, max_pages - (initial - free) if max_pages is not None else free)
+            self.conn.execute(f"PRAGMA incremental_vacuum({step})").fetchall()
+            remaining = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= free:
+                break
+            free = remaining
+        self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        return initial - free
+
+    def enable_incremental_vacuum(self):
+        """Switch the database to auto_vacuum=INCREMENTAL. Rewrites the whole file once and blocks writers meanwhile."""
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.conn.execute("VACUUM")
+
+    def run(self, compact_after_days: Optional[float] = 7, keep_invocations: int = 10,
+            archive_after_days: Optional[float] = 30, vacuum: bool = True) -> Dict[str, Any]:
+        """One maintenance pass: archive, then compact, then vacuum; returns what changed and the space reclaimed."""
+        started = time.perf_counter()
+        before = self.size()
+        report: Dict[str, Any] = {}
+        if archive_after_days is not None:
+            self.archive(archive_after_days, report)
+        if compact_after_days is not None:
+            self.compact(compact_after_days, keep_invocations, report)
+        if vacuum:
+            report["vacuumed_pages"] = self.incremental_vacuum()
+            report["incremental_vacuum"] = self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        after = self.size()
+        report.update({
+            "db_bytes_before": before["db_bytes"],
+            "db_bytes_after": after["db_bytes"],
+            "reclaimed_bytes": before["db_bytes"] - after["db_bytes"],
+            # Free pages are reused by new events even when they aren't returned to the filesystem
+            "free_bytes": after["free_bytes"],
+            "seconds": round(time.perf_counter() - started, 3),
+        })
+        return report
+
+    def status(self) -> Dict[str, Any]:
+        archived = list(self.archive_dir.glob("*/*/*.json.*")) if self.archive_dir.exists() else []
+        return {
+            **self.size(),
+            "sessions": self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0],
+            "events": self.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0],
+            "snapshots": self.conn.execute("SELECT COUNT(*) FROM session_snapshots").fetchone()[0],
+            "archived_sessions": len(archived),
+            "archive_bytes": sum(p.stat().st_size for p in archived),
+            "journal_mode": self.conn.execute("PRAGMA journal_mode").fetchone()[0],
+            "incremental_vacuum": self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2,
+        }
+
+
+class RestoringSessionService(DatabaseSessionService):
+    """DatabaseSessionService that restores an archived session when it is requested."""
+
+    def __init__(self, db_url: str, archive_dir: str = DEFAULT_ARCHIVE_DIR, **kwargs):
+        super().__init__(db_url=db_url, **kwargs)
+        self.db_path = make_url(db_url).database
+        self.archive_dir = archive_dir
+
+    def _restore(self, app_name: str, user_id: str, session_id: str) -> bool:
+        maintenance = SessionMaintenance(self.db_path, self.archive_dir)
+        try:
+            return maintenance.restore(app_name, user_id, session_id)
+        finally:
+            maintenance.close()
+
+    def archived_sessions(self, app_name: str, user_id: str) -> List[str]:
+        return archived_sessions(self.archive_dir, app_name, user_id)
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str, config=None):
+        session = await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+        if (session is None and archive_path(self.archive_dir, app_name, user_id, session_id)
+                and await asyncio.to_thread(self._restore, app_name, user_id, session_id)):
+            session = await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+        return session
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact, archive and vacuum the session database")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--archive-dir", default=DEFAULT_ARCHIVE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="One maintenance pass")
+    run_parser.add_argument("--compact-after-days", type=float, default=7.0)
+    run_parser.add_argument("--keep-invocations", type=int, default=10, help="Invocations kept per compacted session")
+    run_parser.add_argument("--archive-after-days", type=float, default=30.0)
+    run_parser.add_argument("--no-vacuum", action="store_true")
+    run_parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                            help="Convert the database to auto_vacuum=INCREMENTAL first (one full VACUUM)")
+    restore_parser = commands.add_parser("restore", help="Restore an archived session")
+    restore_parser.add_argument("session_id")
+    commands.add_parser("status", help="Database and archive sizes")
+    args = parser.parse_args()
+
+    maintenance = SessionMaintenance(args.db, args.archive_dir)
+    try:
+        if args.command == "run":
+            if args.enable_incremental_vacuum:
+                maintenance.enable_incremental_vacuum()
+            result = maintenance.run(args.compact_after_days, args.keep_invocations, args.archive_after_days,
+                                     vacuum=not args.no_vacuum)
+        elif args.command == "restore":
+            owner = maintenance.find_session(args.session_id)
+            result = {"restored": bool(owner) and maintenance.restore(*owner, args.session_id)}
+        else:
+            result = maintenance.status()
+        print(json.dumps(result, indent=2))
+    finally:
+        maintenance.close()
@@ -2,11 +2,24 @@ import asyncio
 # from google.generativeai.types import content_types
 # from google.generativeai.types.content_types import Part
 
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.genai import types
 
 
-async def call_agent_async(runner, app_name,  user_id, session_id, query):
-    """Process a user query through the agent asynchronously."""
+def get_response_text(content):
+    """Join the text of all parts in a content (ignoring function calls etc.)."""
+    if not content or not content.parts:
+        return None
+    texts = [part.text for part in content.parts if getattr(part, "text", None)]
+    return "".join(texts) if texts else None
+
+
+async def call_agent_async(runner, app_name,  user_id, session_id, query, stream=False):
+    """Process a user query through the agent asynchronously.
+
+    With stream=True the model is called in SSE mode and partial text is
+    printed as it arrives instead of waiting for the final response.
+    """
     print(f"\nUser: {query}")
     
     # Create content from the user query
@@ -23,21 +36,40 @@ async def call_agent_async(runner, app_name,  user_id, session_id, query):
     )
     print(f"\nState before processing: {session.state}")
     
+    # Request partial events when streaming
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE if stream else StreamingMode.NONE)
+    
     # Run the agent with the user query
     response = runner.run_async(
         user_id=user_id,
         session_id=session_id,
-        new_message=content
+        new_message=content,
+        run_config=run_config
     )
     
     # Process the response
     final_response_text = None
+    streamed_text = False
     
     async for event in response:
+        if event.partial:
+            # Render partial text incrementally as it arrives
+            chunk = get_response_text(event.content)
+            if chunk:
+                if not streamed_text:
+                    print("Final response: ", end="", flush=True)
+                    streamed_text = True
+                print(chunk, end="", flush=True)
+            continue
+        if streamed_text:
+            # A complete event closes the current streamed line
+            print()
+            streamed_text = False
         if event.is_final_response():
-            if event.content and event.content.parts:
-                print("Final response:", event.content.parts[0].text)
-                final_response_text = event.content.parts[0].text
+            final_response_text = get_response_text(event.content)
+            if final_response_text:
+                if not stream:
+                    print("Final response:", final_response_text)
                 break
     
     # Get updated session to see state after processing
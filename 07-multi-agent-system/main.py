@@ -1,6 +1,9 @@
 import os
+import sys
+import argparse
 import asyncio
 import uuid
+from pathlib import Path
 from dotenv import load_dotenv
 
 from google.adk.runners import Runner
@@ -19,7 +22,24 @@ from utils import process_user_input
 # Load environment variables
 load_dotenv()
 
-async def main():
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+def attach_callback_logger(agent, log_file, profile_rate=None, profile_capture=None):
+    """
+    Log every agent, model and tool event of the agent tree (for 08-callbacks/trace_analysis.py),
+    with CPU and memory profiles of profile_rate of the invocations (see 08-callbacks/profiling.py).
+    """
+    sys.path.insert(0, str(REPO_ROOT / "08-callbacks"))
+    from callback_logger import CallbackLogger
+    profiler = None
+    if profile_rate is not None:
+        from profiling import InvocationProfiler, ProfilingPolicy
+        profiler = InvocationProfiler(ProfilingPolicy(rate=profile_rate, capture=profile_capture))
+    callback_logger = CallbackLogger(log_file, profiler=profiler)
+    callback_logger.attach(agent)
+    return callback_logger
+
+async def main(stream=False, log_file=None, deadline_seconds=None, profile_rate=None, profile_capture=None):
     # Create a session service
     session_service = InMemorySessionService()
     APP_NAME="VacationPlanner"
@@ -33,6 +53,8 @@ async def main():
         session_id=session_id
     )
     
+    callback_logger = attach_callback_logger(vacation_planner, log_file, profile_rate, profile_capture) if log_file else None
+
     # Create a runner with all our agents
     runner = Runner(
         agent=vacation_planner,
@@ -50,12 +72,27 @@ async def main():
         user_input = input("\nYou: ")
         
         if user_input.lower() in ["exit", "quit"]:
+            if callback_logger:
+                callback_logger.log_state_gauge()
             print("Thank you for using the Vacation Planner! Goodbye!")
             break
         
         # Process the user input
-        await process_user_input(runner, user_id, session_id, user_input)
+        await process_user_input(runner, user_id, session_id, user_input, stream=stream,
+                                 deadline_seconds=deadline_seconds, callback_logger=callback_logger)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Vacation planner multi-agent demo")
+    parser.add_argument("--stream", action="store_true", help="Stream the response text as it is generated")
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDS",
+                        help="Cancel a turn (and its sub-agents' pending calls) that takes longer than this")
+    parser.add_argument("--log", metavar="FILE", default=None,
+                        help="Append callback events to a JSON lines file for trace_analysis.py")
+    parser.add_argument("--profile-rate", type=float, default=None,
+                        help="Profile CPU time and memory of this fraction of invocations (with --log); tracemalloc runs while a sampled one is open and slows every allocation meanwhile")
+    parser.add_argument("--profile-capture", choices=["cprofile", "stacks"], default=None,
+                        help="Also write a cProfile dump or sampled stacks per profiled invocation to profiles/")
+    args = parser.parse_args()
+    asyncio.run(main(stream=args.stream, log_file=args.log, deadline_seconds=args.deadline,
+                     profile_rate=args.profile_rate, profile_capture=args.profile_capture))
 
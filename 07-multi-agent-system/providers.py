@@ -0,0 +1,201 @@
+"""
+Seeded local stand-ins for the weather, transport and accommodation providers.
+
+Each call waits for a latency drawn from a configurable distribution, may fail
+at a configured error rate, is rejected once the provider's token-bucket rate
+limit is exhausted, and queues when the provider's concurrency cap is reached.
+The data RNG is seeded from the provider seed and the request, so the same
+request always gets the same answer; latency and failures are also seeded per
+request (and attempt), so a run is reproducible however calls interleave.
+
+By default providers answer instantly and never fail, as the original random
+tools did. Load tests configure them:
+
+    from providers import configure_providers, Latency
+    configure_providers(latency=Latency.parse("lognormal:300:0.8"), error_rate=0.01, rate_limit_per_second=50)
+"""
+import asyncio
+import math
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+
+class ProviderError(Exception):
+    """A failed provider call; status follows HTTP (429 rate limited, 503 unavailable)."""
+
+    def __init__(self, provider: str, status: int, message: str):
+        super().__init__(f"{provider} provider error {status}: {message}")
+        self.provider = provider
+        self.status = status
+
+
+class Latency:
+    """
+    Latency distribution in milliseconds.
+
+    kind is "fixed", "uniform" (median_ms +/- shape * median_ms), "lognormal"
+    (shape is sigma of the underlying normal) or "pareto" (shape is the tail
+    index alpha; lower means heavier tails). Samples are capped at max_ms.
+    """
+
+    KINDS = ("fixed", "uniform", "lognormal", "pareto")
+
+    def __init__(self, kind: str = "fixed", median_ms: float = 0.0, shape: float = 0.5, max_ms: float = 30_000.0):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency kind '{kind}' (expected one of {', '.join(self.KINDS)})")
+        self.kind = kind
+        self.median_ms = median_ms
+        self.shape = shape
+        self.max_ms = max_ms
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        """Parse "kind:median_ms[:shape]", e.g. "lognormal:300:0.8" or "fixed:50"."""
+        kind, *numbers = spec.split(":")
+        return cls(kind, *(float(n) for n in numbers))
+
+    def sample(self, rng: random.Random) -> float:
+        """One latency in seconds."""
+        if self.median_ms <= 0:
+            return 0.0
+        if self.kind == "fixed":
+            ms = self.median_ms
+        elif self.kind == "uniform":
+            ms = self.median_ms * (1 + self.shape * rng.uniform(-1, 1))
+        elif self.kind == "lognormal":
+            ms = self.median_ms * math.exp(rng.gauss(0, self.shape))
+        else:
+            # Pareto with scale chosen so its median is median_ms
+            ms = self.median_ms / 2 ** (1 / self.shape) * rng.paretovariate(self.shape)
+        return min(max(ms, 0.0), self.max_ms) / 1000
+
+    def __repr__(self):
+        return f"Latency({self.kind}:{self.median_ms:g}:{self.shape:g})"
+
+
+class ProviderStats:
+    """Counters and samples of one provider since the last configure()."""
+
+    def __init__(self):
+        self.calls = 0
+        self.ok = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.max_in_flight = 0
+        self.latencies: List[float] = []
+        self.queue_waits: List[float] = []
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "ok": self.ok,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "max_in_flight": self.max_in_flight,
+            "latency_p50_ms": _percentile_ms(self.latencies, 0.50),
+            "latency_p99_ms": _percentile_ms(self.latencies, 0.99),
+            "queue_wait_p50_ms": _percentile_ms(self.queue_waits, 0.50),
+            "queue_wait_p95_ms": _percentile_ms(self.queue_waits, 0.95),
+        }
+
+
+class SimulatedProvider:
+    """One simulated external service (see module docstring)."""
+
+    # Attempt counters are kept per distinct request; past this many they start over
+    MAX_TRACKED_REQUESTS = 100_000
+
+    def __init__(self, name: str, **settings):
+        self.name = name
+        self.configure(**settings)
+
+    def configure(self, latency: Optional[Latency] = None, error_rate: float = 0.0,
+                  rate_limit_per_second: Optional[float] = None, burst: Optional[int] = None,
+                  max_concurrency: Optional[int] = None, seed: int = 0):
+        """Replace the provider's behavior and reset its stats."""
+        self.latency = latency or Latency()
+        self.error_rate = error_rate
+        self.rate_limit_per_second = rate_limit_per_second
+        self.burst = burst or max(1, int(rate_limit_per_second or 1))
+        self.max_concurrency = max_concurrency
+        self.seed = seed
+        self.stats = ProviderStats()
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self._in_flight = 0
+        self._attempts: Dict[str, int] = {}
+
+    def _take_token(self) -> bool:
+        if not self.rate_limit_per_second:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_limit_per_second)
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    async def call(self, *request) -> random.Random:
+        """
+        Simulate one request; returns the RNG to build the response from.
+
+        Raises ProviderError when rate limited (429) or on an injected failure (503).
+        """
+        key = repr(request)
+        if len(self._attempts) >= self.MAX_TRACKED_REQUESTS:
+            self._attempts.clear()
+        attempt = self._attempts[key] = self._attempts.get(key, 0) + 1
+        rng = random.Random(f"{self.seed}:{self.name}:{key}:{attempt}")
+        self.stats.calls += 1
+
+        if not self._take_token():
+            self.stats.rate_limited += 1
+            raise ProviderError(self.name, 429, "rate limit exceeded")
+
+        queued_at = time.perf_counter()
+        if self._semaphore:
+            await self._semaphore.acquire()
+        try:
+            started_at = time.perf_counter()
+            self.stats.queue_waits.append(started_at - queued_at)
+            self._in_flight += 1
+            self.stats.max_in_flight = max(self.stats.max_in_flight, self._in_flight)
+            await asyncio.sleep(self.latency.sample(rng))
+            self.stats.latencies.append(time.perf_counter() - started_at)
+        finally:
+            self._in_flight -= 1
+            if self._semaphore:
+                self._semaphore.release()
+
+        if rng.random() < self.error_rate:
+            self.stats.errors += 1
+            raise ProviderError(self.name, 503, "service unavailable")
+        self.stats.ok += 1
+        return random.Random(f"{self.seed}:{self.name}:{key}")
+
+
+PROVIDERS = {
+    "weather": SimulatedProvider("weather"),
+    "transport": SimulatedProvider("transport"),
+    "accommodation": SimulatedProvider("accommodation"),
+}
+
+
+def configure_providers(**settings):
+    """Apply the same SimulatedProvider.configure() settings to every provider."""
+    for provider in PROVIDERS.values():
+        provider.configure(**settings)
+
+
+def provider_summary() -> Dict[str, Dict[str, Any]]:
+    return {name: provider.stats.summary() for name, provider in PROVIDERS.items()}
+
+
+def _percentile_ms(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
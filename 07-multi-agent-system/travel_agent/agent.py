@@ -1,8 +1,8 @@
 from google.adk import Agent
 from google.adk.tools import FunctionTool
-import random
+from providers import PROVIDERS, ProviderError
 
-def get_transportation_options(origin: str, destination: str, date: str) -> dict:
+async def get_transportation_options(origin: str, destination: str, date: str) -> dict:
     """
     Get available transportation options between two locations.
 
@@ -15,13 +15,17 @@ def get_transportation_options(origin: str, destination: str, date: str) -> dict
         Available transportation options with prices and durations
     """
     # In a real application, this would call a travel API
-    # For this example, we'll generate simulated options
+    # For this example, a simulated provider generates seeded options
+    try:
+        rng = await PROVIDERS["transport"].call(origin, destination, date)
+    except ProviderError as e:
+        return {"status": "error", "error": str(e)}
 
     # Calculate mock distance (just for demonstration)
-    distance = random.randint(100, 2000)
+    distance = rng.randint(100, 2000)
 
     # Generate flight options
-    flight_price = distance * (0.10 + (random.random() * 0.15))
+    flight_price = distance * (0.10 + (rng.random() * 0.15))
     flight_duration = distance / 800 * 60  # minutes
 
     # Generate train options if distance is reasonable
@@ -29,7 +33,7 @@ def get_transportation_options(origin: str, destination: str, date: str) -> dict
     train_price = None
     train_duration = None
     if train_available:
-        train_price = distance * (0.07 + (random.random() * 0.07))
+        train_price = distance * (0.07 + (rng.random() * 0.07))
         train_duration = distance / 120 * 60  # minutes
 
     # Generate car rental option
@@ -64,7 +68,7 @@ def get_transportation_options(origin: str, destination: str, date: str) -> dict
         "data_source": "Simulated travel data (for demo purposes)"
     }
 
-def get_accommodation_options(location: str, check_in: str, check_out: str) -> dict:
+async def get_accommodation_options(location: str, check_in: str, check_out: str) -> dict:
     """
     Get available accommodation options for a specific location and dates.
 
@@ -77,7 +81,11 @@ def get_accommodation_options(location: str, check_in: str, check_out: str) -> d
         Available accommodation options with prices and amenities
     """
     # In a real application, this would call a hotel/accommodation API
-    # For this example, we'll generate simulated options
+    # For this example, a simulated provider generates seeded options
+    try:
+        rng = await PROVIDERS["accommodation"].call(location, check_in, check_out)
+    except ProviderError as e:
+        return {"status": "error", "error": str(e)}
 
     # Mock accommodation types
     hotel_types = [
@@ -89,10 +97,10 @@ def get_accommodation_options(location: str, check_in: str, check_out: str) -> d
     ]
 
     # Generate 3 random accommodation options
-    base_price = 50 + (random.random() * 50)
+    base_price = 50 + (rng.random() * 50)
     accommodations = []
 
-    selected_types = random.sample(hotel_types, 3)
+    selected_types = rng.sample(hotel_types, 3)
     for hotel_type in selected_types:
         price = base_price * hotel_type["price_factor"]
         accommodations.append({
@@ -100,7 +108,7 @@ def get_accommodation_options(location: str, check_in: str, check_out: str) -> d
             "type": hotel_type["name"],
             "price_per_night_usd": round(price, 2),
             "amenities": hotel_type["amenities"],
-            "rating": round(3 + (random.random() * 2), 1),  # 3-5 star rating
+            "rating": round(3 + (rng.random() * 2), 1),  # 3-5 star rating
             "location": f"{location} city center",
             "availability": "Available"
         })
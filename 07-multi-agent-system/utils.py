@@ -1,35 +1,97 @@
+"""
+Turn handling for the interactive demos.
+
+Each lesson directory runs on its own (python main.py from inside it), so
+this module is kept verbatim in both 07-multi-agent-system/utils.py and
+08-callbacks/utils.py rather than imported across lessons; change both
+copies together.
+"""
 import asyncio
+import time
+from contextlib import aclosing
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.genai import types
 
 
-async def process_user_input(runner, user_id, session_id, query):
-    """Process a user query through the agent system."""
-    print(f"\nYou: {query}")
-    
+def get_response_text(content):
+    """Join the text of all parts in a content (ignoring function calls etc.)."""
+    if not content or not content.parts:
+        return None
+    texts = [part.text for part in content.parts if getattr(part, "text", None)]
+    return "".join(texts) if texts else None
+
+
+async def process_user_input(runner, user_id, session_id, query, stream=False, deadline_seconds=None, callback_logger=None):
+    """Process a user query through the agent (or agent system).
+
+    With stream=True the model is called in SSE mode and partial text is
+    printed as it arrives instead of waiting for the final response.
+
+    The event stream is closed as soon as the final response arrives, and
+    after deadline_seconds the turn is cancelled; either way model calls and
+    tools still running, in sub-agents too, are cancelled with it (releasing
+    provider slots), and the optional callback logger records them.
+    """
     # Create content from the user query
     content = types.Content(
         role="user",
         parts=[types.Part(text=query)]
     )
     
-    # Run the agent with the user query
-    response = runner.run_async(
-        user_id=user_id,
-        session_id=session_id,
-        new_message=content
-    )
+    # Request partial events when streaming
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE if stream else StreamingMode.NONE)
 
     # Process the response
     final_response_text = None
-    
-    async for event in response:
-        if event.is_final_response():
-            if event.content and event.content.parts:
-                print("Final response:", event.content.parts[0].text)
-                final_response_text = event.content.parts[0].text
-                break
-
-    # print(f"\nVacation Planner: {final_response_text}")
-    return final_response_text
+    streamed_text = False
+    closed_by = "fallback"
+    # Which runs the fallback below may close: this turn's invocation, or (before its first event) runs started since now
+    invocation_id = None
+    turn_started = time.time()
 
+    try:
+        # timeout() cancels the pending model/tool awaits; aclosing() closes the generator on any exit
+        async with asyncio.timeout(deadline_seconds):
+            async with aclosing(runner.run_async(
+                user_id=user_id,
+                session_id=session_id,
+                new_message=content,
+                run_config=run_config
+            )) as response:
+                async for event in response:
+                    invocation_id = event.invocation_id
+                    if event.partial:
+                        # Render partial text incrementally (sub-agents stream too)
+                        chunk = get_response_text(event.content)
+                        if chunk:
+                            if not streamed_text:
+                                print(f"[{event.author}] ", end="", flush=True)
+                                streamed_text = True
+                            print(chunk, end="", flush=True)
+                        continue
+                    if streamed_text:
+                        # A complete event closes the current streamed line
+                        print()
+                        streamed_text = False
+                    if event.is_final_response():
+                        final_response_text = get_response_text(event.content)
+                        if final_response_text:
+                            if not stream:
+                                print("Final response:", final_response_text)
+                            break
+    except TimeoutError:
+        closed_by = "deadline"
+        print(f"\n[Deadline] No final response within {deadline_seconds:g}s; the turn was cancelled")
+    except asyncio.CancelledError:
+        if callback_logger:
+            callback_logger.log_completion(invocation_id, 'Cancelled', session_id, user_id, closed_by="cancelled",
+                                           started_after=turn_started)
+        raise
 
+    if callback_logger:
+        # Fallback run_end for runs whose after_agent callback didn't fire
+        # (e.g. a coordinator that transferred to a sub-agent)
+        callback_logger.log_completion(invocation_id, final_response_text or 'No response', session_id, user_id,
+                                       closed_by=closed_by, started_after=turn_started)
+
+    return final_response_text
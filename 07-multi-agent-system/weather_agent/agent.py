@@ -1,8 +1,8 @@
 from google.adk import Agent
 from google.adk.tools import FunctionTool
-import random
+from providers import PROVIDERS, ProviderError
 
-def get_weather(location: str, date: str) -> dict:
+async def get_weather(location: str, date: str) -> dict:
     """
     Get weather information for a specific location and date.
 
@@ -14,18 +14,23 @@ def get_weather(location: str, date: str) -> dict:
         Weather information including temperature, conditions, and humidity
     """
     # In a real application, this would call a weather API
-    # For this example, we'll generate random weather data
+    # For this example, a simulated provider generates seeded weather data
+    try:
+        rng = await PROVIDERS["weather"].call(location, date)
+    except ProviderError as e:
+        return {"status": "error", "error": str(e)}
+
     conditions = ["Sunny", "Partly Cloudy", "Cloudy", "Rainy", "Stormy", "Snowy"]
-    temp_celsius = random.randint(5, 35)
+    temp_celsius = rng.randint(5, 35)
     temp_fahrenheit = (temp_celsius * 9/5) + 32
-    humidity = random.randint(30, 90)
+    humidity = rng.randint(30, 90)
 
     return {
         "location": location,
         "date": date,
         "temperature_celsius": temp_celsius,
         "temperature_fahrenheit": round(temp_fahrenheit, 1),
-        "conditions": random.choice(conditions),
+        "conditions": rng.choice(conditions),
         "humidity": humidity,
         "data_source": "Simulated weather data (for demo purposes)"
     }
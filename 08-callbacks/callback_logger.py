@@ -1,25 +1,146 @@
 import time
 import json
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, Tuple
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.tools.tool_context import ToolContext
 from google.adk.models.llm_request import LlmRequest
 from google.adk.models.llm_response import LlmResponse
 from google.genai.types import Content
 
+from cassette import attach_callbacks
+from sampling import InvocationSampler, SamplingPolicy
+
+if TYPE_CHECKING:
+    from log_store import LogStore
+    from profiling import InvocationProfiler
+
+class RunStateTable:
+    """
+    Open agent runs keyed by (invocation_id, agent_name), oldest first.
+
+    A run whose after_agent_callback never fires (a coordinator that transferred
+    to a sub-agent, a cancelled turn) stays open until log_completion closes it,
+    it outlives ttl_seconds, or max_entries pushes it out. Those evictions are
+    counted so leaks show up in gauge() instead of as growing memory.
+    """
+
+    def __init__(self, ttl_seconds: float = 600.0, max_entries: int = 10_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._runs: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._by_session: Dict[str, List[Tuple[str, str]]] = {}
+        self.evicted_expired = 0
+        self.evicted_capacity = 0
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+    def open(self, key: Tuple[str, str], state: Dict[str, Any]):
+        self.sweep(state["start_time"])
+        self.pop(key)  # The same agent running again in one invocation (e.g. inside a loop)
+        while len(self._runs) >= self.max_entries:
+            self._remove(next(iter(self._runs)))
+            self.evicted_capacity += 1
+        self._runs[key] = state
+        self._by_session.setdefault(state["session_id"], []).append(key)
+
+    def get(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        return self._runs.get(key)
+
+    def pop(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        return self._remove(key) if key in self._runs else None
+
+    def _remove(self, key: Tuple[str, str]) -> Dict[str, Any]:
+        state = self._runs.pop(key)
+        keys = self._by_session.get(state["session_id"])
+        if keys is not None:
+            keys.remove(key)
+            if not keys:
+                del self._by_session[state["session_id"]]
+        return state
+
+    def for_session(self, session_id: str, started_after: float = 0.0) -> List[Tuple[str, str]]:
+        """Open runs of a session that started at or after started_after, innermost (most recently started) first."""
+        return [key for key in reversed(self._by_session.get(session_id, []))
+                if self._runs[key]["start_time"] >= started_after]
+
+    def for_invocation(self, invocation_id: str) -> List[Tuple[str, str]]:
+        return [key for key in reversed(self._runs) if key[0] == invocation_id]
+
+    def sweep(self, now: Optional[float] = None):
+        """Drop runs older than the TTL (the table is in start order, so only the front is checked)."""
+        cutoff = (now or time.time()) - self.ttl_seconds
+        while self._runs:
+            key, state = next(iter(self._runs.items()))
+            if state["start_time"] >= cutoff:
+                break
+            self._remove(key)
+            self.evicted_expired += 1
+
+    def gauge(self) -> Dict[str, Any]:
+        oldest = next(iter(self._runs.values()), None)
+        return {
+            "open_runs": len(self._runs),
+            "open_sessions": len(self._by_session),
+            "oldest_open_seconds": time.time() - oldest["start_time"] if oldest else None,
+            "evicted_expired": self.evicted_expired,
+            "evicted_capacity": self.evicted_capacity,
+        }
+
+
 class CallbackLogger:
     """
     ADK-compliant Callback handler that logs details at each stage of the agent lifecycle.
+
+    With a SamplingPolicy only a sample of invocations is written (see sampling.py);
+    aggregate counters over all invocations are written as "sampling_stats" lines.
+    With a LogStore entries go to rotated, indexed binary segments (see log_store.py)
+    instead of the JSON lines file. With an InvocationProfiler, sampled invocations
+    also get "profile_span" and "profile" entries with CPU and memory (see profiling.py).
+
+    One instance can serve many concurrent runs: each agent run's state (start
+    time, first token) is keyed by (invocation_id, agent_name) in a bounded
+    RunStateTable, which every callback context carries.
     """
     
-    def __init__(self, log_file: str):
+    def __init__(self, log_file: str, sampling: Optional[SamplingPolicy] = None, store: Optional["LogStore"] = None,
+                 state_ttl_seconds: float = 600.0, max_open_runs: int = 10_000,
+                 profiler: Optional["InvocationProfiler"] = None):
         self.log_file = log_file
-        # Store state by invocation ID for tracking execution details like start time
-        self.execution_states: Dict[str, Any] = {}
+        self.store = store
+        # Open agent runs, for execution details like start time
+        self.execution_states = RunStateTable(state_ttl_seconds, max_open_runs)
+        self.fallback_closed = 0
+        self.cancelled_work_seconds = 0.0
+        self.sampler = InvocationSampler(sampling) if sampling else None
+        self.profiler = profiler
+
+    def attach(self, agent):
+        """Register the logging callbacks on an agent and all of its sub-agents."""
+        attach_callbacks(
+            agent,
+            before_agent_callback=self.before_agent_callback,
+            after_agent_callback=self.after_agent_callback,
+            before_model_callback=self.before_model_callback,
+            after_model_callback=self.after_model_callback,
+            before_tool_callback=self.before_tool_callback,
+            after_tool_callback=self.after_tool_callback,
+        )
+
+    def _write(self, entries):
+        if not entries:
+            return
+        if self.store is not None:
+            for entry in entries:
+                self.store.append(entry)
+            return
+        with open(self.log_file, "a") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in entries))
 
     def log_event(self, invocation_id: str, event_type: str, details: Optional[Dict[str, Any]] = None):
-        """Log an event to the log file."""
+        """Log an event to the log file (or to the invocation's sampling buffer)."""
         timestamp = datetime.now().isoformat()
         
         log_entry = {
@@ -29,40 +150,128 @@ class CallbackLogger:
             "details": details or {}
         }
         
-        with open(self.log_file, "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
+        if self.sampler is None:
+            self._write([log_entry])
+            return
+
+        self.sampler.observe(invocation_id, event_type, log_entry["details"])
+        entries = None
+        if event_type in ("run_end", "run_end_fallback"):
+            # None while sub-agents of the same invocation are still running
+            entries = self.sampler.finish(invocation_id, log_entry)
+        if entries is None:
+            entries = self.sampler.route(invocation_id, log_entry)
+        self._write(entries)
+        if event_type in ("run_end", "run_end_fallback") and self.sampler.should_emit_stats():
+            self.log_sampling_stats()
+
+    def log_sampling_stats(self):
+        """Write the sampler's counters over all invocations (call on shutdown for the final numbers)."""
+        if self.sampler:
+            self._write([{
+                "timestamp": datetime.now().isoformat(),
+                "invocation_id": None,
+                "event_type": "sampling_stats",
+                "details": self.sampler.stats.summary(self.sampler.policy)
+            }])
+
+    def log_state_gauge(self):
+        """Write the open-run table's size and eviction counts (non-zero evictions mean leaked runs)."""
+        self.execution_states.sweep()
+        self._write([{
+            "timestamp": datetime.now().isoformat(),
+            "invocation_id": None,
+            "event_type": "state_gauge",
+            "details": {**self.execution_states.gauge(), "fallback_closed": self.fallback_closed,
+                        "cancelled_work_seconds": self.cancelled_work_seconds}
+        }])
+
+    def _profile_start(self, invocation_id: str, kind: str, name: str, key: Any):
+        if self.profiler:
+            self.profiler.start(invocation_id, kind, name, key)
 
-    def log_completion(self, invocation_id: Optional[str], final_response_text: str, session_id: str = 'N/A', user_id: str = 'N/A', agent_name: str = 'UnknownAgent'):
-        """Fallback method for run_end logging (call from main.py if callback doesn't fire)."""
+    def _profile_finish(self, invocation_id: str, key: Any, close: bool = False):
+        """Log the span's profile; with close=True also the invocation's (before its final run_end, so both are kept)."""
+        if not self.profiler:
+            return
+        details = self.profiler.finish(invocation_id, key)
+        if details:
+            self.log_event(invocation_id, "profile_span", details)
+        if close:
+            summary = self.profiler.close(invocation_id)
+            if summary:
+                self.log_event(invocation_id, "profile", summary)
+
+    def log_completion(self, invocation_id: Optional[str], final_response_text: str, session_id: str = 'N/A', user_id: str = 'N/A', agent_name: str = 'UnknownAgent',
+                       closed_by: str = "fallback", started_after: Optional[float] = None):
+        """
+        Fallback run_end logging (call from main.py after each turn).
+
+        Closes the runs of the turn's invocation whose after_agent_callback did
+        not fire; does nothing if they all did. When the invocation id is not
+        known (the turn ended before its first event), pass invocation_id=None
+        and the turn's start time as started_after: the session's runs started
+        since then are closed, leaving other turns' runs alone.
+        closed_by says why ("fallback", or "deadline"/"cancelled" for an abandoned
+        turn); model calls and tools still in flight are reported as cancelled work.
+        """
         if invocation_id is None:
-            # Pop the last active state (for demo; assumes single invocation)
-            if self.execution_states:
-                invocation_id = next(iter(self.execution_states))
-                state = self.execution_states.pop(invocation_id)
-                session_id = state.get('session_id', session_id)
-                user_id = state.get('user_id', user_id)
-                agent_name = state.get('agent_name', agent_name)
-                start_time = state['start_time']
-            else:
-                # No state; estimate time as 0
-                start_time = time.time()
-                invocation_id = 'fallback-' + str(int(time.time()))
+            if started_after is None:
+                raise ValueError("log_completion needs the turn's invocation_id or its start time")
+            keys = self.execution_states.for_session(session_id, started_after)
         else:
-            state = self.execution_states.pop(invocation_id, None)
-            start_time = state['start_time'] if state else time.time()
-        
-        execution_time = time.time() - start_time
-        
-        self.log_event(invocation_id, "run_end", {
-            "user_id": user_id,
-            "session_id": session_id,
-            "agent_name": agent_name,
-            "execution_time_seconds": execution_time,
-            "agent_response_length": len(final_response_text),
-            "agent_response_preview": final_response_text[:100]
-        })
-        
-        print(f"[Callback] Run end: {invocation_id[:8]}... Time = {execution_time:.2f} seconds")
+            keys = self.execution_states.for_invocation(invocation_id)
+
+        for key in keys:
+            state = self.execution_states.pop(key)
+            now = time.time()
+            execution_time = now - state['start_time']
+            self.fallback_closed += 1
+            details = {
+                "user_id": state.get('user_id', user_id),
+                "session_id": state.get('session_id', session_id),
+                "agent_name": state.get('agent_name', agent_name),
+                "execution_time_seconds": execution_time,
+                "time_to_first_token_seconds": self._time_to_first_token(state),
+                "agent_response_length": len(final_response_text),
+                "agent_response_preview": final_response_text[:100],
+                "closed_by": closed_by
+            }
+            details.update(self._cancelled_work(state, now))
+            self._profile_finish(key[0], ("agent", key[1]), close=not self.execution_states.for_invocation(key[0]))
+            self.log_event(key[0], "run_end", details)
+            print(f"[Callback] Run end ({closed_by}): {key[0][:8]}... Time = {execution_time:.2f} seconds")
+
+    def current_state(self, callback_context: CallbackContext) -> Optional[Dict[str, Any]]:
+        """State of the agent run a callback belongs to."""
+        return self.execution_states.get((callback_context.invocation_id, callback_context.agent_name))
+
+    def record_first_token(self, invocation_id: str, agent_name: str):
+        """Mark the time the first response text was produced for the agent run (first call wins)."""
+        state = self.execution_states.get((invocation_id, agent_name))
+        if state is not None and state.get('first_token_time') is None:
+            state['first_token_time'] = time.time()
+
+    def _cancelled_work(self, state: Dict[str, Any], now: float) -> Dict[str, Any]:
+        """Model calls and tools of a run that were still in flight when it ended (i.e. were cancelled)."""
+        in_flight = list(state['in_flight'].values())
+        if not in_flight:
+            return {}
+        # Time the abandoned calls had already been running
+        seconds = sum(now - started for _, _, started in in_flight)
+        self.cancelled_work_seconds += seconds
+        return {
+            "cancelled_llm_calls": sum(kind == "llm" for kind, _, _ in in_flight),
+            "cancelled_tools": [name for kind, name, _ in in_flight if kind == "tool"],
+            "cancelled_work_seconds": seconds,
+        }
+
+    @staticmethod
+    def _time_to_first_token(state: Optional[Dict[str, Any]]) -> Optional[float]:
+        """Seconds from run start to the first response text, or None if no text was produced."""
+        if not state or state.get('first_token_time') is None:
+            return None
+        return state['first_token_time'] - state['start_time']
 
     # --- Agent Lifecycle Callbacks ---
 
@@ -73,13 +282,21 @@ class CallbackLogger:
         user_id = callback_context.session.user_id if hasattr(callback_context.session, 'user_id') else 'N/A'
         agent_name = getattr(callback_context, 'agent_name', 'UnknownAgent')
         
-        # Initialize execution tracking
-        self.execution_states[invocation_id] = {
+        if self.sampler:
+            # Head sampling decision (shared by every agent of the invocation)
+            self.sampler.start(invocation_id)
+
+        # Initialize execution tracking, found by this run's later callbacks through (invocation_id, agent_name)
+        self.execution_states.open((invocation_id, agent_name), {
             "start_time": time.time(),
+            "first_token_time": None,
+            # Model calls and tools started but not finished: (kind, name, start time)
+            "in_flight": {},
             "session_id": session_id,
             "user_id": user_id,
             "agent_name": agent_name
-        }
+        })
+        self._profile_start(invocation_id, "agent", agent_name, ("agent", agent_name))
 
         # Extract the user message from user_content in context
         user_message = (
@@ -98,10 +315,11 @@ class CallbackLogger:
         print(f"[Callback] Run start: {invocation_id[:8]}... Message='{user_message[:30]}...'")
         return None  # Proceed normally
 
-    async def after_agent_callback(self, callback_context: CallbackContext, result: Any, **kwargs) -> Optional[Content]:
+    async def after_agent_callback(self, callback_context: CallbackContext, result: Any = None, **kwargs) -> Optional[Content]:
         """Called after the agent completes processing."""
         invocation_id = callback_context.invocation_id
-        state = self.execution_states.pop(invocation_id, None)
+        agent_name = getattr(callback_context, 'agent_name', 'UnknownAgent')
+        state = self.execution_states.pop((invocation_id, agent_name))
 
         # Extract response (handle Content, Event, or other)
         if isinstance(result, Content):
@@ -112,19 +330,28 @@ class CallbackLogger:
             agent_response = str(result)[:100] if result else 'No response'
 
         if state:
-            execution_time = time.time() - state['start_time']
+            now = time.time()
+            execution_time = now - state['start_time']
             session_id = state['session_id']
             user_id = state['user_id']
             agent_name = state['agent_name']
             
-            self.log_event(invocation_id, "run_end", {
+            details = {
                 "user_id": user_id,
                 "session_id": session_id,
                 "agent_name": agent_name,
                 "execution_time_seconds": execution_time,
+                "time_to_first_token_seconds": self._time_to_first_token(state),
                 "agent_response_length": len(agent_response),
                 "agent_response_preview": agent_response[:100]
-            })
+            }
+            # ADK still runs this callback while a cancelled turn unwinds
+            cancelled = self._cancelled_work(state, now)
+            if cancelled:
+                details.update(cancelled, closed_by="cancelled")
+            self._profile_finish(invocation_id, ("agent", agent_name),
+                                 close=not self.execution_states.for_invocation(invocation_id))
+            self.log_event(invocation_id, "run_end", details)
             
             print(f"[Callback] Run end: {invocation_id[:8]}... Time = {execution_time:.2f} seconds")
         else:
@@ -146,6 +373,11 @@ class CallbackLogger:
             for part in content.parts if hasattr(part, 'text')
         )
 
+        state = self.execution_states.get((invocation_id, agent_name))
+        if state is not None:
+            state['in_flight']['llm'] = ("llm", agent_name, time.time())
+        self._profile_start(invocation_id, "llm", agent_name, ("llm", agent_name))
+
         self.log_event(invocation_id, "llm_call", {
             "agent_name": agent_name,
             "prompt_length": prompt_length
@@ -160,14 +392,29 @@ class CallbackLogger:
         agent_name = getattr(callback_context, 'agent_name', 'UnknownAgent')
         
         # Response length: Include str() for non-text parts like function calls
+        parts = llm_response.content.parts if llm_response.content and llm_response.content.parts else []
         response_length = sum(
-            len(str(part)) for part in llm_response.content.parts 
+            len(str(part)) for part in parts
         )
 
-        self.log_event(invocation_id, "llm_response", {
+        # The first response carrying text marks time-to-first-token
+        # (in streaming mode this callback fires for every partial chunk)
+        if any(getattr(part, 'text', None) for part in parts):
+            self.record_first_token(invocation_id, agent_name)
+        state = self.execution_states.get((invocation_id, agent_name))
+        if state is not None and not llm_response.partial:
+            state['in_flight'].pop('llm', None)
+        if not llm_response.partial:
+            self._profile_finish(invocation_id, ("llm", agent_name))
+
+        details = {
             "agent_name": agent_name,
-            "response_length": response_length
-        })
+            "response_length": response_length,
+            "partial": bool(llm_response.partial)
+        }
+        if llm_response.error_code:
+            details["error"] = f"{llm_response.error_code}: {llm_response.error_message}"
+        self.log_event(invocation_id, "llm_response", details)
         
         print(f"[Callback] LLM response: Agent = {agent_name}, Response length = {response_length} chars")
         return None
@@ -185,6 +432,11 @@ class CallbackLogger:
         session_id = tool_context.session.id if hasattr(tool_context.session, 'id') else 'N/A'
         user_id = tool_context.session.user_id if hasattr(tool_context.session, 'user_id') else 'N/A'
 
+        state = self.execution_states.get((invocation_id, agent_name))
+        if state is not None:
+            state['in_flight'][f"tool:{tool_context.function_call_id}"] = ("tool", tool_name, time.time())
+        self._profile_start(invocation_id, "tool", tool_name, ("tool", tool_context.function_call_id))
+
         self.log_event(invocation_id, "tool_call", {
             "user_id": user_id,
             "session_id": session_id,
@@ -208,13 +460,22 @@ class CallbackLogger:
         session_id = tool_context.session.id if hasattr(tool_context.session, 'id') else 'N/A'
         user_id = tool_context.session.user_id if hasattr(tool_context.session, 'user_id') else 'N/A'
 
-        self.log_event(invocation_id, "tool_response", {
+        state = self.execution_states.get((invocation_id, agent_name))
+        if state is not None:
+            state['in_flight'].pop(f"tool:{tool_context.function_call_id}", None)
+        self._profile_finish(invocation_id, ("tool", tool_context.function_call_id))
+
+        details = {
             "user_id": user_id,
             "session_id": session_id,
             "agent_name": agent_name,
             "tool_name": tool_name,
             "tool_response_summary": str(actual_output)[:100]
-        })
+        }
+        # Tools report failures in their result, e.g. get_stock_price's {"error": ...}
+        if isinstance(actual_output, dict) and (actual_output.get("error") or actual_output.get("status") == "error"):
+            details["error"] = str(actual_output.get("error") or actual_output.get("error_message") or "tool error")[:100]
+        self.log_event(invocation_id, "tool_response", details)
         
         print(f"[Callback] Tool response: Agent = {agent_name}, Tool = {tool_name}, Output preview: {str(actual_output)[:50]}")
         return None
\ No newline at end of file
@@ -0,0 +1,235 @@
+import gzip
+import hashlib
+import json
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools.tool_context import ToolContext
+
+CASSETTE_VERSION = 1
+
+# Framework tools that drive control flow (agent transfer) always run for real
+PASSTHROUGH_TOOLS = {"transfer_to_agent"}
+
+
+def _strip_ids(value):
+    """Drop generated function call ids so the same conversation fingerprints identically across runs."""
+    if isinstance(value, dict):
+        return {k: _strip_ids(v) for k, v in value.items() if k != "id"}
+    if isinstance(value, list):
+        return [_strip_ids(v) for v in value]
+    return value
+
+
+def _fingerprint(*values) -> str:
+    encoded = json.dumps(values, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:32]
+
+
+def request_key(agent_name: str, llm_request: LlmRequest) -> str:
+    """Fingerprint of what the model is asked: agent plus conversation contents."""
+    contents = [_strip_ids(c.model_dump(mode="json", exclude_none=True)) for c in llm_request.contents]
+    return _fingerprint(agent_name, contents)
+
+
+def tool_key(tool_name: str, args: Dict[str, Any]) -> str:
+    return _fingerprint(tool_name, args)
+
+
+def attach_callbacks(agent, first: bool = False, **callbacks):
+    """
+    Add callbacks to an agent and all of its sub-agents.
+
+    With first=True they run before existing callbacks, which replay needs so
+    its short-circuit response is used instead of calling the model or tool.
+    """
+    for field, callback in callbacks.items():
+        existing = getattr(agent, field)
+        if existing is None:
+            existing = []
+        elif not isinstance(existing, list):
+            existing = [existing]
+        setattr(agent, field, [callback] + existing if first else existing + [callback])
+    for sub_agent in getattr(agent, "sub_agents", []) or []:
+        attach_callbacks(sub_agent, first=first, **callbacks)
+
+
+class CassetteRecorder:
+    """
+    Records full LLM request/response pairs, tool args/results and user messages
+    per invocation, written as gzip-compressed JSON lines (one interaction per line).
+    """
+
+    def __init__(self, cassette_file: str, initial_state: Optional[Dict[str, Any]] = None):
+        self.cassette_file = cassette_file
+        self._file = gzip.open(cassette_file, "wt", encoding="utf-8")
+        self._pending_requests: Dict[tuple, Dict[str, Any]] = {}
+        self._recorded_invocations = set()
+        self._write({"kind": "header", "version": CASSETTE_VERSION, "created": time.time(),
+                     "initial_state": initial_state or {}})
+
+    def _write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, default=str, separators=(",", ":")) + "\n")
+
+    def close(self):
+        self._file.close()
+
+    def attach(self, agent):
+        """Register recording callbacks on the agent tree."""
+        attach_callbacks(
+            agent,
+            before_agent_callback=self.before_agent_callback,
+            before_model_callback=self.before_model_callback,
+            after_model_callback=self.after_model_callback,
+            after_tool_callback=self.after_tool_callback,
+        )
+
+    async def before_agent_callback(self, callback_context: CallbackContext):
+        """Record the user message once per invocation (sub-agents share it)."""
+        user_content = callback_context.user_content
+        if user_content and callback_context.invocation_id not in self._recorded_invocations:
+            self._recorded_invocations.add(callback_context.invocation_id)
+            self._write({
+                "kind": "user_message",
+                "invocation_id": callback_context.invocation_id,
+                "content": user_content.model_dump(mode="json", exclude_none=True),
+            })
+        return None
+
+    async def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest):
+        agent_name = callback_context.agent_name
+        self._pending_requests[(callback_context.invocation_id, agent_name)] = {
+            "key": request_key(agent_name, llm_request),
+            "request": llm_request.model_dump(mode="json", exclude_none=True, exclude={"tools_dict"}),
+            "started": time.perf_counter(),
+        }
+        return None
+
+    async def after_model_callback(self, callback_context: CallbackContext, llm_response: LlmResponse):
+        # Streaming delivers partial chunks first; the complete response is what gets replayed
+        if llm_response.partial:
+            return None
+        agent_name = callback_context.agent_name
+        pending = self._pending_requests.pop((callback_context.invocation_id, agent_name), None)
+        if pending is None:
+            return None
+        self._write({
+            "kind": "llm",
+            "invocation_id": callback_context.invocation_id,
+            "agent_name": agent_name,
+            "key": pending["key"],
+            "latency_seconds": round(time.perf_counter() - pending["started"], 4),
+            "request": pending["request"],
+            "response": llm_response.model_dump(mode="json", exclude_none=True),
+        })
+        return None
+
+    async def after_tool_callback(self, tool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Any):
+        if tool.name in PASSTHROUGH_TOOLS:
+            return None
+        self._write({
+            "kind": "tool",
+            "invocation_id": tool_context.invocation_id,
+            "agent_name": tool_context.agent_name,
+            "tool_name": tool.name,
+            "key": tool_key(tool.name, args),
+            "args": args,
+            "result": tool_response,
+            # State changes made by the tool, re-applied on replay since the tool won't run
+            "state_delta": dict(tool_context.actions.state_delta),
+        })
+        return None
+
+
+class CassettePlayer:
+    """
+    Serves recorded interactions back through before_model_callback and
+    before_tool_callback short-circuits, so no model or tool is called.
+
+    Interactions are matched by fingerprint first and fall back to recorded
+    order per agent/tool. With strict=True a miss raises instead of letting
+    the real model or tool run.
+    """
+
+    def __init__(self, cassette_file: str, strict: bool = True):
+        self.cassette_file = cassette_file
+        self.strict = strict
+        self.header: Dict[str, Any] = {}
+        self.user_messages: List[Dict[str, Any]] = []
+        self._llm_by_key = defaultdict(deque)
+        self._llm_by_agent = defaultdict(deque)
+        self._tool_by_key = defaultdict(deque)
+        self._tool_by_name = defaultdict(deque)
+        self.stats = {"llm_hits": 0, "llm_order_fallbacks": 0, "tool_hits": 0, "tool_order_fallbacks": 0, "misses": 0}
+        self._load()
+
+    def _load(self):
+        with gzip.open(self.cassette_file, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                kind = record["kind"]
+                if kind == "header":
+                    self.header = record
+                elif kind == "user_message":
+                    self.user_messages.append(record)
+                elif kind == "llm":
+                    self._llm_by_key[record["key"]].append(record)
+                    self._llm_by_agent[record["agent_name"]].append(record)
+                elif kind == "tool":
+                    self._tool_by_key[record["key"]].append(record)
+                    self._tool_by_name[record["tool_name"]].append(record)
+
+    @staticmethod
+    def _take(primary: deque, index: Dict[str, deque], index_field: str):
+        """Pop the next record from primary and drop it from the other lookup index too."""
+        record = primary.popleft()
+        index[record[index_field]].remove(record)
+        return record
+
+    def attach(self, agent):
+        """Register replay callbacks ahead of any existing callbacks on the agent tree."""
+        attach_callbacks(
+            agent,
+            first=True,
+            before_model_callback=self.before_model_callback,
+            before_tool_callback=self.before_tool_callback,
+        )
+
+    async def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest):
+        agent_name = callback_context.agent_name
+        key = request_key(agent_name, llm_request)
+        if self._llm_by_key[key]:
+            record = self._take(self._llm_by_key[key], self._llm_by_agent, "agent_name")
+            self.stats["llm_hits"] += 1
+        elif self._llm_by_agent[agent_name]:
+            record = self._take(self._llm_by_agent[agent_name], self._llm_by_key, "key")
+            self.stats["llm_order_fallbacks"] += 1
+        else:
+            self.stats["misses"] += 1
+            if self.strict:
+                raise LookupError(f"No recorded LLM response left for agent '{agent_name}'")
+            return None
+        return LlmResponse.model_validate(record["response"])
+
+    async def before_tool_callback(self, tool, args: Dict[str, Any], tool_context: ToolContext):
+        if tool.name in PASSTHROUGH_TOOLS:
+            return None
+        key = tool_key(tool.name, args)
+        if self._tool_by_key[key]:
+            record = self._take(self._tool_by_key[key], self._tool_by_name, "tool_name")
+            self.stats["tool_hits"] += 1
+        elif self._tool_by_name[tool.name]:
+            record = self._take(self._tool_by_name[tool.name], self._tool_by_key, "key")
+            self.stats["tool_order_fallbacks"] += 1
+        else:
+            self.stats["misses"] += 1
+            if self.strict:
+                raise LookupError(f"No recorded result left for tool '{tool.name}'")
+            return None
+        for state_key, value in record.get("state_delta", {}).items():
+            tool_context.state[state_key] = value
+        return record["result"]
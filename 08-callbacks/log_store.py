@@ -0,0 +1,344 @@
+"""
+Rotated, indexed binary storage for CallbackLogger entries.
+
+A segment file is a sequence of frames, each `kind (1 byte) | length (4 bytes) | payload`:
+
+    DICT   msgpack list of strings appended to the segment's dictionary
+    BLOCK  one invocation's entries as msgpack (BLOCK_ZSTD: zstd-compressed)
+
+Entries are buffered per invocation until its outermost run_end, so a whole
+trace is one contiguous block. Event types, agent/tool names, user/session ids
+and detail keys are dictionary-encoded. When a segment rotates (by size or
+age) a sidecar `.idx` is written with the dictionary and invocation_id /
+session_id -> block offsets, so LogReader pulls one invocation with a single
+seek into an mmap of the segment.
+
+    python log_store.py convert agent_logs.jsonl --dir logs
+    python log_store.py show --dir logs --invocation e-1234...
+    python log_store.py stats --dir logs
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import msgpack
+
+try:
+    import zstandard
+except ImportError:  # Compression is optional
+    zstandard = None
+
+DICT, BLOCK, BLOCK_ZSTD = 0, 1, 2
+_HEADER = struct.Struct("<BI")
+
+# Detail fields whose values repeat across entries and are dictionary-encoded
+DICT_FIELDS = {"agent_name", "tool_name", "user_id", "session_id"}
+
+
+class SegmentWriter:
+    """Writes one segment file and collects its index."""
+
+    def __init__(self, path: Path, compress: bool):
+        self.path = path
+        self.file = open(path, "ab")
+        self.compressor = zstandard.ZstdCompressor(level=3) if compress else None
+        self.created = time.time()
+        self.strings: List[str] = []
+        self.string_ids: Dict[str, int] = {}
+        self.invocations: Dict[str, List[List[int]]] = {}
+        self.sessions: Dict[str, List[str]] = {}
+        self.first_timestamp = None
+        self.last_timestamp = None
+
+    @property
+    def size(self) -> int:
+        return self.file.tell()
+
+    def _frame(self, kind: int, payload: bytes) -> int:
+        offset = self.file.tell()
+        self.file.write(_HEADER.pack(kind, len(payload)) + payload)
+        return offset
+
+    def _encode_string(self, value: str, new: List[str]) -> int:
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = self.string_ids[value] = len(self.strings)
+            self.strings.append(value)
+            new.append(value)
+        return string_id
+
+    def write_block(self, invocation_id: str, entries: List[Dict[str, Any]]):
+        new_strings: List[str] = []
+        records = []
+        session_ids = set()
+        for entry in entries:
+            details = {}
+            for key, value in (entry.get("details") or {}).items():
+                if key in DICT_FIELDS and isinstance(value, str):
+                    value = self._encode_string(value, new_strings)
+                    if key == "session_id":
+                        session_ids.add(entry["details"][key])
+                details[self._encode_string(key, new_strings)] = value
+            timestamp = _to_epoch(entry.get("timestamp"))
+            records.append([timestamp, self._encode_string(entry["event_type"], new_strings), details])
+            self.first_timestamp = timestamp if self.first_timestamp is None else min(self.first_timestamp, timestamp)
+            self.last_timestamp = timestamp if self.last_timestamp is None else max(self.last_timestamp, timestamp)
+
+        # Dictionary additions go first so the segment stays decodable without its index
+        if new_strings:
+            self._frame(DICT, msgpack.packb(new_strings))
+        payload = msgpack.packb([invocation_id, records], use_bin_type=True)
+        kind = BLOCK
+        if self.compressor:
+            payload, kind = self.compressor.compress(payload), BLOCK_ZSTD
+        offset = self._frame(kind, payload)
+        self.file.flush()
+
+        self.invocations.setdefault(invocation_id, []).append([offset, _HEADER.size + len(payload)])
+        for session_id in session_ids:
+            invocation_ids = self.sessions.setdefault(session_id, [])
+            if invocation_id not in invocation_ids:
+                invocation_ids.append(invocation_id)
+
+    def close(self):
+        """Close the segment and write its sidecar index atomically."""
+        self.file.close()
+        index = {
+            "strings": self.strings,
+            "invocations": self.invocations,
+            "sessions": self.sessions,
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+        }
+        index_path = self.path.with_suffix(".idx")
+        tmp_path = index_path.with_suffix(".idx.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(msgpack.packb(index, use_bin_type=True))
+        os.replace(tmp_path, index_path)
+
+
+class LogStore:
+    """
+    CallbackLogger sink: buffers entries per invocation and writes rotated segments.
+
+    Pass it as CallbackLogger(store=LogStore("logs")) and call close() on shutdown
+    so the last segment gets its index.
+    """
+
+    def __init__(self, directory: str, max_segment_bytes: int = 64 * 1024 * 1024,
+                 max_segment_seconds: float = 3600.0, compress: bool = False, max_pending_invocations: int = 1000):
+        if compress and zstandard is None:
+            raise RuntimeError("compress=True needs the 'zstandard' package (pip install zstandard)")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.compress = compress
+        self.max_pending_invocations = max_pending_invocations
+        # invocation_id -> [open agent runs, buffered entries]
+        self._pending: "OrderedDict[str, List[Any]]" = OrderedDict()
+        existing = sorted(self.directory.glob("segment-*.bin"))
+        self._sequence = int(existing[-1].stem.split("-")[1]) + 1 if existing else 0
+        self._segment: Optional[SegmentWriter] = None
+
+    def _current_segment(self) -> SegmentWriter:
+        segment = self._segment
+        if segment and (segment.size >= self.max_segment_bytes
+                        or time.time() - segment.created >= self.max_segment_seconds):
+            segment.close()
+            segment = None
+        if segment is None:
+            path = self.directory / f"segment-{self._sequence:06d}.bin"
+            self._sequence += 1
+            segment = self._segment = SegmentWriter(path, self.compress)
+        return segment
+
+    def _flush(self, invocation_id: str):
+        _, entries = self._pending.pop(invocation_id)
+        if entries:
+            self._current_segment().write_block(invocation_id, entries)
+
+    def append(self, entry: Dict[str, Any]):
+        invocation_id = entry.get("invocation_id") or "-"
+        pending = self._pending.get(invocation_id)
+        if pending is None:
+            while len(self._pending) >= self.max_pending_invocations:
+                # Runs that never ended are written as they are rather than held forever
+                self._flush(next(iter(self._pending)))
+            pending = self._pending[invocation_id] = [0, []]
+        pending[1].append(entry)
+
+        event_type = entry.get("event_type")
+        if event_type == "run_start":
+            pending[0] += 1
+        elif event_type in ("run_end", "run_end_fallback"):
+            pending[0] -= 1
+        # Write the block once the outermost agent has finished (or for entries outside any run)
+        if pending[0] <= 0:
+            self._flush(invocation_id)
+
+    def close(self):
+        for invocation_id in list(self._pending):
+            self._flush(invocation_id)
+        if self._segment:
+            self._segment.close()
+            self._segment = None
+
+
+class LogReader:
+    """Reads segments through mmap; indexed segments answer lookups with one seek per block."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._segments = []  # (path, index or None)
+        for path in sorted(self.directory.glob("segment-*.bin")):
+            index_path = path.with_suffix(".idx")
+            index = msgpack.unpackb(index_path.read_bytes(), raw=False, strict_map_key=False) if index_path.exists() else None
+            self._segments.append((path, index))
+        self._maps: Dict[Path, mmap.mmap] = {}
+        self._decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+    def _map(self, path: Path):
+        mapped = self._maps.get(path)
+        if mapped is None:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b""
+                mapped = self._maps[path] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapped
+
+    def _decode_frame(self, data, offset: int):
+        kind, length = _HEADER.unpack_from(data, offset)
+        payload = data[offset + _HEADER.size:offset + _HEADER.size + length]
+        if kind == BLOCK_ZSTD:
+            if self._decompressor is None:
+                raise RuntimeError("segment is zstd-compressed; install the 'zstandard' package")
+            payload = self._decompressor.decompress(payload)
+        return kind, msgpack.unpackb(payload, raw=False, strict_map_key=False), offset + _HEADER.size + length
+
+    @staticmethod
+    def _entries(block, strings: List[str]) -> List[Dict[str, Any]]:
+        invocation_id, records = block
+        entries = []
+        for timestamp, event_code, details in records:
+            decoded = {}
+            for key_id, value in details.items():
+                key = strings[key_id]
+                decoded[key] = strings[value] if key in DICT_FIELDS and isinstance(value, int) else value
+            entries.append({
+                "timestamp": datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None,
+                "invocation_id": None if invocation_id == "-" else invocation_id,
+                "event_type": strings[event_code],
+                "details": decoded,
+            })
+        return entries
+
+    def _scan(self, path: Path) -> Iterator[List[Dict[str, Any]]]:
+        """Decode a segment front to back (used for segments without an index, e.g. the active one)."""
+        data = self._map(path)
+        strings: List[str] = []
+        offset = 0
+        while offset + _HEADER.size <= len(data):
+            kind, payload, next_offset = self._decode_frame(data, offset)
+            if next_offset > len(data):
+                break  # Partially written frame at the end of the active segment
+            if kind == DICT:
+                strings.extend(payload)
+            else:
+                yield self._entries(payload, strings)
+            offset = next_offset
+
+    def invocation(self, invocation_id: str) -> List[Dict[str, Any]]:
+        """All entries of one invocation, in order."""
+        entries = []
+        for path, index in self._segments:
+            if index is None:
+                entries.extend(e for block in self._scan(path) for e in block if e["invocation_id"] == invocation_id)
+                continue
+            for offset, _ in index["invocations"].get(invocation_id, []):
+                _, block, _ = self._decode_frame(self._map(path), offset)
+                entries.extend(self._entries(block, index["strings"]))
+        return entries
+
+    def session(self, session_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Entries of every invocation of a session, keyed by invocation id."""
+        invocation_ids = []
+        for path, index in self._segments:
+            if index is None:
+                for block in self._scan(path):
+                    if any(e["details"].get("session_id") == session_id for e in block):
+                        invocation_ids.append(block[0]["invocation_id"])
+            else:
+                invocation_ids.extend(index["sessions"].get(session_id, []))
+        return {invocation_id: self.invocation(invocation_id) for invocation_id in dict.fromkeys(invocation_ids)}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Every entry in every segment (a full scan)."""
+        for path, _ in self._segments:
+            for block in self._scan(path):
+                yield from block
+
+    def stats(self) -> Dict[str, Any]:
+        indexed = [index for _, index in self._segments if index]
+        return {
+            "segments": len(self._segments),
+            "indexed_segments": len(indexed),
+            "bytes": sum(path.stat().st_size for path, _ in self._segments),
+            "indexed_invocations": sum(len(index["invocations"]) for index in indexed),
+            "indexed_sessions": len({s for index in indexed for s in index["sessions"]}),
+        }
+
+    def close(self):
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps.clear()
+
+
+def _to_epoch(timestamp) -> Optional[float]:
+    if timestamp is None or isinstance(timestamp, (int, float)):
+        return timestamp
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert, inspect and query binary CallbackLogger segments")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert_parser = subparsers.add_parser("convert", help="Write an agent_logs.jsonl file into a log store")
+    convert_parser.add_argument("jsonl")
+    convert_parser.add_argument("--dir", required=True)
+    convert_parser.add_argument("--compress", action="store_true")
+    convert_parser.add_argument("--max-segment-mb", type=float, default=64)
+    show_parser = subparsers.add_parser("show", help="Print one invocation or session as JSON lines")
+    show_parser.add_argument("--dir", required=True)
+    group = show_parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--invocation")
+    group.add_argument("--session")
+    stats_parser = subparsers.add_parser("stats")
+    stats_parser.add_argument("--dir", required=True)
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        store = LogStore(args.dir, max_segment_bytes=int(args.max_segment_mb * 1024 * 1024), compress=args.compress)
+        with open(args.jsonl) as f:
+            for line in f:
+                if line.strip():
+                    store.append(json.loads(line))
+        store.close()
+        print(json.dumps(LogReader(args.dir).stats(), indent=2))
+    elif args.command == "show":
+        reader = LogReader(args.dir)
+        if args.invocation:
+            entries = reader.invocation(args.invocation)
+        else:
+            entries = [e for trace in reader.session(args.session).values() for e in trace]
+        for entry in entries:
+            print(json.dumps(entry))
+    else:
+        print(json.dumps(LogReader(args.dir).stats(), indent=2))
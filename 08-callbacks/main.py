@@ -1,4 +1,5 @@
 import os
+import argparse
 import asyncio
 import uuid
 from dotenv import load_dotenv
@@ -7,56 +8,24 @@ from google.adk import Agent
 
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
-from google.genai import types
 
 from logger_agent_base.agent import logger_agent_base
 from callback_logger import CallbackLogger
+from sampling import SamplingPolicy
+from cassette import CassetteRecorder
+from utils import process_user_input
 
 # Load environment variables
 load_dotenv()
 
-async def process_user_input(runner, user_id, session_id, query, callback_logger):
-    """Process a user query through the agent."""
-    # Create content from the user query
-    content = types.Content(
-        role="user",
-        parts=[types.Part(text=query)]
-    )
-    
-    # Run the agent with the user query
-    response = runner.run_async(
-        user_id=user_id,
-        session_id=session_id,
-        new_message=content
-    )
-    
-    # Process the response
-    final_response_text = None
-    
-    async for event in response:
-        if event.is_final_response():
-            if event.content and event.content.parts:
-                final_response_text = event.content.parts[0].text
-                break
-    
-    # Print the final response if it was successfully generated
-    if final_response_text:
-        print("Final response:", final_response_text)
-    
-    # Fallback run_end logging if ADK callback doesn't fire (uses last state)
-    if callback_logger:
-        callback_logger.log_completion(None, final_response_text or 'No response', session_id, user_id, 'logger_agent')
-    
-    return final_response_text
-
-async def main():
+async def main(stream=False, record=None, sampling=None, store=None, deadline_seconds=None, profiler=None):
     # Create log file
     log_file = "agent_logs.jsonl"
     with open(log_file, "w") as f:
         f.write("")
     
     # Create a callback logger
-    callback_logger = CallbackLogger(log_file)
+    callback_logger = CallbackLogger(log_file, sampling=sampling, store=store, profiler=profiler)
     
     # Create agent with bound callbacks from the logger instance
     logger_agent = Agent(
@@ -74,6 +43,12 @@ async def main():
         after_tool_callback=[callback_logger.after_tool_callback]
     )
     
+    # Optionally record every model/tool interaction for offline replay
+    recorder = None
+    if record:
+        recorder = CassetteRecorder(record)
+        recorder.attach(logger_agent)
+    
     # Create a session service
     session_service = InMemorySessionService()
     
@@ -97,15 +72,67 @@ async def main():
     print("Type 'exit' or 'quit' to end the conversation")
     print("--------------------------------------------------------")
     
-    while True:
-        user_input = input("\nYou: ")
-        
-        if user_input.lower() in ["exit", "quit"]:
+    try:
+        while True:
+            try:
+                user_input = input("\nYou: ")
+            except EOFError:
+                break
+
+            if user_input.lower() in ["exit", "quit"]:
+                break
+
+            # Process the user input (pass callback_logger for fallback)
+            await process_user_input(runner, "example_user", session_id, user_input, stream=stream,
+                                     deadline_seconds=deadline_seconds, callback_logger=callback_logger)
+    finally:
+        # Also on EOF and Ctrl-C: a gzip cassette that isn't closed is truncated and can't be replayed
+        if recorder:
+            recorder.close()
+            print(f"Cassette saved to {record}; replay it with replay_cassette.py")
+        callback_logger.log_sampling_stats()
+        callback_logger.log_state_gauge()
+        if store:
+            store.close()
+            print(f"Goodbye! Query the interaction logs with: python log_store.py show --dir {store.directory} --session {session_id}")
+        else:
             print("Goodbye! Check agent_logs.jsonl for the interaction logs.")
-            break
-        
-        # Process the user input (pass callback_logger for fallback)
-        await process_user_input(runner, "example_user", session_id, user_input, callback_logger)
+        if profiler:
+            print(f"Find the heaviest turns with: python profiling.py {store.directory if store else log_file} --top 10")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="ADK callback logging demo")
+    parser.add_argument("--stream", action="store_true", help="Stream the response text as it is generated")
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDS", help="Cancel a turn that takes longer than this")
+    parser.add_argument("--record", metavar="CASSETTE", default=None, help="Record the conversation to a .jsonl.gz cassette")
+    parser.add_argument("--sample-rate", type=float, default=None, help="Log only this fraction of invocations (head sampling)")
+    parser.add_argument("--slow-ms", type=float, default=None, help="Always log invocations slower than this (tail sampling)")
+    parser.add_argument("--keep-tool", action="append", default=[], help="Always log invocations that used this tool (repeatable)")
+    parser.add_argument("--log-dir", default=None, help="Write logs as rotated, indexed binary segments in this directory")
+    parser.add_argument("--compress", action="store_true", help="zstd-compress log segments (with --log-dir)")
+    parser.add_argument("--max-segment-mb", type=float, default=64, help="Rotate log segments at this size (with --log-dir)")
+    parser.add_argument("--profile-rate", type=float, default=None,
+                        help="Record CPU time and memory per agent/model/tool span for this fraction of invocations; tracemalloc runs while a sampled one is open and slows every allocation meanwhile")
+    parser.add_argument("--profile-capture", choices=["cprofile", "stacks"], default=None,
+                        help="Also write a cProfile dump or sampled stacks per profiled invocation (with --profile-rate)")
+    parser.add_argument("--profile-dir", default="profiles", help="Where --profile-capture writes its files")
+    args = parser.parse_args()
+
+    sampling = None
+    if args.sample_rate is not None or args.slow_ms is not None or args.keep_tool:
+        sampling = SamplingPolicy(
+            head_rate=1.0 if args.sample_rate is None else args.sample_rate,
+            slow_seconds=args.slow_ms / 1000 if args.slow_ms is not None else None,
+            keep_tools=args.keep_tool
+        )
+    store = None
+    if args.log_dir:
+        from log_store import LogStore
+        store = LogStore(args.log_dir, max_segment_bytes=int(args.max_segment_mb * 1024 * 1024), compress=args.compress)
+    profiler = None
+    if args.profile_rate is not None:
+        from profiling import InvocationProfiler, ProfilingPolicy
+        profiler = InvocationProfiler(ProfilingPolicy(rate=args.profile_rate, capture=args.profile_capture,
+                                                      output_dir=args.profile_dir))
+    asyncio.run(main(stream=args.stream, record=args.record, sampling=sampling, store=store, deadline_seconds=args.deadline,
+                     profiler=profiler))
\ No newline at end of file
@@ -0,0 +1,286 @@
+"""
+Opt-in CPU and memory profiling of agent, model and tool spans.
+
+For a sampled share of invocations CallbackLogger opens a span in each
+before_* callback and closes it in the matching after_* callback, recording
+the span's CPU time (thread CPU of the event loop), its net tracemalloc
+allocation delta and how far traced memory peaked above its starting level. Each finished
+span is logged as a "profile_span" entry and each finished invocation as a
+"profile" entry with its totals, next to the regular entries. Optionally an
+invocation also gets a cProfile dump (<invocation_id>.pstats) or a sampling
+profiler's collapsed stacks (<invocation_id>.folded, for flamegraph tools)
+under output_dir.
+
+All of these are process-wide measurements: when several invocations run
+concurrently on one event loop, a span's numbers include whatever the other
+tasks did meanwhile (each entry carries how many profiled invocations were
+open). Profile a quiet process, or a single load-test user, for exact numbers.
+Only one invocation at a time gets a cProfile or stack-sampler capture.
+
+tracemalloc is started when the first sampled invocation opens and stopped
+when the last one closes, so unsampled traffic runs untraced between them;
+while it is on, though, every allocation in the process is slowed down by
+the tracing, whether its invocation is sampled or not. If
+something else already started tracemalloc it is left running, but note that
+the profiler calls tracemalloc.reset_peak(), which moves the peak any other
+tracemalloc user in the process would read.
+
+    python main.py --profile-rate 1.0 --profile-capture cprofile
+    python profiling.py agent_logs.jsonl --top 10     # heaviest invocations
+"""
+import argparse
+import cProfile
+import hashlib
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ProfilingPolicy:
+    """Which invocations are profiled, and how."""
+
+    def __init__(self, rate: float = 1.0, trace_memory: bool = True, tracemalloc_frames: int = 1,
+                 capture: Optional[str] = None, sample_interval_seconds: float = 0.005,
+                 output_dir: str = "profiles", max_open_invocations: int = 1000):
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError("rate must be between 0 and 1")
+        if capture not in (None, "cprofile", "stacks"):
+            raise ValueError("capture must be None, 'cprofile' or 'stacks'")
+        self.rate = rate
+        self.trace_memory = trace_memory
+        self.tracemalloc_frames = tracemalloc_frames
+        self.capture = capture
+        self.sample_interval_seconds = sample_interval_seconds
+        self.output_dir = output_dir
+        self.max_open_invocations = max_open_invocations
+
+    def sampled(self, invocation_id: str) -> bool:
+        if self.rate >= 1.0:
+            return True
+        digest = hashlib.blake2b(invocation_id.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2 ** 64 < self.rate
+
+
+class StackSampler:
+    """Samples one thread's Python stack on an interval into collapsed-stack counts."""
+
+    def __init__(self, thread_id: int, interval_seconds: float):
+        self.thread_id = thread_id
+        self.interval_seconds = interval_seconds
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self, path: str):
+        self._stop.set()
+        self._thread.join()
+        with open(path, "w") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Span:
+    """One open profiled span."""
+
+    def __init__(self, kind: str, name: str, traced: Tuple[int, int]):
+        self.kind = kind
+        self.name = name
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.thread_time()
+        self.start_traced = traced[0]
+        self.peak = traced[0]
+
+
+class ProfiledInvocation:
+    def __init__(self, concurrent: int, traced: Tuple[int, int]):
+        self.spans: Dict[Any, Span] = {}
+        self.agents = 0  # Agent spans open (sub-agents share the invocation id)
+        self.concurrent = concurrent
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.thread_time()
+        self.start_traced = traced[0]
+        self.peak = traced[0]
+        self.span_cpu = {"llm": 0.0, "tool": 0.0}
+        self.heaviest_span: Optional[Dict[str, Any]] = None
+        self.capture = None
+        self.capture_path: Optional[str] = None
+
+
+class InvocationProfiler:
+    """
+    Span bookkeeping for CallbackLogger; start()/finish() return the entry
+    details to log (or None for unsampled invocations and unmatched ends).
+    """
+
+    def __init__(self, policy: ProfilingPolicy):
+        self.policy = policy
+        self._invocations: "OrderedDict[str, ProfiledInvocation]" = OrderedDict()
+        self._capturing: Optional[str] = None
+        self._tracing = False  # Whether this profiler started tracemalloc
+        self.evicted = 0
+
+    def _start_tracing(self):
+        if self.policy.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(self.policy.tracemalloc_frames)
+            self._tracing = True
+
+    def _stop_tracing(self):
+        """Stop tracemalloc once no profiled invocation is open (only if this profiler started it)."""
+        if self._tracing and not self._invocations:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def _traced(self) -> Tuple[int, int]:
+        """
+        (current, peak since the last call) traced bytes; every open span's peak
+        is updated. Resets tracemalloc's process-wide peak.
+        """
+        if not tracemalloc.is_tracing():
+            return 0, 0
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for invocation in self._invocations.values():
+            invocation.peak = max(invocation.peak, peak)
+            for span in invocation.spans.values():
+                span.peak = max(span.peak, peak)
+        return current, peak
+
+    def _start_capture(self, invocation_id: str, invocation: ProfiledInvocation):
+        if self.policy.capture is None or self._capturing is not None:
+            return
+        os.makedirs(self.policy.output_dir, exist_ok=True)
+        if self.policy.capture == "cprofile":
+            capture = cProfile.Profile()
+            try:
+                capture.enable()
+            except ValueError:  # Another profiler is active in this thread
+                return
+            invocation.capture_path = os.path.join(self.policy.output_dir, f"{invocation_id}.pstats")
+        else:
+            capture = StackSampler(threading.get_ident(), self.policy.sample_interval_seconds)
+            capture.start()
+            invocation.capture_path = os.path.join(self.policy.output_dir, f"{invocation_id}.folded")
+        invocation.capture = capture
+        self._capturing = invocation_id
+
+    def _stop_capture(self, invocation_id: str, invocation: ProfiledInvocation):
+        if invocation.capture is None:
+            return
+        if isinstance(invocation.capture, cProfile.Profile):
+            invocation.capture.disable()
+            invocation.capture.dump_stats(invocation.capture_path)
+        else:
+            invocation.capture.stop(invocation.capture_path)
+        invocation.capture = None
+        self._capturing = None
+
+    def start(self, invocation_id: str, kind: str, name: str, key: Any):
+        invocation = self._invocations.get(invocation_id)
+        if invocation is None:
+            if kind != "agent" or not self.policy.sampled(invocation_id):
+                return
+            while len(self._invocations) >= self.policy.max_open_invocations:
+                # Invocations whose runs never closed; their numbers are lost
+                oldest, dropped = self._invocations.popitem(last=False)
+                self._stop_capture(oldest, dropped)
+                self.evicted += 1
+            self._start_tracing()
+            invocation = self._invocations[invocation_id] = ProfiledInvocation(len(self._invocations) + 1, self._traced())
+            self._start_capture(invocation_id, invocation)
+        if kind == "agent":
+            invocation.agents += 1
+        invocation.spans[key] = Span(kind, name, self._traced())
+
+    def finish(self, invocation_id: str, key: Any) -> Optional[Dict[str, Any]]:
+        invocation = self._invocations.get(invocation_id)
+        if invocation is None or key not in invocation.spans:
+            return None
+        current, _ = self._traced()  # Before the pop, so the span's peak covers its last stretch
+        span = invocation.spans.pop(key)
+        cpu = time.thread_time() - span.start_cpu
+        details = {
+            "span": span.kind,
+            "name": span.name,
+            "wall_seconds": time.perf_counter() - span.start_wall,
+            "cpu_seconds": cpu,
+            "allocated_bytes": current - span.start_traced,
+            # High-water mark of traced memory above the level the span started at
+            "peak_bytes": span.peak - span.start_traced,
+            "concurrent_invocations": len(self._invocations),
+        }
+        if span.kind == "agent":
+            invocation.agents -= 1
+        else:
+            invocation.span_cpu[span.kind] += cpu
+            if invocation.heaviest_span is None or details["peak_bytes"] > invocation.heaviest_span["peak_bytes"]:
+                invocation.heaviest_span = {"span": span.kind, "name": span.name, "peak_bytes": details["peak_bytes"]}
+        return details
+
+    def close(self, invocation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Summary of a finished invocation; spans still open (a coordinator whose
+        after_agent never fired) are dropped. Returns None if it isn't profiled.
+        """
+        if invocation_id not in self._invocations:
+            return None
+        current, _ = self._traced()
+        invocation = self._invocations.pop(invocation_id)
+        self._stop_capture(invocation_id, invocation)
+        self._stop_tracing()
+        return {
+            "wall_seconds": time.perf_counter() - invocation.start_wall,
+            "cpu_seconds": time.thread_time() - invocation.start_cpu,
+            "llm_cpu_seconds": invocation.span_cpu["llm"],
+            "tool_cpu_seconds": invocation.span_cpu["tool"],
+            "allocated_bytes": current - invocation.start_traced,
+            "peak_bytes": invocation.peak - invocation.start_traced,
+            "unclosed_spans": len(invocation.spans),
+            "heaviest_span": invocation.heaviest_span,
+            "concurrent_invocations": invocation.concurrent,
+            "profile_file": invocation.capture_path,
+        }
+
+    def agents_open(self, invocation_id: str) -> int:
+        invocation = self._invocations.get(invocation_id)
+        return invocation.agents if invocation else 0
+
+
+def heaviest(source: str, top: int = 10, by: str = "peak_bytes") -> List[Tuple[str, Dict[str, Any]]]:
+    """The invocations with the largest `by` total among the "profile" entries of a log."""
+    from trace_analysis import load_invocations
+    profiles = []
+    for invocation_id, entries in load_invocations(source).items():
+        for entry in entries:
+            if entry["event_type"] == "profile":
+                profiles.append((invocation_id, entry["details"]))
+    return sorted(profiles, key=lambda item: item[1].get(by) or 0, reverse=True)[:top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank profiled invocations of a callback log")
+    parser.add_argument("source", help="JSON lines log file or LogStore directory")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--by", default="peak_bytes", choices=["peak_bytes", "allocated_bytes", "cpu_seconds"])
+    args = parser.parse_args()
+
+    for invocation_id, totals in heaviest(args.source, args.top, args.by):
+        heaviest_span = totals.get("heaviest_span") or {}
+        print(f"{invocation_id}  cpu {totals['cpu_seconds'] * 1000:8.1f} ms  allocated {totals['allocated_bytes'] / 1024:9.1f} KiB"
+              f"  peak {totals['peak_bytes'] / 1024:9.1f} KiB  heaviest {heaviest_span.get('span', '-')}:{heaviest_span.get('name', '-')}"
+              f"  {totals.get('profile_file') or ''}")
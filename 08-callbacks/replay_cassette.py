@@ -0,0 +1,114 @@
+"""
+Record a conversation into a cassette, or replay a cassette offline.
+
+Record (calls the real model; one prompt per line in the prompts file):
+
+    python replay_cassette.py record --agent vacation_planner --prompts prompts.txt --cassette trip.jsonl.gz
+
+Replay (no model or tool calls; reports per-turn latency of our own code + ADK):
+
+    python replay_cassette.py replay --agent vacation_planner --cassette trip.jsonl.gz
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from dotenv import load_dotenv
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from cassette import CassettePlayer, CassetteRecorder
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from agent_registry import registry  # noqa: E402  (lives at the repo root)
+
+# Initial session state for agents whose tools expect it; any other registry agent starts empty
+INITIAL_STATE = {
+    "memory_agent": {"username": "User", "reminders": []},
+}
+
+
+def load_agent(name):
+    """Build an agent through the registry, along with the session state it starts from."""
+    return registry.get(name), INITIAL_STATE.get(registry.resolve(name).agent_name, {})
+
+
+async def run_conversation(agent, messages, initial_state):
+    """Run the messages as consecutive turns of one session; returns per-turn seconds."""
+    session_service = InMemorySessionService()
+    session_id = str(uuid.uuid4())
+    await session_service.create_session(
+        app_name="CassetteReplay", user_id="replay_user", session_id=session_id, state=dict(initial_state)
+    )
+    runner = Runner(agent=agent, app_name="CassetteReplay", session_service=session_service)
+
+    durations = []
+    for message in messages:
+        start = time.perf_counter()
+        async for _ in runner.run_async(user_id="replay_user", session_id=session_id, new_message=message):
+            pass
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+async def record(args):
+    load_dotenv()
+    agent, initial_state = load_agent(args.agent)
+    with open(args.prompts) as f:
+        prompts = [line.strip() for line in f if line.strip()]
+
+    recorder = CassetteRecorder(args.cassette, initial_state=initial_state)
+    recorder.attach(agent)
+    try:
+        messages = [types.Content(role="user", parts=[types.Part(text=p)]) for p in prompts]
+        durations = await run_conversation(agent, messages, initial_state)
+    finally:
+        recorder.close()
+    print(f"Recorded {len(prompts)} turns to {args.cassette} ({sum(durations):.2f}s with the live model)")
+
+
+async def replay(args):
+    agent, _ = load_agent(args.agent)
+    player = CassettePlayer(args.cassette, strict=not args.lenient)
+    player.attach(agent)
+
+    messages = [types.Content.model_validate(m["content"]) for m in player.user_messages]
+    durations = await run_conversation(agent, messages, player.header.get("initial_state", {}))
+
+    report = {
+        "cassette": args.cassette,
+        "turns": len(durations),
+        "total_seconds": round(sum(durations), 4),
+        "turn_mean_ms": round(statistics.mean(durations) * 1000, 3) if durations else None,
+        "turn_max_ms": round(max(durations) * 1000, 3) if durations else None,
+        "matching": player.stats,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record and replay agent conversations")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="Record a live conversation")
+    record_parser.add_argument("--agent", required=True, choices=registry.names(), metavar="AGENT",
+                               help="Agent name from the registry (list them with: python agent_registry.py)")
+    record_parser.add_argument("--prompts", required=True, help="Text file with one user message per line")
+    record_parser.add_argument("--cassette", required=True, help="Output cassette (.jsonl.gz)")
+
+    replay_parser = subparsers.add_parser("replay", help="Replay a cassette offline")
+    replay_parser.add_argument("--agent", required=True, choices=registry.names(), metavar="AGENT",
+                               help="Agent name from the registry (list them with: python agent_registry.py)")
+    replay_parser.add_argument("--cassette", required=True)
+    replay_parser.add_argument("--lenient", action="store_true", help="Call the real model/tool on a cassette miss")
+
+    args = parser.parse_args()
+    asyncio.run(record(args) if args.command == "record" else replay(args))
@@ -0,0 +1,195 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class SamplingPolicy:
+    """
+    Which invocations CallbackLogger writes out.
+
+    Head sampling keeps head_rate of invocations, decided from a hash of the
+    invocation id so every agent (and process) in a run agrees. Tail sampling
+    keeps any invocation that was slow, errored or used one of keep_tools,
+    whatever the head decision, so the events of unsampled invocations are
+    buffered until their run ends.
+    """
+
+    def __init__(self, head_rate: float = 1.0, slow_seconds: Optional[float] = None, keep_errors: bool = True,
+                 keep_tools: Iterable[str] = (), max_buffered_invocations: int = 1000,
+                 max_events_per_invocation: int = 500, stats_every: int = 1000):
+        if not 0.0 <= head_rate <= 1.0:
+            raise ValueError("head_rate must be between 0 and 1")
+        self.head_rate = head_rate
+        self.slow_seconds = slow_seconds
+        self.keep_errors = keep_errors
+        self.keep_tools = set(keep_tools)
+        self.max_buffered_invocations = max_buffered_invocations
+        self.max_events_per_invocation = max_events_per_invocation
+        self.stats_every = stats_every
+
+    def head_sampled(self, invocation_id: str) -> bool:
+        if self.head_rate >= 1.0:
+            return True
+        digest = hashlib.blake2b(invocation_id.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2 ** 64 < self.head_rate
+
+    def tail_reason(self, execution_time: float, errored: bool, tools: Iterable[str]) -> Optional[str]:
+        """Why a finished invocation must be kept regardless of the head decision (None if it need not be)."""
+        if self.keep_errors and errored:
+            return "error"
+        if self.slow_seconds is not None and execution_time >= self.slow_seconds:
+            return "slow"
+        if self.keep_tools.intersection(tools):
+            return "tool"
+        return None
+
+
+class SampledInvocation:
+    """Sampling state of one in-flight invocation."""
+
+    def __init__(self, head: bool):
+        self.head = head
+        self.start_time = time.time()
+        self.depth = 0  # Agents of the invocation currently running (sub-agents share the invocation id)
+        self.errored = False
+        self.tools = set()
+        self.llm_calls = 0
+        self.events: List[Dict[str, Any]] = []  # Buffered while not head-sampled
+        self.dropped_events = 0
+
+
+class SamplingStats:
+    """
+    Counters over every invocation, sampled or not.
+
+    Aggregates (run count, time, errors, calls) are exact because they are
+    updated before the keep/drop decision; the written run_end lines carry a
+    sample_weight (1 / inclusion probability) for estimates from the log alone.
+    """
+
+    def __init__(self):
+        self.invocations = 0
+        self.head_kept = 0
+        self.tail_kept = {"error": 0, "slow": 0, "tool": 0}
+        self.dropped = 0
+        self.evicted_buffers = 0
+        self.events_written = 0
+        self.events_discarded = 0
+        self.total_execution_seconds = 0.0
+        self.errors = 0
+        self.llm_calls = 0
+        self.tool_calls: Dict[str, int] = {}
+
+    def record(self, sampled: SampledInvocation, execution_time: float, kept_by: Optional[str]):
+        self.invocations += 1
+        self.total_execution_seconds += execution_time
+        self.errors += int(sampled.errored)
+        self.llm_calls += sampled.llm_calls
+        if kept_by == "head":
+            self.head_kept += 1
+        elif kept_by:
+            self.tail_kept[kept_by] += 1
+        else:
+            self.dropped += 1
+
+    def summary(self, policy: SamplingPolicy) -> Dict[str, Any]:
+        return {
+            "head_rate": policy.head_rate,
+            "invocations": self.invocations,
+            "head_kept": self.head_kept,
+            "tail_kept": dict(self.tail_kept),
+            "dropped": self.dropped,
+            "evicted_buffers": self.evicted_buffers,
+            "events_written": self.events_written,
+            "events_discarded": self.events_discarded,
+            "mean_execution_seconds": self.total_execution_seconds / self.invocations if self.invocations else None,
+            "error_rate": self.errors / self.invocations if self.invocations else None,
+            "llm_calls": self.llm_calls,
+            "tool_calls": dict(self.tool_calls),
+        }
+
+
+class InvocationSampler:
+    """Routes CallbackLogger entries: write now, buffer, or flush/discard when the run ends."""
+
+    def __init__(self, policy: SamplingPolicy):
+        self.policy = policy
+        self.stats = SamplingStats()
+        self._invocations: "OrderedDict[str, SampledInvocation]" = OrderedDict()
+
+    def start(self, invocation_id: str) -> SampledInvocation:
+        sampled = self._invocations.get(invocation_id)
+        if sampled is None:
+            while len(self._invocations) >= self.policy.max_buffered_invocations:
+                # An invocation whose run_end never arrived; its buffer cannot grow forever
+                _, evicted = self._invocations.popitem(last=False)
+                self.stats.evicted_buffers += 1
+                self.stats.events_discarded += len(evicted.events)
+            sampled = self._invocations[invocation_id] = SampledInvocation(self.policy.head_sampled(invocation_id))
+        sampled.depth += 1
+        return sampled
+
+    def observe(self, invocation_id: str, event_type: str, details: Dict[str, Any]):
+        """Track what tail sampling needs: tools used, errors, model calls."""
+        sampled = self._invocations.get(invocation_id)
+        if event_type == "tool_call":
+            tool_name = details.get("tool_name")
+            self.stats.tool_calls[tool_name] = self.stats.tool_calls.get(tool_name, 0) + 1
+            if sampled:
+                sampled.tools.add(tool_name)
+        elif event_type == "llm_call" and sampled:
+            sampled.llm_calls += 1
+        if sampled and details.get("error"):
+            sampled.errored = True
+
+    def route(self, invocation_id: str, entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Entries to write now for this log entry (none while the invocation is buffered)."""
+        sampled = self._invocations.get(invocation_id)
+        if sampled is None or sampled.head:
+            # Unknown invocations (e.g. logged outside the agent callbacks) are written as-is
+            self.stats.events_written += 1
+            return [entry]
+        if len(sampled.events) < self.policy.max_events_per_invocation:
+            sampled.events.append(entry)
+        else:
+            sampled.dropped_events += 1
+        return []
+
+    def finish(self, invocation_id: str, run_end: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Close one agent of the invocation. Returns None while other agents of the
+        invocation are still running; otherwise the entries to write (possibly none).
+        """
+        sampled = self._invocations.get(invocation_id)
+        if sampled is None:
+            self.stats.events_written += 1
+            return [run_end]
+        sampled.depth -= 1
+        if sampled.depth > 0:
+            return None
+        del self._invocations[invocation_id]
+
+        execution_time = time.time() - sampled.start_time
+        tail = self.policy.tail_reason(execution_time, sampled.errored, sampled.tools)
+        kept_by = "head" if sampled.head else tail
+        self.stats.record(sampled, execution_time, kept_by)
+
+        if not kept_by:
+            self.stats.events_discarded += len(sampled.events) + 1
+            return []
+
+        # Tail-eligible runs are always kept (probability 1); the rest only at head_rate
+        run_end["details"]["sampling"] = {
+            "kept_by": kept_by,
+            "tail_reason": tail,
+            "sample_weight": 1.0 if tail else 1.0 / self.policy.head_rate,
+            "dropped_events": sampled.dropped_events,
+        }
+        entries = sampled.events + [run_end]
+        self.stats.events_written += len(entries)
+        return entries
+
+    def should_emit_stats(self) -> bool:
+        every = self.policy.stats_every
+        return bool(every) and self.stats.invocations > 0 and self.stats.invocations % every == 0
@@ -0,0 +1,318 @@
+"""
+Timeline and critical-path analysis of CallbackLogger output.
+
+Rebuilds each invocation as a tree of spans (agent runs, LLM calls, tool calls
+and transfers between agents) from run_start/llm_call/tool_call/... events,
+computes every span's self time and the invocation's critical path, and
+aggregates critical-path time per span label across invocations:
+
+    python trace_analysis.py agent_logs.jsonl
+    python trace_analysis.py logs/ --invocation e-1234... # a LogStore directory works too
+    python trace_analysis.py agent_logs.jsonl --chrome trace.json  # open in chrome://tracing or Perfetto
+
+Labels: "agent:<name>" is time inside an agent not covered by its children
+(framework overhead), "llm:<agent>", "tool:<agent>/<tool>" and
+"transfer:<from>-><to>" (from the transfer_to_agent call until the target
+agent starts).
+"""
+import argparse
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+TRANSFER_TOOL = "transfer_to_agent"
+
+
+class Span:
+    """One timed node of an invocation timeline."""
+
+    def __init__(self, kind: str, name: str, start: float, parent: Optional["Span"] = None, **details):
+        self.kind = kind
+        self.name = name
+        self.start = start
+        self.end: Optional[float] = None
+        self.parent = parent
+        self.children: List["Span"] = []
+        self.details = details
+        self.critical_self = 0.0  # Self time on the critical path
+        if parent:
+            parent.children.append(self)
+
+    @property
+    def label(self) -> str:
+        return f"{self.kind}:{self.name}"
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    @property
+    def self_time(self) -> float:
+        """Duration minus the time covered by at least one child."""
+        covered, cursor = 0.0, self.start
+        for child in sorted(self.children, key=lambda c: c.start):
+            start, end = max(child.start, cursor), min(child.end, self.end)
+            if end > start:
+                covered += end - start
+                cursor = end
+        return self.duration - covered
+
+    def walk(self) -> Iterator["Span"]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def _timestamp(entry: Dict[str, Any]) -> float:
+    value = entry["timestamp"]
+    return value if isinstance(value, (int, float)) else datetime.fromisoformat(value).timestamp()
+
+
+def build_timeline(invocation_id: str, entries: List[Dict[str, Any]]) -> Span:
+    """Turn one invocation's log entries (in logged order) into a span tree rooted at an "invocation" span."""
+    times = [_timestamp(entry) for entry in entries]
+    root = Span("invocation", invocation_id, min(times))
+    agents: List[Span] = []  # Open agent spans, innermost last
+    open_llm: Dict[int, Span] = {}
+    open_tools: Dict[int, List[Span]] = {}
+    pending_transfers: List[Span] = []
+
+    def agent_span(name: Optional[str]) -> Span:
+        for span in reversed(agents):
+            if span.name == name:
+                return span
+        return agents[-1] if agents else root
+
+    for entry, at in zip(entries, times):
+        event_type = entry["event_type"]
+        details = entry.get("details") or {}
+        agent_name = details.get("agent_name")
+
+        if event_type == "run_start":
+            for transfer in [t for t in pending_transfers if t.details.get("target") == agent_name]:
+                transfer.end = at
+                pending_transfers.remove(transfer)
+            span = Span("agent", agent_name, at, agent_span(None))
+            agents.append(span)
+        elif event_type in ("run_end", "run_end_fallback"):
+            # run_end_fallback carries no agent name; it closes the innermost agent
+            span = agent_span(agent_name) if agent_name else (agents[-1] if agents else None)
+            if span is not None and span is not root:
+                span.end = at
+                if "sample_weight" in (details.get("sampling") or {}):
+                    root.details["sample_weight"] = details["sampling"]["sample_weight"]
+                agents.remove(span)
+        elif event_type == "llm_call":
+            parent = agent_span(agent_name)
+            open_llm[id(parent)] = Span("llm", parent.name or agent_name, at, parent)
+        elif event_type == "llm_response":
+            parent = agent_span(agent_name)
+            span = open_llm.get(id(parent))
+            if span is None:
+                continue
+            if details.get("partial"):
+                span.details.setdefault("first_chunk_seconds", at - span.start)
+            else:
+                span.end = at
+                del open_llm[id(parent)]
+        elif event_type == "tool_call":
+            parent = agent_span(agent_name)
+            tool_name = details.get("tool_name")
+            if tool_name == TRANSFER_TOOL:
+                target = (details.get("tool_params") or {}).get("agent_name")
+                span = Span("transfer", f"{parent.name}->{target}", at, parent, target=target)
+                pending_transfers.append(span)
+            else:
+                span = Span("tool", f"{parent.name}/{tool_name}", at, parent, tool_name=tool_name)
+                open_tools.setdefault(id(parent), []).append(span)
+        elif event_type == "tool_response":
+            # The transfer span ends when the target agent starts, not when the tool returns
+            tools = open_tools.get(id(agent_span(agent_name)), [])
+            for span in tools:
+                if span.details["tool_name"] == details.get("tool_name"):
+                    span.end = at
+                    tools.remove(span)
+                    break
+
+    # Spans whose closing event never arrived end with the invocation's last event
+    last = max(times)
+    for span in root.walk():
+        if span.end is None:
+            span.end = last
+    root.end = last
+    for span in reversed(list(root.walk())):  # Children before their parents
+        if span.parent is not None:
+            span.parent.end = max(span.parent.end, span.end)
+    return root
+
+
+def critical_path(span: Span) -> List[Span]:
+    """
+    Spans on the critical path below `span`, setting each one's critical_self.
+
+    Walking back from the end, the child that finished last is on the path;
+    the path continues from that child's start. Parent time not covered by
+    path children is the parent's own contribution, so the critical_self of
+    all returned spans adds up to span.duration.
+    """
+    chosen, cursor = [], span.end
+    for child in sorted(span.children, key=lambda c: c.end, reverse=True):
+        if child.end <= cursor and child.duration > 0:
+            chosen.append(child)
+            cursor = child.start
+    span.critical_self = span.duration - sum(min(c.end, span.end) - max(c.start, span.start) for c in chosen)
+    path = [span]
+    for child in reversed(chosen):
+        path.extend(critical_path(child))
+    return path
+
+
+def load_invocations(source: str) -> "OrderedDict[str, List[Dict[str, Any]]]":
+    """Entries grouped by invocation id, from a JSON lines log file or a LogStore directory."""
+    if os.path.isdir(source):
+        from log_store import LogReader
+        entries: Iterable[Dict[str, Any]] = LogReader(source)
+    else:
+        entries = (json.loads(line) for line in open(source) if line.strip())
+    invocations: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+    for entry in entries:
+        if entry.get("invocation_id") and entry.get("event_type") != "sampling_stats":
+            invocations.setdefault(entry["invocation_id"], []).append(entry)
+    return invocations
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class CriticalPathReport:
+    """Critical-path and self time per span label, summed over invocations (weighted by sample_weight)."""
+
+    def __init__(self):
+        self.invocations = 0
+        self.weighted_invocations = 0.0
+        self.total_seconds = 0.0
+        self.critical: Dict[str, List[float]] = {}  # label -> per-invocation contribution
+        self.weights: Dict[str, List[float]] = {}
+        self.self_seconds: Dict[str, float] = {}
+
+    def add(self, root: Span) -> List[Span]:
+        """Add one invocation; returns its critical path."""
+        weight = root.details.get("sample_weight", 1.0)
+        self.invocations += 1
+        self.weighted_invocations += weight
+        self.total_seconds += root.duration * weight
+
+        contributions: Dict[str, float] = {}
+        path = critical_path(root)
+        for span in path:
+            if span is not root:
+                contributions[span.label] = contributions.get(span.label, 0.0) + span.critical_self
+        for label, seconds in contributions.items():
+            self.critical.setdefault(label, []).append(seconds)
+            self.weights.setdefault(label, []).append(weight)
+        for span in root.walk():
+            if span is not root:
+                self.self_seconds[span.label] = self.self_seconds.get(span.label, 0.0) + span.self_time * weight
+        return path
+
+    def rows(self) -> List[Dict[str, Any]]:
+        rows = []
+        for label, values in self.critical.items():
+            weighted = sum(v * w for v, w in zip(values, self.weights[label]))
+            rows.append({
+                "label": label,
+                "invocations": len(values),
+                "critical_seconds": weighted,
+                "critical_share": weighted / self.total_seconds if self.total_seconds else 0.0,
+                "mean_ms": 1000 * weighted / sum(self.weights[label]),
+                "p50_ms": 1000 * _percentile(values, 0.5),
+                "p95_ms": 1000 * _percentile(values, 0.95),
+                "self_seconds": self.self_seconds.get(label, 0.0),
+            })
+        return sorted(rows, key=lambda row: row["critical_seconds"], reverse=True)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "invocations": self.invocations,
+            "weighted_invocations": self.weighted_invocations,
+            "mean_invocation_ms": 1000 * self.total_seconds / self.weighted_invocations if self.invocations else None,
+            "labels": self.rows(),
+        }
+
+
+def chrome_trace(timelines: List[Tuple[Span, List[Span]]]) -> Dict[str, Any]:
+    """Chrome trace-event JSON: one thread per invocation, critical-path spans marked in args."""
+    origin = min(root.start for root, _ in timelines)
+    events = []
+    for tid, (root, path) in enumerate(timelines, start=1):
+        on_path = {id(span) for span in path}
+        events.append({"ph": "M", "name": "thread_name", "pid": 1, "tid": tid, "args": {"name": root.name}})
+        for span in root.walk():
+            events.append({
+                "ph": "X",
+                "name": span.label,
+                "cat": "critical" if id(span) in on_path else span.kind,
+                "pid": 1,
+                "tid": tid,
+                "ts": (span.start - origin) * 1e6,
+                "dur": span.duration * 1e6,
+                "args": {
+                    "self_ms": round(span.self_time * 1000, 3),
+                    "critical_ms": round(span.critical_self * 1000, 3) if id(span) in on_path else 0.0,
+                    **{k: v for k, v in span.details.items() if k != "sample_weight"},
+                },
+            })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def print_tree(span: Span, on_path: set, depth: int = 0):
+    marker = "*" if id(span) in on_path else " "
+    print(f"{marker} {'  ' * depth}{span.label:<{48 - 2 * depth}} {span.duration * 1000:9.1f} ms"
+          f"  self {span.self_time * 1000:8.1f} ms")
+    for child in sorted(span.children, key=lambda c: c.start):
+        print_tree(child, on_path, depth + 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Critical-path analysis of CallbackLogger traces")
+    parser.add_argument("source", help="agent_logs.jsonl or a LogStore directory (--log-dir of main.py)")
+    parser.add_argument("--invocation", default=None, help="Print the timeline tree of one invocation")
+    parser.add_argument("--top", type=int, default=15, help="Labels to show in the aggregate table")
+    parser.add_argument("--chrome", metavar="FILE", default=None, help="Write a Chrome trace-event JSON file")
+    parser.add_argument("--chrome-limit", type=int, default=500, help="Invocations to include in the Chrome trace")
+    parser.add_argument("--output", default=None, help="Write the aggregate report as JSON")
+    args = parser.parse_args()
+
+    invocations = load_invocations(args.source)
+    if args.invocation:
+        root = build_timeline(args.invocation, invocations[args.invocation])
+        path = critical_path(root)
+        print_tree(root, {id(span) for span in path})
+        print("(* = on the critical path)")
+        raise SystemExit(0)
+
+    report = CriticalPathReport()
+    timelines = []
+    for invocation_id, entries in invocations.items():
+        root = build_timeline(invocation_id, entries)
+        path = report.add(root)
+        if len(timelines) < args.chrome_limit:
+            timelines.append((root, path))
+
+    summary = report.summary()
+    print(f"{summary['invocations']} invocations, mean {summary['mean_invocation_ms'] or 0:.1f} ms")
+    print(f"{'label':<48} {'share':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'self s':>9}")
+    for row in summary["labels"][:args.top]:
+        print(f"{row['label']:<48} {row['critical_share']:7.1%} {row['mean_ms']:9.1f} {row['p50_ms']:9.1f}"
+              f" {row['p95_ms']:9.1f} {row['self_seconds']:9.2f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    if args.chrome and timelines:
+        with open(args.chrome, "w") as f:
+            json.dump(chrome_trace(timelines), f)
+        print(f"Chrome trace written to {args.chrome} ({len(timelines)} invocations)")
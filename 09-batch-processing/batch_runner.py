@@ -0,0 +1,331 @@
+"""
+Headless batch runner: push a JSONL/CSV file of prompts through an agent.
+
+Each input record needs a "prompt" (or "query") column and may carry "id",
+"user_id" and "session_id". Results are appended to the output JSONL as they
+complete, so the output file doubles as the checkpoint: re-running the same
+command skips every id that already has a successful result.
+
+Example:
+
+    python batch_runner.py --agent ticket_agent --input tickets.jsonl \\
+        --output ticket_results.jsonl --concurrency 32 --rate 20
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService, DatabaseSessionService
+from google.genai import types
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from agent_registry import registry  # noqa: E402  (lives at the repo root)
+
+
+def read_records(path):
+    """Yield input records from a .jsonl or .csv file, assigning ids by line number when missing."""
+    path = Path(path)
+    with open(path, newline="") as f:
+        if path.suffix.lower() == ".csv":
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for line_number, row in enumerate(rows):
+            prompt = row.get("prompt") or row.get("query")
+            if not prompt:
+                continue
+            yield {
+                "id": str(row.get("id") or line_number),
+                "prompt": prompt,
+                "user_id": row.get("user_id") or "batch_user",
+                "session_id": row.get("session_id") or None,
+            }
+
+
+def load_checkpoint(output_path):
+    """Return the ids that already completed successfully in a previous run."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partially written last line of an interrupted run
+            if result.get("status") == "ok":
+                done.add(result["id"])
+    return done
+
+
+class RateLimiter:
+    """Token bucket limiting how many requests start per second."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.rate:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class BatchStats:
+    """Running counters for the throughput report."""
+
+    def __init__(self, skipped):
+        self.started = time.monotonic()
+        self.skipped = skipped
+        self.succeeded = 0
+        self.failed = 0
+        self.latencies = []
+
+    def record(self, result):
+        if result["status"] == "ok":
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        self.latencies.append(result["latency_seconds"])
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        completed = self.succeeded + self.failed
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3) if latencies else None
+
+        return {
+            "completed": completed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "skipped_from_checkpoint": self.skipped,
+            "elapsed_seconds": round(elapsed, 2),
+            "throughput_per_second": round(completed / elapsed, 2) if elapsed else 0.0,
+            "latency_p50_seconds": percentile(0.50),
+            "latency_p95_seconds": percentile(0.95),
+        }
+
+
+class BatchRunner:
+    """Runs records through one agent with bounded concurrency and rate limiting."""
+
+    def __init__(self, agent, session_service, app_name="BatchRunner", concurrency=8, rate=None, max_retries=2):
+        self.agent = agent
+        self.app_name = app_name
+        self.session_service = session_service
+        self.runner = Runner(agent=agent, app_name=app_name, session_service=session_service)
+        self.concurrency = concurrency
+        self.rate_limiter = RateLimiter(rate) if rate else None
+        self.max_retries = max_retries
+        # Records naming the same session are serialized so their turns don't interleave:
+        # (user_id, session_id) -> [lock, holders and waiters]; dropped once unused
+        self.session_locks = {}
+
+    @asynccontextmanager
+    async def session_turn(self, user_id, session_id):
+        """Hold the named session's lock for one turn."""
+        key = (user_id, session_id)
+        entry = self.session_locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self.session_locks[key]
+
+    async def ensure_session(self, user_id, session_id):
+        """Reuse the named session if it exists, otherwise create it; returns its event count."""
+        session = await self.session_service.get_session(
+            app_name=self.app_name, user_id=user_id, session_id=session_id
+        )
+        if session is None:
+            session = await self.session_service.create_session(
+                app_name=self.app_name, user_id=user_id, session_id=session_id
+            )
+        return len(session.events)
+
+    async def run_turn(self, user_id, session_id, content):
+        """Run one turn; returns the final response text and the session after it."""
+        final_response_text = None
+        async for event in self.runner.run_async(
+            user_id=user_id, session_id=session_id, new_message=content
+        ):
+            if event.is_final_response() and event.content and event.content.parts:
+                final_response_text = "".join(
+                    part.text for part in event.content.parts if getattr(part, "text", None)
+                )
+        session = await self.session_service.get_session(
+            app_name=self.app_name, user_id=user_id, session_id=session_id
+        )
+        return final_response_text, session
+
+    async def run_record(self, record):
+        """
+        Run one prompt and return its result row.
+
+        A failed attempt may already have appended the user message (and model
+        or tool events) to its session, so a retry never reuses it: a one-off
+        prompt gets a fresh session per attempt, and a record naming a session
+        is retried only if the failed attempt left that session unchanged.
+        """
+        user_id = record["user_id"]
+        content = types.Content(role="user", parts=[types.Part(text=record["prompt"])])
+        start = time.monotonic()
+        session_id = record["session_id"]
+        error = None
+        attempts = 0
+        while attempts <= self.max_retries:
+            attempts += 1
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
+            retryable = True
+            try:
+                if record["session_id"]:
+                    # Turns within the same session must run one after another
+                    async with self.session_turn(user_id, session_id):
+                        events_before = await self.ensure_session(user_id, session_id)
+                        try:
+                            final_response_text, session = await self.run_turn(user_id, session_id, content)
+                        except Exception:
+                            session = await self.session_service.get_session(
+                                app_name=self.app_name, user_id=user_id, session_id=session_id
+                            )
+                            retryable = session is not None and len(session.events) == events_before
+                            raise
+                else:
+                    # One-off prompt: fresh session, nothing to serialize against
+                    session_id = str(uuid.uuid4())
+                    await self.session_service.create_session(
+                        app_name=self.app_name, user_id=user_id, session_id=session_id
+                    )
+                    final_response_text, session = await self.run_turn(user_id, session_id, content)
+                output_key = getattr(self.agent, "output_key", None)
+                return {
+                    "id": record["id"],
+                    "status": "ok",
+                    "user_id": user_id,
+                    "session_id": session_id,
+                    "prompt": record["prompt"],
+                    "response": final_response_text,
+                    # Structured output (e.g. "ticket" or "email") saved by the agent
+                    "output": session.state.get(output_key) if output_key and session else None,
+                    "attempts": attempts,
+                    "latency_seconds": round(time.monotonic() - start, 3),
+                }
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if not retryable:
+                    error += " (not retried: the failed turn left events in the session)"
+                    break
+                if attempts <= self.max_retries:
+                    await asyncio.sleep(min(2 ** (attempts - 1), 30))
+
+        return {
+            "id": record["id"],
+            "status": "error",
+            "user_id": user_id,
+            "session_id": session_id,
+            "prompt": record["prompt"],
+            "error": error,
+            "attempts": attempts,
+            "latency_seconds": round(time.monotonic() - start, 3),
+        }
+
+    async def run(self, records, output_path, progress_every=100):
+        """Process records, appending each result to output_path as soon as it completes."""
+        done = load_checkpoint(output_path)
+        stats = BatchStats(skipped=len(done))
+        # Bounded queue keeps memory flat regardless of input size
+        queue = asyncio.Queue(maxsize=self.concurrency * 4)
+
+        with open(output_path, "a") as out:
+            async def worker():
+                while True:
+                    record = await queue.get()
+                    try:
+                        if record is None:
+                            return
+                        result = await self.run_record(record)
+                        out.write(json.dumps(result, default=str) + "\n")
+                        out.flush()
+                        stats.record(result)
+                        completed = stats.succeeded + stats.failed
+                        if progress_every and completed % progress_every == 0:
+                            print(f"[batch] {json.dumps(stats.summary())}")
+                    finally:
+                        queue.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            for record in records:
+                if record["id"] in done:
+                    continue
+                await queue.put(record)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+        return stats.summary()
+
+
+async def main(args):
+    load_dotenv()
+    agent = registry.get(args.agent)
+
+    # Sessions live in memory unless a database URL is given
+    if args.db_url:
+        session_service = DatabaseSessionService(db_url=args.db_url)
+    else:
+        session_service = InMemorySessionService()
+
+    batch_runner = BatchRunner(
+        agent,
+        session_service,
+        app_name=args.app_name,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        max_retries=args.max_retries,
+    )
+    summary = await batch_runner.run(read_records(args.input), args.output, progress_every=args.progress_every)
+    print(f"\nBatch complete: {json.dumps(summary, indent=2)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a JSONL/CSV file of prompts through an agent")
+    parser.add_argument("--agent", required=True, choices=registry.names(), metavar="AGENT",
+                        help="Agent name from the registry (list them with: python agent_registry.py)")
+    parser.add_argument("--input", required=True, help="Input .jsonl or .csv with a 'prompt' column")
+    parser.add_argument("--output", required=True, help="Output .jsonl (also used as the resume checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum prompts in flight")
+    parser.add_argument("--rate", type=float, default=None, help="Maximum prompts started per second")
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--db-url", default=None, help="Persist sessions, e.g. sqlite:///./batch_sessions.db")
+    parser.add_argument("--app-name", default="BatchRunner")
+    parser.add_argument("--progress-every", type=int, default=100, help="Print stats every N results")
+    asyncio.run(main(parser.parse_args()))
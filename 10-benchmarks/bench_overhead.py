@@ -0,0 +1,284 @@
+"""
+Framework-overhead benchmarks.
+
+Every agent's model is swapped for a deterministic StubLlm, so the time that
+remains is ADK Runner/session/callback overhead plus our own tool and
+callback code. Results are written as JSON so runs can be compared:
+
+    python bench_overhead.py --turns 200 --output bench_results.json
+    python bench_overhead.py --turns 200 --compare bench_results.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from google.adk import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService, DatabaseSessionService
+from google.genai import types
+
+from stub_llm import answered_calls, install_stub_models
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from agent_registry import import_from_lesson, registry  # noqa: E402  (lives at the repo root)
+
+
+def fc(name, **args):
+    """Shorthand for a scripted function-call step."""
+    return {"function_call": {"name": name, "args": args}}
+
+
+# name -> (registry agent, stub scripts keyed by agent name, initial session state)
+SCENARIOS = {
+    "greeting": ("greeting_agent",
+                 {"greeting_agent": [{"text": "Hello! What's your name?"}]}, None),
+    "weather": ("02-adding-tools/weather_agent",
+                {"weather_agent": [fc("get_weather", location="Paris"), {"text": "It is sunny in Paris."}]}, None),
+    # get_stock_price calls Yahoo Finance, so the stock turn is scripted without the tool call
+    "stock": ("stock_agent",
+              {"stock_agent": [{"text": "AAPL is trading at 190.12 USD."}]}, None),
+    "memory": ("memory_agent",
+               {"memory_agent": [fc("add_reminder", reminder_text="Buy milk"), {"text": "Added 'Buy milk'."}]},
+               {"username": "User", "reminders": []}),
+    "vacation_planner": ("vacation_planner",
+                         {"vacation_planner": [fc("transfer_to_agent", agent_name="weather_agent"), {"text": "Done."}],
+                          "weather_agent": [fc("get_weather", location="Lisbon", date="2025-06-01"), {"text": "Lisbon will be sunny."}]},
+                         None),
+    "logger": ("logger_agent_base",
+               {"logger_agent": [fc("get_current_time"), {"text": "It is noon."}]}, None),
+}
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+
+class ToolRoundTripTimer:
+    """
+    Measures the gap between the model returning a function call and the next
+    model request carrying its result, i.e. ADK's tool dispatch (the scripted
+    tools themselves are trivial). Installed as model callbacks.
+    """
+
+    def __init__(self):
+        self.pending_since = None
+        self.samples = []
+
+    def before_model_callback(self, callback_context, llm_request):
+        if self.pending_since is not None and answered_calls(llm_request):
+            self.samples.append(time.perf_counter() - self.pending_since)
+        self.pending_since = None
+        return None
+
+    def after_model_callback(self, callback_context, llm_response):
+        parts = llm_response.content.parts if llm_response.content else None
+        if parts and any(p.function_call for p in parts):
+            self.pending_since = time.perf_counter()
+        return None
+
+
+async def run_turns(agent, session_service, turns, turns_per_session, initial_state):
+    """Run sequential turns and return per-turn wall times (seconds)."""
+    app_name = "Bench"
+    runner = Runner(agent=agent, app_name=app_name, session_service=session_service)
+    durations = []
+    session_id = None
+
+    for turn in range(turns):
+        if turn % turns_per_session == 0:
+            session_id = str(uuid.uuid4())
+            await session_service.create_session(
+                app_name=app_name, user_id="bench_user", session_id=session_id, state=dict(initial_state or {})
+            )
+        content = types.Content(role="user", parts=[types.Part(text=f"benchmark turn {turn}")])
+        start = time.perf_counter()
+        async for _ in runner.run_async(user_id="bench_user", session_id=session_id, new_message=content):
+            pass
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+async def measure(agent, stubs, session_service, args, initial_state):
+    """Warm up, then time args.turns turns and summarize them against the stub model latency."""
+    await run_turns(agent, session_service, args.warmup, args.turns_per_session, initial_state)
+    for stub in stubs.values():
+        stub.calls = 0
+    durations = await run_turns(agent, session_service, args.turns, args.turns_per_session, initial_state)
+    model_calls = sum(stub.calls for stub in stubs.values())
+    return summarize(durations, model_calls, args.model_latency_ms / 1000)
+
+
+def summarize(durations, model_calls, model_latency):
+    turns = len(durations)
+    calls_per_turn = model_calls / turns if turns else 0.0
+    overheads = [d - model_latency * calls_per_turn for d in durations]
+    return {
+        "turns": turns,
+        "model_calls_per_turn": round(calls_per_turn, 2),
+        "turn_mean_ms": round(statistics.mean(durations) * 1000, 3),
+        "turn_p50_ms": round(percentile(durations, 0.50) * 1000, 3),
+        "turn_p95_ms": round(percentile(durations, 0.95) * 1000, 3),
+        "overhead_per_turn_ms": round(statistics.mean(overheads) * 1000, 3),
+        "overhead_per_model_call_ms": round(statistics.mean(overheads) * 1000 / calls_per_turn, 3) if calls_per_turn else None,
+    }
+
+
+def make_database_session_service(db_path):
+    """DatabaseSessionService over a SQLite file (newer ADK releases require the async driver)."""
+    try:
+        return DatabaseSessionService(db_url=f"sqlite:///{db_path}")
+    except ValueError:
+        return DatabaseSessionService(db_url=f"sqlite+aiosqlite:///{db_path}")
+
+
+def with_callbacks(agent, **callbacks):
+    """Copy an agent with callbacks attached, the same way 08-callbacks/main.py builds it."""
+    return Agent(
+        name=agent.name,
+        model=agent.model,
+        description=agent.description,
+        instruction=agent.instruction,
+        tools=agent.tools,
+        **callbacks
+    )
+
+
+async def run_benchmarks(args):
+    results = {}
+    agents = {}
+
+    # 1. Per-turn overhead and tool dispatch for every agent (in-memory sessions)
+    for name, (agent_name, scripts, initial_state) in SCENARIOS.items():
+        if args.only and name not in args.only:
+            continue
+        agent = registry.get(agent_name)
+        stubs = install_stub_models(agent, scripts, latency_seconds=args.model_latency_ms / 1000)
+        agents[name] = (agent, stubs, initial_state)
+
+        # The timer goes first (ADK stops at the first callback returning a response);
+        # the agents' own callbacks still run after it and are put back afterwards
+        timer = ToolRoundTripTimer()
+        originals = [(node, node.before_model_callback, node.after_model_callback)
+                     for node in [agent] + list(agent.sub_agents)]
+        for node, _, _ in originals:
+            node.before_model_callback = [timer.before_model_callback] + node.canonical_before_model_callbacks
+            node.after_model_callback = [timer.after_model_callback] + node.canonical_after_model_callbacks
+        try:
+            summary = await measure(agent, stubs, InMemorySessionService(), args, initial_state)
+        finally:
+            for node, before, after in originals:
+                node.before_model_callback = before
+                node.after_model_callback = after
+
+        if timer.samples:
+            summary["tool_dispatch_mean_ms"] = round(statistics.mean(timer.samples) * 1000, 3)
+            summary["tool_dispatch_p95_ms"] = round(percentile(timer.samples, 0.95) * 1000, 3)
+        results[f"turn/{name}"] = summary
+        print(f"turn/{name}: {json.dumps(summary)}")
+
+    # 2. Callback cost: logger agent with and without CallbackLogger
+    if "logger" in agents:
+        agent, stubs, initial_state = agents["logger"]
+        CallbackLogger = import_from_lesson("08-callbacks", "callback_logger", "CallbackLogger")
+        with tempfile.TemporaryDirectory() as tmp:
+            callback_logger = CallbackLogger(os.path.join(tmp, "bench_logs.jsonl"))
+            logged_agent = with_callbacks(
+                agent,
+                before_agent_callback=[callback_logger.before_agent_callback],
+                after_agent_callback=[callback_logger.after_agent_callback],
+                before_model_callback=[callback_logger.before_model_callback],
+                after_model_callback=[callback_logger.after_model_callback],
+                before_tool_callback=[callback_logger.before_tool_callback],
+                after_tool_callback=[callback_logger.after_tool_callback]
+            )
+            for label, candidate in (("without_logger", agent), ("with_logger", logged_agent)):
+                # The logger prints every event; keep the terminal out of the measurement
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    results[f"callbacks/{label}"] = await measure(candidate, stubs, InMemorySessionService(),
+                                                                  args, initial_state)
+        delta = results["callbacks/with_logger"]["overhead_per_turn_ms"] - results["callbacks/without_logger"]["overhead_per_turn_ms"]
+        results["callbacks/logger_cost_per_turn_ms"] = {"value": round(delta, 3)}
+        print(f"callbacks: CallbackLogger adds {delta:.3f} ms per turn")
+
+    # 3. Session service cost: memory agent on InMemory vs DatabaseSessionService (SQLite)
+    if "memory" in agents:
+        agent, stubs, initial_state = agents["memory"]
+        with tempfile.TemporaryDirectory() as tmp:
+            services = {
+                "in_memory": InMemorySessionService(),
+                "database_sqlite": make_database_session_service(os.path.join(tmp, "bench_sessions.db")),
+            }
+            for label, service in services.items():
+                results[f"sessions/{label}"] = await measure(agent, stubs, service, args, initial_state)
+                print(f"sessions/{label}: {json.dumps(results[f'sessions/{label}'])}")
+
+    return results
+
+
+def metadata(args):
+    try:
+        import google.adk
+        adk_version = google.adk.__version__
+    except AttributeError:
+        adk_version = "unknown"
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "adk_version": adk_version,
+        "turns": args.turns,
+        "warmup": args.warmup,
+        "turns_per_session": args.turns_per_session,
+        "model_latency_ms": args.model_latency_ms,
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    """Print metrics that got slower than the baseline by more than tolerance; return the regressions."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for scenario, metrics in results.items():
+        for metric in ("overhead_per_turn_ms", "tool_dispatch_mean_ms", "value"):
+            old, new = baseline.get(scenario, {}).get(metric), metrics.get(metric)
+            if old and new is not None and new > old * (1 + tolerance):
+                regressions.append({"scenario": scenario, "metric": metric, "baseline": old, "current": new})
+    for regression in regressions:
+        print(f"REGRESSION {regression['scenario']} {regression['metric']}: {regression['baseline']} -> {regression['current']}")
+    if not regressions:
+        print(f"No regressions beyond {tolerance:.0%} against {baseline_path}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure ADK framework overhead with stubbed models")
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--turns-per-session", type=int, default=5)
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="Simulated latency per model call")
+    parser.add_argument("--only", nargs="*", choices=sorted(SCENARIOS), help="Run a subset of agents")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmarks(args))
+    with open(args.output, "w") as f:
+        json.dump({"metadata": metadata(args), "results": results}, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
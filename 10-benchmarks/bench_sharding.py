@@ -0,0 +1,106 @@
+"""
+Throughput of the sharded host as worker processes are added.
+
+Workers run memory_agent with StubLlm (a tool call plus a reply per turn), so
+each turn is pure framework + session + tool overhead, i.e. the CPU-bound
+work sharding is meant to spread across cores. Requests go through the
+ShardDispatcher exactly as they would behind sharded_host.py.
+
+    python bench_sharding.py --workers 1 2 4 --users 64 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "11-serving"))
+
+from sharded_host import ShardDispatcher  # noqa: E402
+from stub_llm import install_stub_models  # noqa: E402
+
+SCRIPT = [
+    {"function_call": {"name": "add_reminder", "args": {"reminder_text": "Buy milk"}}},
+    {"text": "Added 'Buy milk'."},
+]
+
+
+def install_stubs(host):
+    """agent_setup hook run inside every worker process."""
+    latency = float(os.environ.get("BENCH_MODEL_LATENCY_MS", "0")) / 1000
+    for slot in host.slots.values():
+        install_stub_models(slot.agent, {slot.agent.name: SCRIPT}, latency_seconds=latency)
+
+
+async def run_load(dispatcher, users, requests, concurrency):
+    """Send requests round-robin over users with a fixed number in flight; returns (seconds, status counts)."""
+    statuses = {}
+    next_request = iter(range(requests))
+
+    async def client():
+        for index in next_request:
+            user_id = f"user-{index % users}"
+            response = await dispatcher.forward(
+                "POST", "/agents/memory_agent/run", user_id,
+                {"user_id": user_id, "session_id": f"{user_id}-session", "message": "Remind me to buy milk"}
+            )
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return time.perf_counter() - start, statuses
+
+
+async def bench(args):
+    os.environ["BENCH_MODEL_LATENCY_MS"] = str(args.model_latency_ms)
+    options = {
+        "agents": ["memory_agent"],
+        "concurrency": args.worker_concurrency,
+        "queue": args.concurrency,  # The benchmark measures throughput, not rejections
+        "limit": None,
+        "drain_timeout": 5.0,
+        "db_dir": None,
+        "agent_setup": "bench_sharding:install_stubs",
+    }
+    results = {}
+    baseline = None
+    for n_workers in args.workers:
+        dispatcher = ShardDispatcher(options)
+        await dispatcher.start(n_workers)
+        try:
+            await run_load(dispatcher, args.users, min(args.requests, 50 * n_workers), args.concurrency)  # warmup
+            seconds, statuses = await run_load(dispatcher, args.users, args.requests, args.concurrency)
+        finally:
+            await dispatcher.stop()
+
+        throughput = args.requests / seconds
+        baseline = baseline or throughput / n_workers
+        results[n_workers] = {
+            "throughput_per_second": round(throughput, 1),
+            "speedup": round(throughput / baseline, 2),
+            "scaling_efficiency": round(throughput / (baseline * n_workers), 2),
+            "statuses": statuses,
+        }
+        print(f"workers={n_workers}: {json.dumps(results[n_workers])}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure sharded-host throughput versus worker count")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--users", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64, help="Requests in flight at the dispatcher")
+    parser.add_argument("--worker-concurrency", type=int, default=16, help="Turns in flight per worker")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0)
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    print(f"CPU cores available: {os.cpu_count()}")
+    bench_results = asyncio.run(bench(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cpu_count": os.cpu_count(), "results": bench_results}, f, indent=2)
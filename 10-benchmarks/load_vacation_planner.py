@@ -0,0 +1,182 @@
+"""
+Closed-loop load generator for vacation_planner.
+
+N simulated users each hold a session and send turns back to back (with an
+optional seeded think time) through one Runner. Models are StubLlm instances
+(the coordinator routes weather questions to weather_agent and the rest to
+travel_agent), and the tools call the seeded providers of
+07-multi-agent-system/providers.py with the configured latency, error rate,
+rate limit and concurrency cap. For each concurrency level it reports
+throughput, turn latency percentiles and where the queueing happens:
+provider queue waits, event-loop lag (turns waiting for the CPU) and the
+latency inflation over the first level.
+
+    python load_vacation_planner.py --users 1 4 16 64 --turns-per-user 10 \\
+        --model-latency-ms 200 --provider-latency lognormal:300:0.8 --provider-concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from stub_llm import StubLlm, install_stub_models
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from agent_registry import registry  # noqa: E402  (lives at the repo root)
+
+
+def fc(name, **args):
+    """Shorthand for a scripted function-call step."""
+    return {"function_call": {"name": name, "args": args}}
+
+
+SCRIPTS = {
+    "weather_agent": [fc("get_weather", location="Lisbon", date="2025-06-01"), {"text": "Lisbon will be sunny."}],
+    "travel_agent": [
+        fc("get_transportation_options", origin="Paris", destination="Lisbon", date="2025-06-01"),
+        fc("get_accommodation_options", location="Lisbon", check_in="2025-06-01", check_out="2025-06-05"),
+        {"text": "Fly to Lisbon and stay at the Boutique Hotel."},
+    ],
+}
+
+QUESTIONS = [
+    "What will the weather be like in Lisbon on June 1st?",
+    "How do I get from Paris to Lisbon on June 1st, and where should I stay?",
+]
+
+
+class CoordinatorStub(StubLlm):
+    """Stub for vacation_planner: transfers by the user's question, as the real prompt asks it to."""
+
+    def _next_step(self, llm_request):
+        user_text = next((part.text for content in reversed(llm_request.contents) if content.role == "user"
+                          for part in content.parts or [] if part.text), "")
+        target = "weather_agent" if "weather" in user_text.lower() else "travel_agent"
+        return fc("transfer_to_agent", agent_name=target)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+
+async def loop_lag_monitor(samples, interval=0.01):
+    """Record how late the event loop wakes a sleeping task: time spent waiting for the CPU."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def simulated_user(runner, session_service, user_index, args, latencies, tool_errors):
+    rng = random.Random(f"{args.seed}:user:{user_index}")
+    user_id = f"user-{user_index}"
+    session = await session_service.create_session(app_name="LoadTest", user_id=user_id)
+    question = QUESTIONS[user_index % len(QUESTIONS)]
+    for _ in range(args.turns_per_user):
+        if args.think_ms:
+            await asyncio.sleep(rng.expovariate(1000 / args.think_ms))
+        content = types.Content(role="user", parts=[types.Part(text=question)])
+        start = time.perf_counter()
+        async for event in runner.run_async(user_id=user_id, session_id=session.id, new_message=content):
+            for response in event.get_function_responses():
+                if isinstance(response.response, dict) and response.response.get("status") == "error":
+                    tool_errors.append(response.response.get("error"))
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_level(agent, providers, users, args):
+    """Drive `users` concurrent users through a fresh session service; returns the level's report."""
+    providers.configure_providers(
+        latency=providers.Latency.parse(args.provider_latency),
+        error_rate=args.error_rate,
+        rate_limit_per_second=args.rate_limit,
+        burst=args.burst,
+        max_concurrency=args.provider_concurrency,
+        seed=args.seed,
+    )
+    session_service = InMemorySessionService()
+    runner = Runner(agent=agent, app_name="LoadTest", session_service=session_service)
+    latencies, tool_errors, lag = [], [], []
+    monitor = asyncio.create_task(loop_lag_monitor(lag))
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*[
+            simulated_user(runner, session_service, index, args, latencies, tool_errors) for index in range(users)
+        ])
+    finally:
+        monitor.cancel()
+    elapsed = time.perf_counter() - start
+
+    throughput = len(latencies) / elapsed
+    return {
+        "users": users,
+        "turns": len(latencies),
+        "throughput_per_second": round(throughput, 2),
+        "latency_p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "latency_p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "latency_p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        # Little's law: turns in flight on average (users minus those thinking)
+        "mean_in_flight": round(throughput * statistics.mean(latencies), 2) if latencies else 0.0,
+        "loop_lag_p95_ms": round(percentile(lag, 0.95) * 1000, 2),
+        "tool_error_rate": round(len(tool_errors) / max(1, sum(p.stats.calls for p in providers.PROVIDERS.values())), 4),
+        "providers": providers.provider_summary(),
+    }
+
+
+async def main(args):
+    agent = registry.get("vacation_planner")
+    # The providers module the agent's tools imported (imported along with the agent)
+    providers = sys.modules["providers"]
+    latency, jitter = args.model_latency_ms / 1000, args.model_jitter_ms / 1000
+    install_stub_models(agent, SCRIPTS, latency_seconds=latency, latency_jitter_seconds=jitter, seed=args.seed)
+    agent.model = CoordinatorStub(model="stub-vacation_planner", latency_seconds=latency,
+                                  latency_jitter_seconds=jitter, seed=args.seed)
+
+    results = []
+    for users in args.users:
+        level = await run_level(agent, providers, users, args)
+        baseline = results[0]["latency_p50_ms"] if results else level["latency_p50_ms"]
+        level["latency_inflation"] = round(level["latency_p50_ms"] / baseline, 2) if baseline else None
+        results.append(level)
+        queue_p95 = max((p["queue_wait_p95_ms"] or 0.0) for p in level["providers"].values())
+        rejected = sum(p["rate_limited"] for p in level["providers"].values())
+        print(f"users={users:<4} {level['throughput_per_second']:8.2f} turns/s  p50 {level['latency_p50_ms']:8.1f} ms"
+              f"  p95 {level['latency_p95_ms']:8.1f} ms  p99 {level['latency_p99_ms']:8.1f} ms"
+              f"  x{level['latency_inflation']:<5} provider queue p95 {queue_p95:7.1f} ms"
+              f"  loop lag p95 {level['loop_lag_p95_ms']:6.2f} ms  tool errors {level['tool_error_rate']:.1%}"
+              f" ({rejected} rate limited)")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test vacation_planner with simulated users and providers")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4, 16, 64], help="Concurrency levels to run")
+    parser.add_argument("--turns-per-user", type=int, default=10)
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Mean think time between a user's turns")
+    parser.add_argument("--model-latency-ms", type=float, default=200.0)
+    parser.add_argument("--model-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--provider-latency", default="lognormal:300:0.8",
+                        help="Provider latency as kind:median_ms[:shape] (fixed, uniform, lognormal, pareto)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Injected provider failure rate")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requests per second allowed per provider")
+    parser.add_argument("--burst", type=int, default=None, help="Rate-limit bucket size (default: one second's worth)")
+    parser.add_argument("--provider-concurrency", type=int, default=None, help="Concurrent calls per provider before queueing")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    load_results = asyncio.run(main(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": vars(args), "results": load_results}, f, indent=2)
@@ -0,0 +1,114 @@
+import asyncio
+import random
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+
+def answered_calls(llm_request: LlmRequest) -> List[str]:
+    """
+    Names of the function responses the model hasn't seen yet: those after the
+    last model content. Not just the last content, since with a static_instruction
+    ADK puts the dynamic instruction in as a user content after the tool result.
+    """
+    for content in reversed(llm_request.contents or []):
+        if content.role == "model":
+            break
+        answered = [p.function_response.name for p in content.parts or [] if p.function_response]
+        if answered:
+            return answered
+    return []
+
+
+class StubLlm(BaseLlm):
+    """
+    Deterministic local stand-in for a real model.
+
+    The script is a list of steps, each either {"function_call": {"name": ..., "args": {...}}}
+    or {"text": "..."}. The step to answer with is derived from the request itself: if the
+    latest content carries the response to a scripted function call, the step after that call
+    is used, otherwise the first step. This keeps the stub stateless, so one instance can serve
+    any number of concurrent sessions and replays identically.
+    """
+
+    script: List[Dict[str, Any]] = [{"text": "OK"}]
+    latency_seconds: float = 0.0
+    latency_jitter_seconds: float = 0.0
+    seed: int = 0
+    stream_chunk_size: int = 0  # > 0 splits text steps into partial chunks when streaming
+    calls: int = 0
+
+    @classmethod
+    def supported_models(cls) -> List[str]:
+        return [r"stub-.*"]
+
+    def _next_step(self, llm_request: LlmRequest) -> Dict[str, Any]:
+        """Pick the scripted step that follows the latest tool result in the request."""
+        answered = answered_calls(llm_request)
+        if answered:
+            for index, step in enumerate(self.script):
+                call = step.get("function_call")
+                if call and call["name"] == answered[-1] and index + 1 < len(self.script):
+                    return self.script[index + 1]
+            return self.script[-1]
+        return self.script[0]
+
+    def _latency(self, llm_request: LlmRequest) -> float:
+        """Configured latency, with reproducible jitter seeded from the request size."""
+        if not self.latency_jitter_seconds:
+            return self.latency_seconds
+        rng = random.Random(self.seed + len(llm_request.contents))
+        return max(0.0, self.latency_seconds + rng.uniform(-1, 1) * self.latency_jitter_seconds)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        step = self._next_step(llm_request)
+
+        latency = self._latency(llm_request)
+        if latency:
+            await asyncio.sleep(latency)
+
+        usage = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=len(llm_request.contents), candidates_token_count=1, total_token_count=len(llm_request.contents) + 1
+        )
+
+        if "function_call" in step:
+            call = step["function_call"]
+            part = types.Part(function_call=types.FunctionCall(name=call["name"], args=dict(call.get("args", {}))))
+            yield LlmResponse(content=types.Content(role="model", parts=[part]), usage_metadata=usage)
+            return
+
+        text = step.get("text", "")
+        if stream and self.stream_chunk_size:
+            for start in range(0, len(text), self.stream_chunk_size):
+                chunk = text[start:start + self.stream_chunk_size]
+                yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=chunk)]), partial=True)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]), usage_metadata=usage)
+
+
+def install_stub_models(agent, scripts: Dict[str, List[Dict[str, Any]]], latency_seconds: float = 0.0,
+                        latency_jitter_seconds: float = 0.0, seed: int = 0, default_script: Optional[List[Dict[str, Any]]] = None):
+    """Replace the model of an agent and all of its sub-agents with StubLlm instances (scripts keyed by agent name)."""
+    stubs = {}
+
+    def swap(node):
+        script = scripts.get(node.name, default_script or [{"text": f"Stub reply from {node.name}"}])
+        stub = StubLlm(
+            model=f"stub-{node.name}",
+            script=script,
+            latency_seconds=latency_seconds,
+            latency_jitter_seconds=latency_jitter_seconds,
+            seed=seed,
+        )
+        node.model = stub
+        stubs[node.name] = stub
+        for sub_agent in getattr(node, "sub_agents", []) or []:
+            swap(sub_agent)
+
+    swap(agent)
+    return stubs
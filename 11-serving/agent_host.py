@@ -0,0 +1,356 @@
+"""
+Serve several agents from one process over a local HTTP API.
+
+Each agent gets its own Runner on a shared session service, a concurrency
+limit and a bounded wait queue: once both are full, new requests get 429
+with a Retry-After header instead of piling up. On shutdown the host stops
+admitting work (503), lets in-flight turns finish for up to --drain-timeout
+seconds and then cancels whatever is left.
+
+    python agent_host.py --port 8080
+    python agent_host.py --agents stock_agent memory_agent --limit memory_agent=2:8
+
+    curl -X POST localhost:8080/agents/stock_agent/run \\
+         -H 'Content-Type: application/json' \\
+         -d '{"user_id": "alice", "message": "What is AAPL trading at?"}'
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService, DatabaseSessionService
+from google.genai import types
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from agent_registry import registry  # noqa: E402  (lives at the repo root)
+
+DEFAULT_AGENTS = ["stock_agent", "02-adding-tools/weather_agent", "memory_agent", "vacation_planner", "ticket_agent"]
+
+# Initial session state for agents whose tools expect it
+INITIAL_STATE = {
+    "memory_agent": {"username": "User", "reminders": []},
+}
+
+
+class Saturated(Exception):
+    """The agent's concurrency slots and wait queue are all taken."""
+
+
+class Draining(Exception):
+    """The host is shutting down and no longer admits work."""
+
+
+class AgentSlot:
+    """One served agent: its Runner, concurrency limit and bounded wait queue."""
+
+    def __init__(self, agent, session_service, max_concurrency=4, max_queue=16):
+        self.agent = agent
+        self.name = agent.name
+        self.app_name = agent.name
+        self.session_service = session_service
+        self.runner = Runner(agent=agent, app_name=self.app_name, session_service=session_service)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.stats = {"completed": 0, "failed": 0, "rejected": 0, "latency_seconds": 0.0}
+        # Turns on the same session run one after another:
+        # (user_id, session_id) -> [lock, turns holding or waiting on it]; dropped once unused
+        self.session_locks: Dict[tuple, list] = {}
+
+    def admit(self):
+        """Reserve a place in the queue or raise Saturated."""
+        if self.in_flight + self.waiting >= self.max_concurrency + self.max_queue:
+            self.stats["rejected"] += 1
+            raise Saturated(self.name)
+        self.waiting += 1
+
+    async def create_session(self, user_id, session_id=None, state=None):
+        session = await self.session_service.create_session(
+            app_name=self.app_name,
+            user_id=user_id,
+            session_id=session_id or str(uuid.uuid4()),
+            state={**INITIAL_STATE.get(self.name, {}), **(state or {})}
+        )
+        return session.id
+
+    async def ensure_session(self, user_id, session_id):
+        session = await self.session_service.get_session(
+            app_name=self.app_name, user_id=user_id, session_id=session_id
+        )
+        if session is None:
+            await self.create_session(user_id, session_id)
+
+    @asynccontextmanager
+    async def session_turn(self, user_id, session_id):
+        """Hold the session's lock for one turn."""
+        key = (user_id, session_id)
+        entry = self.session_locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self.session_locks[key]
+
+    async def run(self, user_id, session_id, message) -> Dict[str, Any]:
+        """
+        Run one turn; the caller must have called admit() first. The session
+        (a new one when session_id is None) is only created once the turn is
+        admitted, so rejected requests leave nothing behind.
+        """
+        start = time.monotonic()
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            return await self._run_turn(user_id, session_id, message, start)
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+
+    async def _run_turn(self, user_id, session_id, message, start):
+        content = types.Content(role="user", parts=[types.Part(text=message)])
+        try:
+            if session_id is None:
+                session_id = await self.create_session(user_id)
+            async with self.session_turn(user_id, session_id):
+                await self.ensure_session(user_id, session_id)
+                final_response_text = None
+                async for event in self.runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
+                    if event.is_final_response() and event.content and event.content.parts:
+                        final_response_text = "".join(
+                            part.text for part in event.content.parts if getattr(part, "text", None)
+                        )
+                session = await self.session_service.get_session(
+                    app_name=self.app_name, user_id=user_id, session_id=session_id
+                )
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        latency = time.monotonic() - start
+        self.stats["completed"] += 1
+        self.stats["latency_seconds"] += latency
+        output_key = getattr(self.agent, "output_key", None)
+        return {
+            "agent": self.name,
+            "user_id": user_id,
+            "session_id": session_id,
+            "response": final_response_text,
+            # Structured output (e.g. "ticket") saved by the agent
+            "output": session.state.get(output_key) if output_key and session else None,
+            "latency_seconds": round(latency, 3),
+        }
+
+    def status(self) -> Dict[str, Any]:
+        completed = self.stats["completed"] or 1
+        return {
+            "name": self.name,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.stats["completed"],
+            "failed": self.stats["failed"],
+            "rejected": self.stats["rejected"],
+            "mean_latency_seconds": round(self.stats["latency_seconds"] / completed, 3),
+        }
+
+
+class AgentHost:
+    """All served agents, the shared session service and the drain state."""
+
+    def __init__(self, session_service, drain_timeout=30.0):
+        self.session_service = session_service
+        self.drain_timeout = drain_timeout
+        self.slots: Dict[str, AgentSlot] = {}
+        self.drain_started: Optional[float] = None
+        self._tasks = set()
+
+    @property
+    def draining(self) -> bool:
+        return self.drain_started is not None
+
+    def add(self, agent, max_concurrency=4, max_queue=16):
+        self.slots[agent.name] = AgentSlot(agent, self.session_service, max_concurrency, max_queue)
+
+    def slot(self, name) -> AgentSlot:
+        if name not in self.slots:
+            raise KeyError(name)
+        return self.slots[name]
+
+    async def run(self, name, user_id, session_id, message):
+        """
+        Admit and run one turn as a tracked task, so drain() can wait for or
+        cancel it. session_id=None starts a new session (its id is in the result).
+        """
+        if self.draining:
+            raise Draining()
+        slot = self.slot(name)
+        slot.admit()
+        task = asyncio.ensure_future(slot.run(user_id, session_id, message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        # shield: a client disconnect must not cancel a turn that is mid-way through updating the session
+        return await asyncio.shield(task)
+
+    def begin_drain(self):
+        """Stop admitting work; the drain timeout counts from the first call."""
+        if self.drain_started is None:
+            self.drain_started = time.monotonic()
+
+    async def drain(self):
+        """Wait for in-flight turns until the drain timeout, then cancel stragglers. Returns the number cancelled."""
+        self.begin_drain()
+        if not self._tasks:
+            return 0
+        remaining = max(0.0, self.drain_started + self.drain_timeout - time.monotonic())
+        _, pending = await asyncio.wait(set(self._tasks), timeout=remaining)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return len(pending)
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that stops admitting agent turns as soon as a shutdown signal arrives."""
+
+    def __init__(self, config, agent_host: AgentHost):
+        super().__init__(config)
+        self.agent_host = agent_host
+
+    def handle_exit(self, sig, frame):
+        self.agent_host.begin_drain()
+        super().handle_exit(sig, frame)
+
+
+class CreateSessionRequest(BaseModel):
+    user_id: str
+    session_id: Optional[str] = None
+    state: Optional[Dict[str, Any]] = None
+
+
+class RunRequest(BaseModel):
+    user_id: str
+    message: str
+    session_id: Optional[str] = None
+
+
+def create_app(host: AgentHost) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        cancelled = await host.drain()
+        if cancelled:
+            print(f"Drain timed out; cancelled {cancelled} in-flight turn(s)")
+
+    app = FastAPI(title="Agent Host", lifespan=lifespan)
+
+    def get_slot(name) -> AgentSlot:
+        try:
+            return host.slot(name)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Unknown agent '{name}'")
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "draining" if host.draining else "ok"}
+
+    @app.get("/agents")
+    async def list_agents() -> List[Dict[str, Any]]:
+        return [slot.status() for slot in host.slots.values()]
+
+    @app.post("/agents/{name}/sessions")
+    async def create_session(name: str, request: CreateSessionRequest):
+        slot = get_slot(name)
+        session_id = await slot.create_session(request.user_id, request.session_id, request.state)
+        return {"agent": name, "user_id": request.user_id, "session_id": session_id}
+
+    @app.post("/agents/{name}/run")
+    async def run(name: str, request: RunRequest):
+        get_slot(name)
+        try:
+            # The session is looked up or created only after admission, so 429/503s don't leave sessions behind
+            return await host.run(name, request.user_id, request.session_id, request.message)
+        except Saturated:
+            raise HTTPException(status_code=429, detail=f"Agent '{name}' is at capacity",
+                                headers={"Retry-After": "1"})
+        except Draining:
+            raise HTTPException(status_code=503, detail="Server is shutting down",
+                                headers={"Retry-After": "5"})
+
+    return app
+
+
+def parse_limits(values) -> Dict[str, tuple]:
+    """Parse --limit NAME=CONCURRENCY[:QUEUE] overrides."""
+    limits = {}
+    for value in values or []:
+        name, _, spec = value.partition("=")
+        concurrency, _, queue = spec.partition(":")
+        limits[name] = (int(concurrency), int(queue) if queue else None)
+    return limits
+
+
+def build_host(args) -> AgentHost:
+    # One session service for every agent; each agent is its own ADK app
+    if args.db_url:
+        session_service = DatabaseSessionService(db_url=args.db_url)
+    else:
+        session_service = InMemorySessionService()
+
+    host = AgentHost(session_service, drain_timeout=args.drain_timeout)
+    limits = parse_limits(args.limit)
+    for name in args.agents:
+        agent = registry.get(name)
+        concurrency, queue = limits.get(agent.name, limits.get(name, (args.concurrency, None)))
+        host.add(agent, max_concurrency=concurrency, max_queue=args.queue if queue is None else queue)
+    return host
+
+
+def add_host_arguments(parser):
+    """Options shared by this host and the sharded host (which passes them on to every worker)."""
+    parser.add_argument("--agents", nargs="+", default=DEFAULT_AGENTS, metavar="AGENT",
+                        help="Agent names from the registry (list them with: python agent_registry.py)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Turns running at once per agent")
+    parser.add_argument("--queue", type=int, default=16, help="Turns allowed to wait per agent before 429")
+    parser.add_argument("--limit", action="append", metavar="NAME=CONCURRENCY[:QUEUE]",
+                        help="Per-agent override, e.g. memory_agent=2:8 (repeatable)")
+    parser.add_argument("--drain-timeout", type=float, default=30.0, help="Seconds to let in-flight turns finish on shutdown")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve several agents over a local HTTP API")
+    add_host_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db-url", default=None, help="Persist sessions, e.g. sqlite+aiosqlite:///./host_sessions.db")
+    args = parser.parse_args()
+
+    load_dotenv()
+    agent_host = build_host(args)
+    config = uvicorn.Config(
+        create_app(agent_host),
+        host=args.host,
+        port=args.port,
+        timeout_graceful_shutdown=args.drain_timeout,
+    )
+    asyncio.run(DrainingServer(config, agent_host).serve())
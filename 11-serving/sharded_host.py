@@ -0,0 +1,365 @@
+"""
+Sharded serving: one dispatcher in front of N agent_host worker processes.
+
+Every request is routed by consistent-hashing its user_id, so all of a
+user's sessions live on (and only on) one worker, each with its own session
+store: a SQLite shard per worker with --db-dir, in memory otherwise. Workers
+listen on Unix sockets and run the same app as agent_host.py, so each one
+brings its own core, event loop, concurrency limits and 429 backpressure.
+
+Adding a worker (POST /workers) moves only the users whose ring position now
+belongs to it: traffic is paused, their sessions are exported from the old
+shards, imported into the new one and deleted at the source, then the ring
+is switched.
+
+    python sharded_host.py --workers 4 --db-dir ./shards --port 8080
+    curl -X POST localhost:8080/workers      # scale out by one worker
+"""
+import argparse
+import asyncio
+import bisect
+import hashlib
+import importlib
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+import agent_host
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes; adding a node moves about 1/N of the keys."""
+
+    def __init__(self, nodes=(), vnodes: int = 128):
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        self.nodes: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def add(self, node: str):
+        self.nodes.append(node)
+        for replica in range(self.vnodes):
+            point = self._hash(f"{node}#{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str):
+        self.nodes.remove(node)
+        keep = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in keep]
+        self._owners = [o for _, o in keep]
+
+    def node_for(self, key: str) -> str:
+        if not self._points:
+            raise LookupError("the ring has no nodes")
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[index]
+
+    def copy(self) -> "HashRing":
+        ring = HashRing(vnodes=self.vnodes)
+        ring.nodes, ring._points, ring._owners = list(self.nodes), list(self._points), list(self._owners)
+        return ring
+
+
+# --- Worker process -------------------------------------------------------------
+
+class UserIds(BaseModel):
+    user_ids: List[str]
+
+
+class SessionDumps(BaseModel):
+    sessions: List[Dict[str, Any]]
+
+
+def create_worker_app(host: agent_host.AgentHost) -> FastAPI:
+    """agent_host's app plus the admin endpoints the dispatcher uses to move users between shards."""
+    from google.adk.events import Event
+
+    app = agent_host.create_app(host)
+    session_service = host.session_service
+
+    @app.get("/admin/users")
+    async def users():
+        result = {}
+        for slot in host.slots.values():
+            listed = await session_service.list_sessions(app_name=slot.app_name)
+            result[slot.app_name] = sorted({s.user_id for s in listed.sessions})
+        return result
+
+    @app.post("/admin/export")
+    async def export_sessions(request: UserIds):
+        wanted = set(request.user_ids)
+        dumps = []
+        for slot in host.slots.values():
+            listed = await session_service.list_sessions(app_name=slot.app_name)
+            for summary in listed.sessions:
+                if summary.user_id not in wanted:
+                    continue
+                session = await session_service.get_session(
+                    app_name=slot.app_name, user_id=summary.user_id, session_id=summary.id
+                )
+                dumps.append(session.model_dump(mode="json"))
+        return {"sessions": dumps}
+
+    @app.post("/admin/import")
+    async def import_sessions(request: SessionDumps):
+        for dump in request.sessions:
+            # Start from the final state; replaying the events' deltas on top leaves it unchanged
+            session = await session_service.create_session(
+                app_name=dump["app_name"], user_id=dump["user_id"], session_id=dump["id"], state=dump["state"]
+            )
+            for event in dump["events"]:
+                await session_service.append_event(session, Event.model_validate(event))
+        return {"imported": len(request.sessions)}
+
+    @app.post("/admin/delete")
+    async def delete_sessions(request: SessionDumps):
+        for dump in request.sessions:
+            await session_service.delete_session(
+                app_name=dump["app_name"], user_id=dump["user_id"], session_id=dump["id"]
+            )
+        return {"deleted": len(request.sessions)}
+
+    return app
+
+
+def worker_main(worker_id: str, socket_path: str, options: Dict[str, Any]):
+    """Entry point of a worker process: an agent_host on a Unix socket with its own session shard."""
+    load_dotenv()
+    args = argparse.Namespace(**options)
+    args.db_url = f"sqlite+aiosqlite:///{Path(options['db_dir']) / f'{worker_id}.db'}" if options["db_dir"] else None
+    host = agent_host.build_host(args)
+    if options.get("agent_setup"):
+        # Hook for benchmarks/tests, e.g. "bench_sharding:install_stubs", called with the host
+        module_name, _, func_name = options["agent_setup"].partition(":")
+        getattr(importlib.import_module(module_name), func_name)(host)
+
+    config = uvicorn.Config(create_worker_app(host), uds=socket_path, log_level="warning",
+                            timeout_graceful_shutdown=args.drain_timeout)
+    asyncio.run(agent_host.DrainingServer(config, host).serve())
+
+
+class WorkerHandle:
+    """A worker process and the HTTP client that talks to it."""
+
+    def __init__(self, worker_id: str, socket_path: str, process):
+        self.worker_id = worker_id
+        self.socket_path = socket_path
+        self.process = process
+        self.client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(uds=socket_path),
+            base_url="http://worker",
+            timeout=None,
+        )
+
+
+# --- Dispatcher -----------------------------------------------------------------
+
+class ShardDispatcher:
+    """Starts the workers, routes requests by user_id and rebalances when workers are added."""
+
+    def __init__(self, options: Dict[str, Any], vnodes: int = 128, socket_dir: Optional[str] = None):
+        self.options = options
+        self.ring = HashRing(vnodes=vnodes)
+        self.workers: Dict[str, WorkerHandle] = {}
+        self.socket_dir = socket_dir or tempfile.mkdtemp(prefix="agent-shards-")
+        self._context = multiprocessing.get_context("spawn")
+        self._next_worker = 0
+        # Requests in flight, and a gate that a rebalance closes while users move
+        self._in_flight = 0
+        self._open = asyncio.Event()
+        self._open.set()
+        self._idle = asyncio.Condition()
+        self._rebalance_lock = asyncio.Lock()
+        self.stats = {"forwarded": 0, "rebalances": 0, "sessions_moved": 0}
+
+    async def _spawn(self, ready_timeout: float = 120.0) -> WorkerHandle:
+        worker_id = f"shard-{self._next_worker}"
+        self._next_worker += 1
+        socket_path = os.path.join(self.socket_dir, f"{worker_id}.sock")
+        process = self._context.Process(target=worker_main, args=(worker_id, socket_path, self.options),
+                                        name=worker_id, daemon=True)
+        process.start()
+        handle = WorkerHandle(worker_id, socket_path, process)
+
+        # Wait until the worker has imported its agents and is listening
+        deadline = time.monotonic() + ready_timeout
+        while True:
+            if not process.is_alive():
+                raise RuntimeError(f"{worker_id} exited during startup (code {process.exitcode})")
+            try:
+                if (await handle.client.get("/healthz")).status_code == 200:
+                    return handle
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError(f"{worker_id} did not start within {ready_timeout}s")
+            await asyncio.sleep(0.1)
+
+    async def start(self, n_workers: int):
+        os.makedirs(self.socket_dir, exist_ok=True)
+        if self.options.get("db_dir"):
+            os.makedirs(self.options["db_dir"], exist_ok=True)
+        handles = await asyncio.gather(*[self._spawn() for _ in range(n_workers)])
+        for handle in handles:
+            self.workers[handle.worker_id] = handle
+            self.ring.add(handle.worker_id)
+
+    async def forward(self, method: str, path: str, user_id: str, json: Optional[Dict] = None) -> httpx.Response:
+        """Send a request to the worker that owns user_id."""
+        await self._open.wait()
+        self._in_flight += 1
+        try:
+            worker = self.workers[self.ring.node_for(user_id)]
+            self.stats["forwarded"] += 1
+            return await worker.client.request(method, path, json=json)
+        finally:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                async with self._idle:
+                    self._idle.notify_all()
+
+    async def add_worker(self) -> Dict[str, Any]:
+        """Start one more worker and move the users that now hash to it."""
+        async with self._rebalance_lock:
+            handle = await self._spawn()
+            new_ring = self.ring.copy()
+            new_ring.add(handle.worker_id)
+
+            # Pause routing and let requests already inside workers finish
+            self._open.clear()
+            try:
+                async with self._idle:
+                    await self._idle.wait_for(lambda: self._in_flight == 0)
+
+                moved = 0
+                for worker in self.workers.values():
+                    apps = (await worker.client.get("/admin/users")).json()
+                    users = {u for app_users in apps.values() for u in app_users}
+                    leaving = sorted(u for u in users if new_ring.node_for(u) == handle.worker_id)
+                    if not leaving:
+                        continue
+                    dumps = (await worker.client.post("/admin/export", json={"user_ids": leaving})).json()
+                    (await handle.client.post("/admin/import", json=dumps)).raise_for_status()
+                    (await worker.client.post("/admin/delete", json=dumps)).raise_for_status()
+                    moved += len(dumps["sessions"])
+
+                self.workers[handle.worker_id] = handle
+                self.ring = new_ring
+            finally:
+                self._open.set()
+
+        self.stats["rebalances"] += 1
+        self.stats["sessions_moved"] += moved
+        return {"worker": handle.worker_id, "workers": len(self.workers), "sessions_moved": moved}
+
+    async def status(self) -> List[Dict[str, Any]]:
+        result = []
+        for worker_id, worker in self.workers.items():
+            agents = (await worker.client.get("/agents")).json()
+            result.append({"worker": worker_id, "pid": worker.process.pid, "alive": worker.process.is_alive(),
+                           "agents": agents})
+        return result
+
+    async def stop(self):
+        """Ask every worker to drain (SIGTERM) and wait for it to exit."""
+        for worker in self.workers.values():
+            if worker.process.is_alive():
+                os.kill(worker.process.pid, signal.SIGTERM)
+        drain_timeout = self.options.get("drain_timeout", 30.0)
+        for worker in self.workers.values():
+            await asyncio.to_thread(worker.process.join, drain_timeout + 5)
+            if worker.process.is_alive():
+                worker.process.kill()
+            await worker.client.aclose()
+
+
+def create_dispatcher_app(dispatcher: ShardDispatcher, n_workers: int) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app):
+        await dispatcher.start(n_workers)
+        yield
+        await dispatcher.stop()
+
+    app = FastAPI(title="Sharded Agent Host", lifespan=lifespan)
+
+    def relay(response: httpx.Response) -> JSONResponse:
+        headers = {k: v for k, v in response.headers.items() if k.lower() == "retry-after"}
+        try:
+            body = response.json()
+        except ValueError:
+            body = {"detail": response.text}
+        return JSONResponse(body, status_code=response.status_code, headers=headers)
+
+    async def user_request(request: Request) -> Dict[str, Any]:
+        body = await request.json()
+        if not isinstance(body, dict) or not body.get("user_id"):
+            raise HTTPException(status_code=422, detail="user_id is required")
+        return body
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "ok", "workers": len(dispatcher.workers)}
+
+    @app.get("/workers")
+    async def workers():
+        return {"ring": dispatcher.ring.nodes, "stats": dispatcher.stats, "workers": await dispatcher.status()}
+
+    @app.post("/workers")
+    async def add_worker():
+        return await dispatcher.add_worker()
+
+    @app.post("/agents/{name}/sessions")
+    async def create_session(name: str, request: Request):
+        body = await user_request(request)
+        return relay(await dispatcher.forward("POST", f"/agents/{name}/sessions", body["user_id"], body))
+
+    @app.post("/agents/{name}/run")
+    async def run(name: str, request: Request):
+        body = await user_request(request)
+        return relay(await dispatcher.forward("POST", f"/agents/{name}/run", body["user_id"], body))
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve agents from N worker processes sharded by user_id")
+    agent_host.add_host_arguments(parser)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: one per core)")
+    parser.add_argument("--db-dir", default=None, help="Directory for one SQLite session shard per worker (default: in memory)")
+    parser.add_argument("--vnodes", type=int, default=128, help="Virtual nodes per worker on the hash ring")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    load_dotenv()
+    worker_options = {
+        "agents": args.agents,
+        "concurrency": args.concurrency,
+        "queue": args.queue,
+        "limit": args.limit,
+        "drain_timeout": args.drain_timeout,
+        "db_dir": os.path.abspath(args.db_dir) if args.db_dir else None,
+    }
+    shard_dispatcher = ShardDispatcher(worker_options, vnodes=args.vnodes)
+    uvicorn.run(create_dispatcher_app(shard_dispatcher, args.workers), host=args.host, port=args.port)
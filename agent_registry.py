@@ -0,0 +1,273 @@
+"""
+Lazy registry of the lesson agents.
+
+Discovery parses each lesson's `<package>/agent.py` with `ast` instead of
+importing it, so listing agents costs milliseconds and pulls in neither
+google.adk nor any tool dependency. An agent module is imported only when
+the agent is first requested, and the built agent is cached.
+
+    from agent_registry import registry
+    registry.names()                    # every discovered agent, nothing imported
+    agent = registry.get("ticket_agent")
+
+Import-time report (fresh interpreters, `python -X importtime`):
+
+    python agent_registry.py --report
+"""
+import argparse
+import ast
+import importlib
+import json
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent
+_LESSON_RE = re.compile(r"^\d\d-")
+
+
+def import_from_lesson(lesson_dir: str, module_name: str, attr: str):
+    """
+    Import an attribute from a lesson directory.
+
+    Lessons import their siblings by top-level name (02 and 07 both ship a
+    `weather_agent` package), so cached modules with clashing names are
+    dropped before importing.
+    """
+    lesson_path = REPO_ROOT / lesson_dir
+    local_names = {p.stem for p in lesson_path.iterdir() if p.suffix == ".py" or (p / "__init__.py").exists()}
+    for name in list(sys.modules):
+        if name.split(".")[0] in local_names:
+            del sys.modules[name]
+
+    sys.path.insert(0, str(lesson_path))
+    try:
+        module = importlib.import_module(module_name)
+    finally:
+        sys.path.remove(str(lesson_path))
+    return getattr(module, attr)
+
+
+class AgentSpec:
+    """Where an agent lives, as found by static discovery."""
+
+    def __init__(self, lesson_dir: str, package: str, attr: str, agent_name: Optional[str]):
+        self.lesson_dir = lesson_dir
+        self.package = package
+        self.attr = attr
+        self.agent_name = agent_name
+
+    @property
+    def key(self) -> str:
+        return f"{self.lesson_dir}/{self.package}"
+
+    @property
+    def module(self) -> str:
+        return f"{self.package}.agent"
+
+    def __repr__(self):
+        return f"AgentSpec({self.key!r}, attr={self.attr!r}, agent_name={self.agent_name!r})"
+
+
+def _agent_assignments(tree: ast.Module) -> Dict[str, Optional[str]]:
+    """Module-level `x = Agent(name="...")` assignments: variable -> agent name."""
+    found = {}
+    for node in tree.body:
+        if not isinstance(node, ast.Assign) or not isinstance(node.value, ast.Call):
+            continue
+        func = node.value.func
+        func_name = func.id if isinstance(func, ast.Name) else getattr(func, "attr", None)
+        if func_name not in ("Agent", "LlmAgent"):
+            continue
+        agent_name = next(
+            (kw.value.value for kw in node.value.keywords
+             if kw.arg == "name" and isinstance(kw.value, ast.Constant)),
+            None
+        )
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                found[target.id] = agent_name
+    return found
+
+
+def _root_alias(tree: ast.Module) -> Optional[str]:
+    """Variable that `root_agent = <variable>` points at, if any."""
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and isinstance(node.value, ast.Name)
+                and any(isinstance(t, ast.Name) and t.id == "root_agent" for t in node.targets)):
+            return node.value.id
+    return None
+
+
+def discover(root: Path = REPO_ROOT) -> List[AgentSpec]:
+    """Find the agent of every lesson package without importing anything."""
+    specs = []
+    for lesson in sorted(p for p in root.iterdir() if p.is_dir() and _LESSON_RE.match(p.name)):
+        for agent_file in sorted(lesson.glob("*/agent.py")):
+            package = agent_file.parent.name
+            if not (agent_file.parent / "__init__.py").exists():
+                continue
+            tree = ast.parse(agent_file.read_text(), filename=str(agent_file))
+            assignments = _agent_assignments(tree)
+            if not assignments:
+                continue
+            # root_agent if the module defines one, else the agent named after the package, else the first
+            if "root_agent" in assignments:
+                attr = "root_agent"
+                agent_name = assignments["root_agent"]
+            else:
+                alias = _root_alias(tree)
+                attr = "root_agent" if alias in assignments else (
+                    package if package in assignments else next(iter(assignments)))
+                agent_name = assignments[alias if attr == "root_agent" else attr]
+            specs.append(AgentSpec(lesson.name, package, attr, agent_name))
+    return specs
+
+
+class AgentRegistry:
+    """
+    Agents by name, built on first use.
+
+    An agent can be requested by its qualified key ("07-multi-agent-system/
+    weather_agent"), its package name or its agent name; a bare name shared by
+    several lessons must be qualified.
+    """
+
+    def __init__(self, root: Path = REPO_ROOT, cache_declarations: bool = True):
+        self.root = root
+        self.cache_declarations = cache_declarations
+        self._specs: Optional[Dict[str, AgentSpec]] = None
+        self._aliases: Dict[str, List[str]] = {}
+        self._agents: Dict[str, object] = {}
+
+    @property
+    def specs(self) -> Dict[str, AgentSpec]:
+        if self._specs is None:
+            self._specs = {}
+            for spec in discover(self.root):
+                self._specs[spec.key] = spec
+                for alias in {spec.package, spec.agent_name} - {None}:
+                    self._aliases.setdefault(alias, []).append(spec.key)
+        return self._specs
+
+    def names(self) -> List[str]:
+        """Every unambiguous short name plus every qualified key."""
+        specs = self.specs
+        return sorted([alias for alias, keys in self._aliases.items() if len(keys) == 1] + list(specs))
+
+    def resolve(self, name: str) -> AgentSpec:
+        specs = self.specs
+        if name in specs:
+            return specs[name]
+        keys = self._aliases.get(name)
+        if not keys:
+            raise KeyError(f"Unknown agent '{name}'. Known agents: {', '.join(self.names())}")
+        if len(keys) > 1:
+            raise KeyError(f"Agent name '{name}' is ambiguous, use one of: {', '.join(keys)}")
+        return specs[keys[0]]
+
+    def get(self, name: str):
+        """
+        Import and return the agent, once per process. Its function tools get
+        their declarations from the persisted cache (see tool_declarations.py).
+        """
+        spec = self.resolve(name)
+        if spec.key not in self._agents:
+            agent = import_from_lesson(spec.lesson_dir, spec.module, spec.attr)
+            if self.cache_declarations:
+                from tool_declarations import apply_declaration_cache
+                apply_declaration_cache(agent)
+            self._agents[spec.key] = agent
+        return self._agents[spec.key]
+
+    def __contains__(self, name: str) -> bool:
+        try:
+            self.resolve(name)
+        except KeyError:
+            return False
+        return True
+
+
+registry = AgentRegistry()
+
+
+def get_agent(name: str):
+    return registry.get(name)
+
+
+# --- Import-time report ---------------------------------------------------------
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \|\s+(\S+)")
+
+
+def _run_importtime(code: str) -> Dict:
+    """Run code in a fresh interpreter with -X importtime; returns wall time and per-package cost."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_ROOT,
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+
+    # Self time summed per top-level package, so e.g. litellm shows up on its own
+    # rather than inside the agent module that happened to import it first
+    packages: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            package = match.group(2).split(".")[0]
+            packages[package] = packages.get(package, 0) + int(match.group(1))
+    return {"wall_seconds": wall, "packages_us": packages}
+
+
+def _summary(run: Dict, top: int) -> Dict:
+    ranked = sorted(run["packages_us"].items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "wall_ms": round(run["wall_seconds"] * 1000, 1),
+        "import_ms": round(sum(run["packages_us"].values()) / 1000, 1),
+        "top_packages_ms": {name: round(us / 1000, 1) for name, us in ranked},
+    }
+
+
+def import_report(top: int = 8) -> Dict:
+    """
+    Startup cost before (every agent built eagerly, as the runners used to do)
+    and after (registry discovery only), plus the first-use cost of each agent.
+    """
+    baseline = _run_importtime("pass")
+    eager = _run_importtime(
+        "from agent_registry import registry\n"
+        "for key in list(registry.specs):\n"
+        "    try: registry.get(key)\n"
+        "    except Exception: pass"
+    )
+    lazy = _run_importtime("from agent_registry import registry; registry.names()")
+    report = {
+        "interpreter": _summary(baseline, top),
+        "before_eager_all_agents": _summary(eager, top),
+        "after_lazy_discovery": _summary(lazy, top),
+        "first_use": {},
+    }
+    for key in registry.specs:
+        try:
+            run = _run_importtime(f"from agent_registry import registry; registry.get({key!r})")
+            report["first_use"][key] = _summary(run, 3)
+        except RuntimeError as e:
+            report["first_use"][key] = {"error": str(e)}
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List lesson agents or report their import cost")
+    parser.add_argument("--report", action="store_true", help="Measure startup and per-agent import time")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest top-level packages to show")
+    args = parser.parse_args()
+
+    if args.report:
+        print(json.dumps(import_report(args.top), indent=2))
+    else:
+        for key, spec in registry.specs.items():
+            print(f"{key:45} {spec.attr:20} {spec.agent_name}")
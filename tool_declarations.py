@@ -0,0 +1,232 @@
+"""
+Persisted cache of FunctionTool declarations.
+
+ADK builds a tool's FunctionDeclaration by introspecting the function's
+signature and docstring (pydantic model creation plus JSON-schema
+generation), once per process. CachedFunctionTool looks the declaration up
+in a JSON file instead, keyed by a hash of the source it is built from (the
+function's name, signature and docstring, the source of classes in its
+annotations) and the ADK version, so changing a tool's signature or docstring,
+or upgrading ADK, invalidates its entry automatically.
+
+The cache hooks into private FunctionTool internals (_get_declaration,
+_ignore_params, _api_variant, _require_confirmation) and google.adk.features.
+On an ADK release without them, apply_declaration_cache() leaves the tools as
+plain FunctionTools, so agents still build, just without the cache.
+
+The registry applies the cache to every agent it builds. To precompute the
+file for all lesson agents (e.g. in a container build):
+
+    python tool_declarations.py --warm
+    python tool_declarations.py --bench   # cold build vs cached load, in fresh interpreters
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import typing
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from google import adk
+from google.adk.tools import FunctionTool
+from google.genai import types
+
+try:
+    from google.adk.features import FeatureName, is_feature_enabled
+except ImportError:  # Older ADK: tools are left uncached
+    FeatureName = is_feature_enabled = None
+
+# Private FunctionTool attributes CachedFunctionTool relies on
+_REQUIRED_INTERNALS = ("_get_declaration", "_ignore_params", "_api_variant", "_require_confirmation")
+
+REPO_ROOT = Path(__file__).resolve().parent
+DEFAULT_PATH = Path(os.environ.get("TOOL_DECLARATION_CACHE", REPO_ROOT / ".cache" / "tool_declarations.json"))
+
+
+def _annotation_sources(func: Callable) -> str:
+    """Source of the user-defined classes a function's annotations refer to (e.g. pydantic models)."""
+    try:
+        hints = typing.get_type_hints(func)
+    except Exception:
+        hints = getattr(func, "__annotations__", {})
+    sources = []
+    pending = list(hints.values())
+    while pending:
+        hint = pending.pop()
+        pending.extend(typing.get_args(hint))
+        if isinstance(hint, type) and hint.__module__ not in ("builtins", "typing"):
+            try:
+                sources.append(inspect.getsource(hint))
+            except (OSError, TypeError):
+                sources.append(repr(hint))
+    return "\n".join(sorted(sources))
+
+
+def declaration_key(func: Callable, *context) -> Optional[str]:
+    """
+    Hash of the source a declaration is built from: name, signature (annotations
+    and defaults), docstring and annotation classes. Body edits keep the key.
+    None for callables without an inspectable signature.
+    """
+    try:
+        signature = str(inspect.signature(func))
+    except (TypeError, ValueError):
+        return None
+    parts = [
+        func.__module__, func.__qualname__, signature, func.__doc__ or "",
+        _annotation_sources(func), adk.__version__, *map(str, context),
+    ]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class DeclarationCache:
+    """Declarations (as JSON) by declaration key, loaded once and written back atomically."""
+
+    def __init__(self, path: Path = DEFAULT_PATH, max_entries: int = 2000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._load().get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["declaration"]
+
+    def put(self, key: str, name: str, declaration: Dict[str, Any]):
+        with self._lock:
+            entries = self._load()
+            entries[key] = {"name": name, "declaration": declaration, "created": time.time()}
+            while len(entries) > self.max_entries:
+                del entries[min(entries, key=lambda k: entries[k]["created"])]
+            self._save(entries)
+
+    def _save(self, entries: Dict[str, Dict[str, Any]]):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass  # A read-only checkout still works; declarations are just rebuilt next time
+
+
+declaration_cache = DeclarationCache()
+
+
+class CachedFunctionTool(FunctionTool):
+    """FunctionTool whose declaration comes from the persisted cache when the function is unchanged."""
+
+    def __init__(self, func: Callable, cache: Optional[DeclarationCache] = None, **kwargs):
+        super().__init__(func, **kwargs)
+        self._declaration_cache = cache or declaration_cache
+        self._cached_declaration = None
+
+    def _get_declaration(self):
+        if self._cached_declaration is None:
+            key = declaration_key(self.func, self._ignore_params, self._api_variant,
+                                  is_feature_enabled(FeatureName.JSON_SCHEMA_FOR_FUNC_DECL))
+            stored = self._declaration_cache.get(key) if key else None
+            if stored is not None:
+                self._cached_declaration = types.FunctionDeclaration.model_validate(stored)
+            else:
+                self._cached_declaration = super()._get_declaration()
+                if key and self._cached_declaration is not None:
+                    self._declaration_cache.put(key, self.name, self._cached_declaration.model_dump(mode="json", exclude_none=True))
+        # Callers may mutate the declaration, so each one gets a copy
+        return self._cached_declaration.model_copy(deep=True) if self._cached_declaration else None
+
+
+def _cached_tool(tool, cache: Optional[DeclarationCache]):
+    """A CachedFunctionTool for a plain FunctionTool or function, or the tool unchanged if this ADK can't support one."""
+    if is_feature_enabled is None:
+        return tool
+    try:
+        if inspect.isfunction(tool):
+            cached = CachedFunctionTool(tool, cache)
+        else:
+            cached = CachedFunctionTool(tool.func, cache, require_confirmation=tool._require_confirmation)
+    except (AttributeError, TypeError):
+        return tool
+    return cached if all(hasattr(cached, name) for name in _REQUIRED_INTERNALS) else tool
+
+
+def apply_declaration_cache(agent, cache: Optional[DeclarationCache] = None, warm: bool = True):
+    """
+    Swap the plain FunctionTools (and bare functions) of an agent tree for
+    CachedFunctionTools; with warm=True their declarations are resolved now.
+    """
+    tools = []
+    for tool in agent.tools or []:
+        if type(tool) is FunctionTool or inspect.isfunction(tool):
+            tool = _cached_tool(tool, cache)
+        if warm and isinstance(tool, CachedFunctionTool):
+            tool._get_declaration()
+        tools.append(tool)
+    agent.tools = tools
+    for sub_agent in getattr(agent, "sub_agents", []) or []:
+        apply_declaration_cache(sub_agent, cache, warm)
+    return agent
+
+
+def _time_child(code: str, env: Dict[str, str]) -> float:
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env={**os.environ, **env},
+                         capture_output=True, text=True, check=True).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute or benchmark the tool declaration cache")
+    parser.add_argument("--warm", action="store_true", help="Build and persist declarations for every lesson agent")
+    parser.add_argument("--bench", action="store_true", help="Compare cold declaration builds with cached loads")
+    args = parser.parse_args()
+
+    if args.warm:
+        # The registry applies the cache through the imported module, not this __main__ copy
+        from tool_declarations import declaration_cache
+        from agent_registry import registry
+        for key in registry.specs:
+            try:
+                registry.get(key)
+            except Exception as e:  # A lesson whose optional dependency is missing
+                print(f"skipped {key}: {e}")
+        print(f"{declaration_cache.misses} declarations built, {declaration_cache.hits} already cached -> {declaration_cache.path}")
+    if args.bench:
+        # Time declaration resolution for every agent, after the agents' modules are imported
+        code = (
+            "import time, tool_declarations as td\n"
+            "from agent_registry import registry, import_from_lesson\n"
+            "agents = []\n"
+            "for key, spec in registry.specs.items():\n"
+            "    try: agents.append(import_from_lesson(spec.lesson_dir, spec.module, spec.attr))\n"
+            "    except Exception: pass\n"
+            "start = time.perf_counter()\n"
+            "for agent in agents: td.apply_declaration_cache(agent)\n"
+            "print(time.perf_counter() - start)\n"
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {"TOOL_DECLARATION_CACHE": os.path.join(tmp, "declarations.json"), "LITELLM_LOCAL_MODEL_COST_MAP": "True"}
+            cold = _time_child(code, env)
+            cached = _time_child(code, env)
+        print(f"cold build {cold * 1000:.1f} ms, cached load {cached * 1000:.1f} ms")